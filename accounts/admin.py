@@ -1,14 +1,27 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.contrib.admin.actions import delete_selected as django_delete_selected
+from django.contrib.admin.options import IS_POPUP_VAR
+from django.contrib.admin.templatetags.admin_urls import add_preserved_filters
 from django.contrib.auth.admin import UserAdmin as DjangoUserAdmin
+from django.db import transaction
+from django.db.models import Q, Sum
+from django.http import HttpResponseRedirect
+from django.urls import reverse
 from django.utils.translation import gettext_lazy as _
 
+from articles import tasks as article_tasks
+from articles.models import Article
+from jazz_guitarist_paper.admin import LargeTableAdminMixin
+
+from .backends import invalidate_cached_user
 from .models import User
 
 
 @admin.register(User)
-class UserAdmin(DjangoUserAdmin):
+class UserAdmin(LargeTableAdminMixin, DjangoUserAdmin):
     ordering = ('email',)
-    list_display = ('email', 'username', 'is_staff', 'is_active')
+    list_display = ('email', 'username', 'article_count', 'latest_article_at', 'is_staff', 'is_active')
+    readonly_fields = ('article_count', 'latest_article_at')
     fieldsets = (
         (None, {'fields': ('email', 'password', 'username')}),
         (_('Personal info'), {'fields': ('first_name', 'last_name')}),
@@ -20,6 +33,7 @@ class UserAdmin(DjangoUserAdmin):
             'user_permissions',
         )}),
         (_('Important dates'), {'fields': ('last_login', 'date_joined')}),
+        ('記事', {'fields': ('article_count', 'latest_article_at')}),
     )
     add_fieldsets = (
         (None, {
@@ -27,4 +41,105 @@ class UserAdmin(DjangoUserAdmin):
             'fields': ('email', 'username', 'password1', 'password2'),
         }),
     )
-    search_fields = ('email', 'username', 'first_name', 'last_name')
+    # 検索は get_search_results の前方一致で行う。search_fields は検索ボックスと
+    # ArticleAdmin の投稿者オートコンプリートを有効にするために必要
+    search_fields = ('email', 'username')
+    search_help_text = 'メールアドレスかユーザー名の先頭で検索します。数字だけならユーザー ID で探します。'
+    actions = ('deactivate_users', 'delete_selected')
+
+    def get_search_results(self, request, queryset, search_term):
+        # icontains は 4 列の全件走査になるので、一意インデックスが効く前方一致だけにする
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        condition = Q(email__startswith=search_term.lower()) | Q(username__startswith=search_term)
+        if search_term.isdigit():
+            condition |= Q(pk=int(search_term))
+        return queryset.filter(condition), False
+
+    @admin.action(description='選択したユーザーを無効にする')
+    def deactivate_users(self, request, queryset):
+        def deactivate_chunk(chunk):
+            # update() はシグナルを送らないので、ログイン中のユーザーのキャッシュはここで消す
+            pks = list(chunk.values_list('pk', flat=True))
+            for pk in pks:
+                transaction.on_commit(lambda pk=pk: invalidate_cached_user(pk), using=chunk.db)
+            return chunk.update(is_active=False)
+
+        updated = self.run_in_chunks(queryset.filter(is_active=True), deactivate_chunk)
+        self.message_user(request, f'{updated} 人のユーザーを無効にしました。', messages.SUCCESS)
+
+    def get_related_deletion_counts(self, objs):
+        if isinstance(objs, list):
+            return {Article: sum(obj.article_count for obj in objs)}
+        return {Article: objs.aggregate(total=Sum('article_count'))['total'] or 0}
+
+    def delete_view(self, request, object_id, extra_context=None):
+        if not article_tasks.can_purge_in_background():
+            self.message_purge_unavailable(request)
+            return HttpResponseRedirect(
+                reverse('admin:accounts_user_change', args=[object_id], current_app=self.admin_site.name)
+            )
+        return super().delete_view(request, object_id, extra_context)
+
+    def message_purge_unavailable(self, request):
+        self.message_user(
+            request,
+            'キャッシュがプロセスごと（LocMemCache）のため、ユーザーを削除できません。ジョブワーカーで記事を消しても'
+            'Web プロセスのキャッシュが消えず、削除したユーザーのページが表示され続けます。'
+            'REDIS_URL で共有キャッシュを設定してください。',
+            messages.ERROR,
+        )
+
+    def delete_model(self, request, obj):
+        # 記事の多いユーザーを 1 トランザクションで消すと書き込みが止まるので、
+        # 無効にしてから記事をバッチで消すジョブ（articles.purge_user）に任せる
+        article_tasks.enqueue_purge_user(obj.pk)
+
+    def delete_queryset(self, request, queryset):
+        def enqueue_chunk(chunk):
+            pks = list(chunk.values_list('pk', flat=True))
+            for pk in pks:
+                article_tasks.enqueue_purge_user(pk)
+            return len(pks)
+
+        self.run_in_chunks(queryset, enqueue_chunk)
+
+    def response_delete(self, request, obj_display, obj_id):
+        # 標準の「削除しました」ではなく、ジョブが消し終えるまでは残っていることを伝える
+        if IS_POPUP_VAR in request.POST:
+            return super().response_delete(request, obj_display, obj_id)
+        self.message_user(
+            request,
+            f'ユーザー「{obj_display}」を削除予定にしました。記事を消し終えると削除されます。',
+            messages.SUCCESS,
+        )
+        if not self.has_change_permission(request, None):
+            return HttpResponseRedirect(reverse('admin:index', current_app=self.admin_site.name))
+        post_url = reverse('admin:accounts_user_changelist', current_app=self.admin_site.name)
+        preserved_filters = self.get_preserved_filters(request)
+        return HttpResponseRedirect(
+            add_preserved_filters({'preserved_filters': preserved_filters, 'opts': self.opts}, post_url)
+        )
+
+    @admin.action(permissions=['delete'], description=django_delete_selected.short_description)
+    def delete_selected(self, request, queryset):
+        """標準の一括削除と同じ確認画面を出し、確定したら削除予定にしたことを伝える。"""
+        if not article_tasks.can_purge_in_background():
+            self.message_purge_unavailable(request)
+            return None
+        if not request.POST.get('post'):
+            return django_delete_selected(self, request, queryset)
+        _objects, _model_count, perms_needed, protected = self.get_deleted_objects(queryset, request)
+        if perms_needed or protected:
+            return django_delete_selected(self, request, queryset)
+        count = queryset.count()
+        if count:
+            self.log_deletions(request, queryset)
+            self.delete_queryset(request, queryset)
+            self.message_user(
+                request,
+                f'{count} 人のユーザーを削除予定にしました。記事を消し終えた人から削除されます。',
+                messages.SUCCESS,
+            )
+        return None
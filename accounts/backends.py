@@ -0,0 +1,72 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def user_cache_key(user_id):
+    return f'accounts:user:{user_id}'
+
+
+def get_user_cache():
+    """
+    ログイン中のユーザーを置くキャッシュ。プロセスごとのキャッシュ（LocMemCache）なら None を返す。
+    無効化は保存・削除したプロセスでしか行えず、他のワーカーでは無効にしたユーザーや
+    パスワードを変えたユーザーがタイムアウトまでログインしたままになるため。
+    """
+    cache = caches[getattr(settings, 'ACCOUNTS_USER_CACHE_ALIAS', 'default')]
+    return None if isinstance(cache, LocMemCache) else cache
+
+
+def invalidate_cached_user(user_id):
+    cache = get_user_cache()
+    if cache is not None:
+        cache.delete(user_cache_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    """
+    ログイン中のユーザーをキャッシュから解決する ModelBackend。
+
+    セッションに保存されたユーザー ID から毎リクエスト ``accounts.User`` を引く代わりに、
+    キャッシュ済みのインスタンスを返す。ユーザーが保存・削除されるとキャッシュは消える
+    （accounts.signals）。パスワード変更時のセッション検証は Django 側で従来どおり行われる。
+    共有キャッシュ（Redis など）がないときは ModelBackend と同じく毎回 DB から引く。
+    """
+
+    def get_user(self, user_id):
+        cache = get_user_cache()
+        if cache is None:
+            return super().get_user(user_id)
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(user_id)
+            if user is None:
+                return None
+            cache.set(key, user, getattr(settings, 'ACCOUNTS_USER_CACHE_TIMEOUT', 300))
+        return user if self.user_can_authenticate(user) else None
+
+
+class EmailBackend(CachedModelBackend):
+    """
+    メールアドレスの大文字・小文字を区別せずにログインさせる。
+    検索は ``LOWER(email)`` の関数インデックスを使う 1 回の索引検索になる。
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        UserModel = get_user_model()
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = UserModel._default_manager.get_by_email(username)
+        except UserModel.DoesNotExist:
+            # 存在しないユーザーでもパスワードハッシュを 1 回計算し、応答時間の差をなくす
+            UserModel().set_password(password)
+            return None
+        if user.check_password(password) and self.user_can_authenticate(user):
+            return user
+        return None
@@ -0,0 +1,61 @@
+"""
+アカウントアプリのシステムチェック。
+
+``manage.py check --database default`` と ``migrate`` の前に実行される（データベースを引くので
+``Tags.database`` にしている）。
+"""
+from django.core.checks import Error, Tags, register
+from django.db import connections
+from django.db.migrations.recorder import MigrationRecorder
+from django.db.models import Count
+from django.db.models.functions import Lower
+
+# 小文字にそろえて LOWER(email) の一意制約を作るマイグレーション
+LOWERCASE_MIGRATION = ('accounts', '0002_user_email_lower_uniq')
+
+# エラーに載せる重複の上限
+MAX_REPORTED_DUPLICATES = 20
+
+
+def email_case_duplicates(alias):
+    """大文字・小文字だけが違うメールアドレスのユーザーを ``(id, email)`` の一覧で返す。"""
+    from .models import User
+
+    users = User.objects.using(alias).annotate(email_lower=Lower('email'))
+    duplicates = list(
+        users.values('email_lower')
+        .annotate(count=Count('id'))
+        .filter(count__gt=1)
+        .values_list('email_lower', flat=True)
+        .order_by('email_lower')[:MAX_REPORTED_DUPLICATES]
+    )
+    if not duplicates:
+        return []
+    return list(users.filter(email_lower__in=duplicates).order_by('email_lower', 'id').values_list('id', 'email'))
+
+
+@register(Tags.database)
+def check_email_case_duplicates(app_configs, databases=None, **kwargs):
+    """
+    0002 はメールアドレスを小文字にそろえてから LOWER(email) の一意制約を作る。大文字・小文字違いの
+    重複（A@x と a@x）があると email の一意制約に反してわかりにくい IntegrityError になるので、
+    0002 を適用する前に重複を一覧で知らせる。適用済みのデータベースでは何もしない。
+    """
+    errors = []
+    for alias in databases or []:
+        recorder = MigrationRecorder(connections[alias])
+        if not recorder.has_table():
+            continue
+        applied = recorder.applied_migrations()
+        if LOWERCASE_MIGRATION in applied or ('accounts', '0001_initial') not in applied:
+            continue
+        rows = email_case_duplicates(alias)
+        if rows:
+            lines = '\n'.join(f'  id={pk} {email}' for pk, email in rows)
+            errors.append(Error(
+                f'大文字・小文字だけが違うメールアドレスのユーザーがいます（{alias}、最大 {MAX_REPORTED_DUPLICATES} 組まで表示）:\n'
+                f'{lines}',
+                hint='どちらかのアドレスを変更するか統合してから、もう一度マイグレーションしてください。',
+                id='accounts.E001',
+            ))
+    return errors
@@ -2,6 +2,8 @@ from django import forms
 from django.contrib.auth import get_user_model
 from django.contrib.auth.forms import AuthenticationForm, UserCreationForm
 
+from .models import normalize_email_address
+
 User = get_user_model()
 
 
@@ -13,8 +15,8 @@ class RegistrationForm(UserCreationForm):
         fields = ('username', 'email', 'password1', 'password2')
 
     def clean_email(self):
-        email = self.cleaned_data['email']
-        if User.objects.filter(email__iexact=email).exists():
+        email = normalize_email_address(self.cleaned_data['email'])
+        if User.objects.filter_by_email(email).exists():
             raise forms.ValidationError('このメールアドレスは既に登録されています。')
         return email
 
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-17 02:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_user_email_lower_uniq'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='article_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='記事数'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='latest_article_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='最新の投稿日時'),
+        ),
+    ]
@@ -1,12 +1,49 @@
-from django.contrib.auth.models import AbstractUser
+from django.contrib.auth.models import AbstractUser, UserManager as DjangoUserManager
 from django.db import models
+from django.db.models.functions import Lower
 from django.utils.translation import gettext_lazy as _
 
+
+def normalize_email_address(email):
+    return (email or '').strip().lower()
+
+
+class UserManager(DjangoUserManager):
+    def filter_by_email(self, email):
+        # LOWER(email) の関数インデックス（accounts_user_email_lower_uniq）を使って引く
+        return self.alias(email_lower=Lower('email')).filter(email_lower=normalize_email_address(email))
+
+    def get_by_email(self, email):
+        return self.filter_by_email(email).get()
+
+    def get_by_natural_key(self, username):
+        return self.get_by_email(username)
+
+
 class User(AbstractUser):
+    # 大文字・小文字違いの重複は LOWER(email) の一意制約（accounts_user_email_lower_uniq）で防ぐ。
+    # USERNAME_FIELD なので unique=True も付けておく（auth.W004）
     email = models.EmailField(_('email address'), unique=True)
+    # 記事の投稿・削除時に F() で更新する非正規化フィールド（reconcile_author_stats で修復できる）
+    article_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='記事数')
+    latest_article_at = models.DateTimeField(null=True, blank=True, editable=False, verbose_name='最新の投稿日時')
+    # スナップショット（snapshots.builder）が、ユーザー名を変えた投稿者の記事を描き直すために使う。
+    # last_login だけの保存（update_fields 指定）では変わらない
+    updated_at = models.DateTimeField(auto_now=True, db_index=True, verbose_name='更新日時')
+
+    objects = UserManager()
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username']
 
+    class Meta(AbstractUser.Meta):
+        constraints = [
+            models.UniqueConstraint(Lower('email'), name='accounts_user_email_lower_uniq'),
+        ]
+
     def __str__(self) -> str:
         return self.email or self.username
+
+    def save(self, *args, **kwargs):
+        self.email = normalize_email_address(self.email)
+        super().save(*args, **kwargs)
@@ -0,0 +1,16 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .backends import invalidate_cached_user
+from .models import User
+
+
+@receiver(post_save, sender=User, dispatch_uid='accounts_invalidate_saved_user')
+@receiver(post_delete, sender=User, dispatch_uid='accounts_invalidate_deleted_user')
+def invalidate_user_cache(sender, instance, using='default', **kwargs):
+    user_id = instance.pk
+    invalidate_cached_user(user_id)
+    # 保存がロールバックされたり、コミット前に別リクエストが古い値をキャッシュしたりした場合に備えて
+    # コミット後にもう一度消す
+    transaction.on_commit(lambda: invalidate_cached_user(user_id), using=using)
@@ -1,3 +1,200 @@
-from django.test import TestCase
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import Permission
+from django.db import IntegrityError, transaction
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from articles.models import Article
+from articles.tasks import PURGE_USER
+from jobs import queue
+from jobs.models import Job
+
+from . import checks
+from .backends import CachedModelBackend, get_user_cache, user_cache_key
+from .forms import RegistrationForm
+from .models import User
+
+
+class EmailBackendTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('pat', ' Pat.Martino@Example.com ', 'password')
+
+    def test_email_is_normalized_on_save(self):
+        self.assertEqual(User.objects.get(pk=self.user.pk).email, 'pat.martino@example.com')
+
+    def test_login_ignores_email_case(self):
+        self.assertEqual(authenticate(username='PAT.MARTINO@example.COM', password='password'), self.user)
+
+    def test_wrong_password_and_unknown_email(self):
+        self.assertIsNone(authenticate(username='pat.martino@example.com', password='wrong'))
+        self.assertIsNone(authenticate(username='nobody@example.com', password='password'))
+
+    def test_inactive_user_cannot_log_in(self):
+        self.user.is_active = False
+        self.user.save()
+        self.assertIsNone(authenticate(username='pat.martino@example.com', password='password'))
+
+    def test_case_variant_email_is_rejected(self):
+        # 一意性は LOWER(email) の制約で守る（save() を通さない書き込みでも）
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            User.objects.bulk_create([User(username='other', email='PAT.MARTINO@EXAMPLE.COM')])
+        form = RegistrationForm(data={
+            'username': 'other',
+            'email': 'Pat.Martino@example.com',
+            'password1': 'a-long-password-1',
+            'password2': 'a-long-password-1',
+        })
+        self.assertIn('email', form.errors)
+
+    def test_login_view(self):
+        response = self.client.post(reverse('accounts:login'), {
+            'username': 'Pat.Martino@example.com',
+            'password': 'password',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(int(self.client.session['_auth_user_id']), self.user.pk)
+
+
+class EmailDuplicateCheckTests(TestCase):
+    databases = {'default'}
+
+    def test_no_error_once_lowercase_migration_is_applied(self):
+        self.assertEqual(checks.check_email_case_duplicates(None, databases=['default']), [])
+
+    def test_reports_case_duplicates_before_lowercase_migration(self):
+        applied = {('accounts', '0001_initial'): None}
+        rows = [(1, 'Pat@example.com'), (2, 'pat@example.com')]
+        with mock.patch.object(checks.MigrationRecorder, 'applied_migrations', return_value=applied), \
+                mock.patch.object(checks, 'email_case_duplicates', return_value=rows):
+            errors = checks.check_email_case_duplicates(None, databases=['default'])
+        self.assertEqual([error.id for error in errors], ['accounts.E001'])
+        self.assertIn('id=1 Pat@example.com', errors[0].msg)
+        self.assertIn('id=2 pat@example.com', errors[0].msg)
+
+
+class CachedModelBackendTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('jim', 'jim@example.com', 'password')
+
+    def test_per_process_cache_is_not_used(self):
+        # LocMemCache では他のワーカーの無効化が届かないので、毎回データベースから引く
+        self.assertIsNone(get_user_cache())
+        with self.assertNumQueries(1):
+            self.assertEqual(CachedModelBackend().get_user(self.user.pk), self.user)
+
+    def test_shared_cache(self):
+        with tempfile.TemporaryDirectory() as directory, override_settings(
+            CACHES={
+                'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                'users': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory},
+            },
+            ACCOUNTS_USER_CACHE_ALIAS='users',
+        ):
+            backend = CachedModelBackend()
+            backend.get_user(self.user.pk)
+            with self.assertNumQueries(0):
+                self.assertEqual(backend.get_user(self.user.pk), self.user)
+            with self.captureOnCommitCallbacks(execute=True):
+                self.user.is_active = False
+                self.user.save()
+            self.assertIsNone(get_user_cache().get(user_cache_key(self.user.pk)))
+            self.assertIsNone(backend.get_user(self.user.pk))
+
+
+class SessionViewTests(TestCase):
+    def test_anonymous(self):
+        response = self.client.get(reverse('accounts:session'))
+        self.assertEqual(response.json(), {'authenticated': False})
+        self.assertIn('no-cache', response['Cache-Control'])
+
+    def test_authenticated(self):
+        user = User.objects.create_user('kenny', 'kenny@example.com', 'password')
+        self.client.force_login(user)
+        data = self.client.get(reverse('accounts:session')).json()
+        self.assertEqual((data['authenticated'], data['id'], data['username']), (True, user.pk, 'kenny'))
+        self.assertTrue(data['csrf_token'])
+
+
+@override_settings(JOBS_BACKEND='database')
+class UserAdminDeleteTests(TestCase):
+    def setUp(self):
+        # 削除はジョブワーカー（別のプロセス）が行うので、共有キャッシュが必要
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        self.enterContext(override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': directory},
+        }))
+        self.staff = User.objects.create_user('staff', 'staff@example.com', 'password', is_staff=True)
+        self.staff.user_permissions.set(
+            Permission.objects.filter(codename__in=['view_user', 'change_user', 'delete_user'])
+        )
+        self.author = User.objects.create_user('grant', 'grant@example.com', 'password', article_count=1)
+        Article.objects.create(author=self.author, title='Green Dolphin Street', content='soul')
+        self.client.force_login(self.staff)
+        self.delete_url = reverse('admin:accounts_user_delete', args=[self.author.pk])
+
+    def grant_article_delete(self):
+        self.staff.user_permissions.add(Permission.objects.get(codename='delete_article'))
+        self.client.force_login(User.objects.get(pk=self.staff.pk))
+
+    def test_needs_permission_to_delete_articles(self):
+        response = self.client.get(self.delete_url)
+        self.assertEqual(response.context['perms_lacking'], {'記事'})
+        response = self.client.post(self.delete_url, {'post': 'yes'})
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Job.objects.filter(task=PURGE_USER).exists())
+
+    def test_delete_schedules_purge(self):
+        self.grant_article_delete()
+        response = self.client.post(self.delete_url, {'post': 'yes'}, follow=True)
+        self.assertContains(response, '削除予定にしました')
+        self.assertFalse(User.objects.get(pk=self.author.pk).is_active)
+        self.assertEqual(Job.objects.get(task=PURGE_USER).payload, {'user_id': self.author.pk})
+
+    def test_bulk_delete_schedules_purge(self):
+        self.grant_article_delete()
+        response = self.client.post(reverse('admin:accounts_user_changelist'), {
+            'action': 'delete_selected',
+            '_selected_action': [self.author.pk],
+            'post': 'yes',
+        }, follow=True)
+        self.assertContains(response, '1 人のユーザーを削除予定にしました')
+        self.assertTrue(User.objects.filter(pk=self.author.pk).exists())
+        self.assertEqual(Job.objects.filter(task=PURGE_USER).count(), 1)
+
+    def test_purged_user_pages_are_not_served_from_cache(self):
+        self.grant_article_delete()
+        article = Article.objects.get(author=self.author)
+        detail_url = reverse('articles:detail', kwargs={'pk': article.pk})
+        self.client.logout()
+        self.assertContains(self.client.get(reverse('articles:list')), 'Green Dolphin Street')
+        self.assertEqual(self.client.get(detail_url).status_code, 200)
+
+        self.client.force_login(self.staff)
+        self.client.post(self.delete_url, {'post': 'yes'})
+        with self.captureOnCommitCallbacks(execute=True):
+            queue.run(queue.claim('worker-1'))
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+
+        self.client.logout()
+        self.assertNotContains(self.client.get(reverse('articles:list')), 'Green Dolphin Street')
+        self.assertEqual(self.client.get(detail_url).status_code, 404)
+
+    @override_settings(
+        CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+        JOBS_BACKEND='database',
+    )
+    def test_refuses_to_queue_purge_without_shared_cache(self):
+        self.grant_article_delete()
+        response = self.client.post(self.delete_url, {'post': 'yes'}, follow=True)
+        self.assertContains(response, 'ユーザーを削除できません')
+        response = self.client.post(reverse('admin:accounts_user_changelist'), {
+            'action': 'delete_selected',
+            '_selected_action': [self.author.pk],
+            'post': 'yes',
+        }, follow=True)
+        self.assertContains(response, 'ユーザーを削除できません')
+        self.assertTrue(User.objects.get(pk=self.author.pk).is_active)
+        self.assertFalse(Job.objects.filter(task=PURGE_USER).exists())
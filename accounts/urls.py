@@ -1,6 +1,6 @@
 from django.urls import path
 
-from .views import LoginView, LogoutView, RegisterView
+from .views import LoginView, LogoutView, RegisterView, SessionView
 
 app_name = 'accounts'
 
@@ -8,4 +8,5 @@ urlpatterns = [
     path('register/', RegisterView.as_view(), name='register'),
     path('login/', LoginView.as_view(), name='login'),
     path('logout/', LogoutView.as_view(), name='logout'),
+    path('session/', SessionView.as_view(), name='session'),
 ]
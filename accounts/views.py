@@ -1,6 +1,11 @@
 from django.contrib.auth import login
 from django.contrib.auth.views import LoginView as DjangoLoginView, LogoutView as DjangoLogoutView
+from django.http import JsonResponse
+from django.middleware.csrf import get_token
 from django.urls import reverse_lazy
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.cache import never_cache
 from django.views.generic import FormView
 
 from .forms import EmailAuthenticationForm, RegistrationForm
@@ -25,3 +30,22 @@ class LoginView(DjangoLoginView):
 
 class LogoutView(DjangoLogoutView):
     next_page = reverse_lazy('accounts:login')
+
+
+@method_decorator(never_cache, name='dispatch')
+class SessionView(View):
+    """
+    共有キャッシュされるページ（SHARED_PAGE_SHELL）がヘッダーを組み立てるための、閲覧者ごとの小さな JSON。
+    ページ本体からユーザー名と CSRF トークンを追い出し、ここだけを private で返す。
+    """
+
+    def get(self, request, *args, **kwargs):
+        user = request.user
+        if not user.is_authenticated:
+            return JsonResponse({'authenticated': False})
+        return JsonResponse({
+            'authenticated': True,
+            'id': user.pk,
+            'username': user.username,
+            'csrf_token': get_token(request),
+        })
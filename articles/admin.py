@@ -1,3 +1,65 @@
-from django.contrib import admin
+from django.contrib import admin, messages
+from django.db import transaction
 
-# Register your models here.
+from jazz_guitarist_paper.admin import LargeTableAdminMixin
+
+from . import authors, cache, purge, tasks
+from .models import Article
+from .search import search_articles
+
+
+@admin.register(Article)
+class ArticleAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ('title', 'author', 'word_count', 'created_at', 'updated_at')
+    list_select_related = ('author',)
+    # ユーザー数が多いので <select> ではなく UserAdmin の検索を使う
+    autocomplete_fields = ('author',)
+    readonly_fields = ('excerpt', 'word_count', 'content_html_version', 'created_at', 'updated_at')
+    fields = ('author', 'title', 'content') + readonly_fields
+    # 一覧の検索は search_articles（trigram / FTS5 のインデックス）を使う。
+    # search_fields は検索ボックスを表示させるためだけのもの
+    search_fields = ('title',)
+    search_help_text = 'タイトルと本文を検索します。数字だけなら記事 ID で探します。'
+    actions = ('rerender_html',)
+
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        if search_term.isdigit():
+            return queryset.filter(pk=int(search_term)), False
+        return search_articles(queryset, search_term), False
+
+    def save_model(self, request, obj, form, change):
+        obj.refresh_summary()
+        if 'content' in form.changed_data:
+            obj.mark_content_html_stale()
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            tasks.enqueue_render_html(obj)
+            if not change:
+                authors.record_article_created(obj)
+            elif 'author' in form.changed_data:
+                authors.reconcile([form.initial['author'], obj.author_id])
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            super().delete_model(request, obj)
+            authors.record_article_deleted(obj)
+
+    def delete_queryset(self, request, queryset):
+        purge.purge_articles(queryset, batch_size=self.action_chunk_size)
+
+    @admin.action(description='選択した記事の HTML を生成し直す')
+    def rerender_html(self, request, queryset):
+        def render_chunk(chunk):
+            articles = list(chunk.only('pk', 'content'))
+            for article in articles:
+                article.render_content()
+            Article.objects.using(chunk.db).bulk_update(articles, ['content_html', 'content_html_version'])
+            pks = [article.pk for article in articles]
+            transaction.on_commit(lambda: cache.invalidate_articles(pks), using=chunk.db)
+            return len(articles)
+
+        updated = self.run_in_chunks(queryset, render_chunk)
+        self.message_user(request, f'{updated} 件の記事の HTML を生成し直しました。', messages.SUCCESS)
@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class ArticlesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'articles'
+
+    def ready(self):
+        from . import checks, partitions, signals  # noqa: F401
+
+        # ARTICLE_PARTITIONING の値の誤りは、リクエストを受ける前に起動時に気付けるようにする
+        partitions.get_interval()
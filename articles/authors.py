@@ -0,0 +1,117 @@
+"""
+投稿者ごとの記事数と最新投稿日時（``User.article_count`` / ``User.latest_article_at``）の管理。
+
+どちらも記事の作成・削除と同じトランザクションの中で F() 式の UPDATE 1 回で更新するので、
+同時に投稿されても数がずれない。一括投入などで通らなかった経路の分は ``reconcile`` で直す。
+"""
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db import router, transaction
+from django.db.models import Case, Count, DateTimeField, F, Max, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce, Greatest
+
+from accounts.backends import invalidate_cached_user
+
+from .models import Article
+
+User = get_user_model()
+
+
+def _invalidate_user_on_commit(user_id, using):
+    transaction.on_commit(lambda: invalidate_cached_user(user_id), using=using)
+
+
+def record_article_created(article):
+    record_articles_created([article])
+
+
+def record_articles_created(articles, using=None):
+    """
+    まとめて作成した後に呼ぶ。投稿者ごとの件数と最新の作成日時を数え、UPDATE 1 回で足し込む。
+    記事テーブルを数え直す ``reconcile`` と違い、投入済みの記事数に比例して遅くならない。
+    """
+    counts = Counter(article.author_id for article in articles)
+    if not counts:
+        return
+    newest = {}
+    for article in articles:
+        if article.author_id not in newest or article.created_at > newest[article.author_id]:
+            newest[article.author_id] = article.created_at
+    using = using or router.db_for_write(User)
+    added = Case(*[When(pk=author_id, then=Value(count)) for author_id, count in counts.items()], default=Value(0))
+    latest = Case(
+        *[When(pk=author_id, then=Value(created_at)) for author_id, created_at in newest.items()],
+        output_field=DateTimeField(),
+    )
+    User.objects.using(using).filter(pk__in=list(counts)).update(
+        article_count=F('article_count') + added,
+        latest_article_at=Greatest(Coalesce('latest_article_at', latest), latest),
+    )
+    for author_id in counts:
+        _invalidate_user_on_commit(author_id, using)
+
+
+def _latest_created_at(author_ref):
+    return Subquery(
+        Article.objects.filter(author=author_ref).order_by('-created_at').values('created_at')[:1]
+    )
+
+
+def record_article_deleted(article):
+    """記事を削除した後に呼ぶ。最新投稿日時は (author, created_at) のインデックスで引き直す。"""
+    record_articles_deleted({article.author_id: 1})
+
+
+def record_articles_deleted(counts, using=None):
+    """まとめて削除した後に呼ぶ。``counts`` は ``{投稿者 ID: 削除した件数}``。UPDATE 1 回で済ませる。"""
+    if not counts:
+        return
+    using = using or router.db_for_write(User)
+    removed = Case(*[When(pk=author_id, then=Value(count)) for author_id, count in counts.items()], default=Value(0))
+    User.objects.using(using).filter(pk__in=list(counts)).update(
+        article_count=Greatest(F('article_count') - removed, 0),
+        latest_article_at=_latest_created_at(OuterRef('pk')),
+    )
+    for author_id in counts:
+        _invalidate_user_on_commit(author_id, using)
+
+
+def reconcile(author_ids=None, batch_size=1000, using=None):
+    """
+    記事テーブルから数え直し、ずれている投稿者だけを更新する。更新した人数を返す。
+    ``author_ids`` を省略すると全ユーザーが対象。
+    """
+    using = using or router.db_for_write(User)
+    users = User.objects.using(using).order_by('pk')
+    if author_ids is not None:
+        users = users.filter(pk__in=list(author_ids))
+
+    fixed = 0
+    last_pk = 0
+    while True:
+        batch = list(users.filter(pk__gt=last_pk).only('pk', 'article_count', 'latest_article_at')[:batch_size])
+        if not batch:
+            return fixed
+        last_pk = batch[-1].pk
+        actual = {
+            row['author_id']: row
+            for row in Article.objects.using(using)
+            .filter(author_id__in=[user.pk for user in batch])
+            .order_by()
+            .values('author_id')
+            .annotate(count=Count('id'), latest=Max('created_at'))
+        }
+        changed = []
+        for user in batch:
+            row = actual.get(user.pk, {'count': 0, 'latest': None})
+            if (user.article_count, user.latest_article_at) != (row['count'], row['latest']):
+                user.article_count = row['count']
+                user.latest_article_at = row['latest']
+                changed.append(user)
+        if changed:
+            with transaction.atomic(using=using):
+                User.objects.using(using).bulk_update(changed, ['article_count', 'latest_article_at'])
+            for user in changed:
+                _invalidate_user_on_commit(user.pk, using)
+            fixed += len(changed)
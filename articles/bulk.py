@@ -0,0 +1,35 @@
+"""
+大量の記事をモデルの save() を通さずに書き込む。
+
+PostgreSQL では COPY、それ以外では ``bulk_create`` を使う。シグナルは発火しないので、
+日時や派生フィールドは呼び出し側で埋めておくこと（auto_now / auto_now_add で上書きされた日時は元に戻す）。
+"""
+from django.db import connections
+
+from .models import Article
+
+COPY_COLUMNS = (
+    'author_id', 'title', 'content', 'excerpt', 'word_count',
+    'content_html', 'content_html_version', 'created_at', 'updated_at',
+)
+
+
+def copy_articles(articles, using='default'):
+    with connections[using].cursor() as cursor:
+        with cursor.copy(f'COPY {Article._meta.db_table} ({", ".join(COPY_COLUMNS)}) FROM STDIN') as copy:
+            for article in articles:
+                copy.write_row([getattr(article, column) for column in COPY_COLUMNS])
+
+
+def insert_articles(articles, using='default', use_copy=True, batch_size=1000):
+    if use_copy and connections[using].vendor == 'postgresql':
+        copy_articles(articles, using)
+        return
+    articles = list(articles)
+    timestamps = [(article.created_at, article.updated_at) for article in articles]
+    Article.objects.using(using).bulk_create(articles, batch_size=batch_size)
+    # bulk_create は auto_now / auto_now_add で日時を現在時刻に置き換えるので、渡された日時に戻す。
+    # bulk_update には auto_now が効かない
+    for article, (created_at, updated_at) in zip(articles, timestamps):
+        article.created_at, article.updated_at = created_at, updated_at
+    Article.objects.using(using).bulk_update(articles, ['created_at', 'updated_at'], batch_size=batch_size)
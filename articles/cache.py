@@ -0,0 +1,242 @@
+"""
+記事一覧・詳細ページのレスポンスキャッシュ。
+
+詳細ページは記事ごとのキー、一覧ページは「世代番号」を含むキーで保存する。記事が変わったら
+その記事の詳細キーを消し、一覧の世代を進めることで古い一覧キーをまとめて無効にする。
+投稿者名が変わったときは投稿者ごとの版を進める。詳細ページは保存したときの投稿者の版を
+一緒に持っているので、版が変わっていればキャッシュにないものとして扱う。
+
+ページと一緒に ETag / Last-Modified も保存し、キャッシュにあるページへの条件付き GET には
+データベースを引かずに答える。
+"""
+import hashlib
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.http import HttpResponse
+
+from .text import CONTENT_RENDERER_VERSION
+
+LIST_GENERATION_KEY = 'articles:list:generation'
+RECENT_INVALIDATION_KEY = 'articles:recently-invalidated'
+HITS_KEY = 'articles:response-cache:hits'
+MISSES_KEY = 'articles:response-cache:misses'
+DELETE_BATCH_SIZE = 500
+
+
+def get_cache():
+    return caches[getattr(settings, 'ARTICLES_CACHE_ALIAS', 'default')]
+
+
+def get_timeout():
+    return getattr(settings, 'ARTICLES_RESPONSE_CACHE_TIMEOUT', 300)
+
+
+def is_shared():
+    """
+    キャッシュを全プロセスで共有しているか。LocMemCache はプロセスごとなので、管理コマンドや
+    ジョブワーカーから無効化しても、Web プロセスのキャッシュはタイムアウトまで古いページを返す。
+    """
+    return not isinstance(get_cache(), LocMemCache)
+
+
+def _new_generation():
+    # 世代キーが追い出されても過去の世代番号と衝突しないよう時刻から作る
+    return int(time.time() * 1000)
+
+
+def _get_version(key):
+    cache = get_cache()
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _new_generation(), None)
+        version = cache.get(key)
+    return version
+
+
+async def _aget_version(key):
+    cache = get_cache()
+    version = await cache.aget(key)
+    if version is None:
+        await cache.aadd(key, _new_generation(), None)
+        version = await cache.aget(key)
+    return version
+
+
+def _bump_version(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, _new_generation(), None)
+
+
+def list_generation():
+    return _get_version(LIST_GENERATION_KEY)
+
+
+async def alist_generation():
+    return await _aget_version(LIST_GENERATION_KEY)
+
+
+def bump_list_generation():
+    _bump_version(LIST_GENERATION_KEY)
+
+
+def author_version_key(author_id):
+    return f'articles:author:{author_id}:version'
+
+
+def author_versions(author_id):
+    """詳細ページのキャッシュと一緒に保存し、取り出すときに照合する版。"""
+    key = author_version_key(author_id)
+    return {key: _get_version(key)}
+
+
+async def aauthor_versions(author_id):
+    key = author_version_key(author_id)
+    return {key: await _aget_version(key)}
+
+
+def detail_cache_key(pk):
+    return f'articles:detail:{pk}:r{CONTENT_RENDERER_VERSION}'
+
+
+def _list_cache_key(path, cursor, generation):
+    # クエリ文字列全体ではなく検証済みのカーソルだけを使い、任意のパラメーターでキーが増えないようにする
+    digest = hashlib.md5(f'{path}?{cursor}'.encode()).hexdigest()
+    return f'articles:list:{generation}:{digest}'
+
+
+def list_cache_key(path, cursor):
+    return _list_cache_key(path, cursor, list_generation())
+
+
+async def alist_cache_key(path, cursor):
+    return _list_cache_key(path, cursor, await alist_generation())
+
+
+def cached_response(cached):
+    response = HttpResponse(cached['content'], content_type=cached['content_type'])
+    response['X-Cache'] = 'HIT'
+    return response
+
+
+def _is_current(cached, current_versions):
+    return current_versions == cached['versions']
+
+
+def get_cached(key):
+    """保存したページ（本文と検証子）を返す。ないか投稿者の版が古ければ None。"""
+    cache = get_cache()
+    cached = cache.get(key)
+    if cached is not None and cached['versions'] and not _is_current(cached, cache.get_many(list(cached['versions']))):
+        cached = None
+    _count(HITS_KEY if cached is not None else MISSES_KEY)
+    return cached
+
+
+async def aget_cached(key):
+    cache = get_cache()
+    cached = await cache.aget(key)
+    if cached is not None and cached['versions'] and not _is_current(
+        cached, await cache.aget_many(list(cached['versions'])),
+    ):
+        cached = None
+    await _acount(HITS_KEY if cached is not None else MISSES_KEY)
+    return cached
+
+
+def _cacheable(response):
+    return response.status_code == 200 and not response.streaming
+
+
+def _entry(response, etag, last_modified, versions):
+    return {
+        'content': response.content,
+        'content_type': response['Content-Type'],
+        'etag': etag,
+        'last_modified': last_modified,
+        'versions': versions or {},
+    }
+
+
+def store_response(key, response, etag=None, last_modified=None, versions=None):
+    if not _cacheable(response):
+        return
+    get_cache().set(key, _entry(response, etag, last_modified, versions), get_timeout())
+    response['X-Cache'] = 'MISS'
+
+
+async def astore_response(key, response, etag=None, last_modified=None, versions=None):
+    if not _cacheable(response):
+        return
+    await get_cache().aset(key, _entry(response, etag, last_modified, versions), get_timeout())
+    response['X-Cache'] = 'MISS'
+
+
+def _mark_invalidated():
+    # 無効にした直後はレプリカが書き込みに追いついていないことがあるので、
+    # この間にキャッシュを埋めるときはプライマリから読む（recently_invalidated を参照）
+    get_cache().set(RECENT_INVALIDATION_KEY, True, getattr(settings, 'DATABASE_STICKY_SECONDS', 10))
+
+
+def recently_invalidated():
+    return get_cache().get(RECENT_INVALIDATION_KEY) is not None
+
+
+async def arecently_invalidated():
+    return await get_cache().aget(RECENT_INVALIDATION_KEY) is not None
+
+
+def invalidate_articles(pks):
+    pks = list(pks)
+    cache = get_cache()
+    for start in range(0, len(pks), DELETE_BATCH_SIZE):
+        cache.delete_many([detail_cache_key(pk) for pk in pks[start:start + DELETE_BATCH_SIZE]])
+    bump_list_generation()
+    _mark_invalidated()
+
+
+def invalidate_authors(author_ids):
+    """投稿者名などが変わったとき。その投稿者の詳細ページと、すべての一覧ページを無効にする。"""
+    for author_id in author_ids:
+        _bump_version(author_version_key(author_id))
+    bump_list_generation()
+    _mark_invalidated()
+
+
+def _count(key):
+    cache = get_cache()
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+async def _acount(key):
+    cache = get_cache()
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aadd(key, 0, None)
+        await cache.aincr(key)
+
+
+def response_cache_stats():
+    cache = get_cache()
+    hits = cache.get(HITS_KEY) or 0
+    misses = cache.get(MISSES_KEY) or 0
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_ratio': hits / total if total else 0.0,
+    }
+
+
+def reset_response_cache_stats():
+    get_cache().delete_many([HITS_KEY, MISSES_KEY])
@@ -0,0 +1,37 @@
+"""
+記事アプリのシステムチェック。
+
+``manage.py check --database default`` と ``migrate`` の前に実行される（データベースを引くので
+``Tags.database`` にしている）。
+"""
+from django.core.checks import Error, Tags, register
+from django.db import connections
+from django.utils import timezone
+
+from . import partitions
+
+
+@register(Tags.database)
+def check_future_partitions(app_configs, databases=None, **kwargs):
+    """
+    DEFAULT パーティションはないので、先の期間のパーティションが切れると記事を投稿できなくなる。
+    現在から既定の期間数先までがそろっていなければエラーにして、デプロイの前に気付けるようにする。
+    """
+    errors = []
+    for alias in databases or []:
+        if not partitions.enabled(alias):
+            continue
+        interval = partitions.get_interval()
+        with connections[alias].cursor() as cursor:
+            if not partitions.is_partitioned(cursor):
+                continue
+            missing = partitions.missing_partitions_sql(
+                cursor, interval, timezone.now(), partitions.DEFAULT_AHEAD[interval],
+            )
+        if missing:
+            errors.append(Error(
+                f'{partitions.TABLE} の先の期間のパーティションが {len(missing)} 個足りません（{alias}）。',
+                hint='manage.py partition_articles create を実行してください（cron で毎日実行しておくこと）。',
+                id='articles.E001',
+            ))
+    return errors
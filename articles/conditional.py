@@ -0,0 +1,105 @@
+"""
+記事ページの条件付き GET（ETag / Last-Modified / 304）。
+
+テンプレートを描画する前に安価な検索で検証子を作り、クライアントの
+If-None-Match / If-Modified-Since と一致すれば 304 を返す。レスポンスキャッシュにあるページは
+保存しておいた検証子で答える（articles.pages）。
+
+ページには投稿者名も描かれるので、ETag には一覧の世代や投稿者の版（articles.cache）も含める。
+
+SHARED_PAGE_SHELL が有効なときは、ヘッダーのユーザー名やログアウトフォームを描かない「殻」で
+描画する（ログイン状態は accounts:session から JavaScript で読み込む）。ページは閲覧者によらず
+同じバイト列になるので、検証子を共通にし、CDN やリバースプロキシでの共有キャッシュを許可する。
+"""
+import hashlib
+from calendar import timegm
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from .text import CONTENT_RENDERER_VERSION
+
+
+def make_etag(*parts):
+    return quote_etag(hashlib.md5('|'.join(str(part) for part in parts).encode()).hexdigest())
+
+
+def shared_shell_enabled():
+    return getattr(settings, 'SHARED_PAGE_SHELL', False)
+
+
+def user_validator(user):
+    if shared_shell_enabled():
+        # user を評価するとセッションを読んで Vary: Cookie が付くので触らない
+        return 'shared'
+    # ヘッダーにユーザー名やログアウトフォームを含むので、閲覧者ごとに検証子を分ける
+    return user.pk if user.is_authenticated else 'anonymous'
+
+
+def list_validators(user, page, generation):
+    """
+    (id, created_at, updated_at) だけを引いた一覧ページと一覧の世代から検証子を作る。
+    行が削除されてもページ内の updated_at の最大値は動かないので、Last-Modified は付けない。
+    """
+    rows = [f"{row['id']}:{row['updated_at'].isoformat()}" for row in page]
+    etag = make_etag(user_validator(user), generation, page.has_next(), *rows)
+    return etag, None
+
+
+def detail_validators(user, pk, updated_at, versions):
+    etag = make_etag(user_validator(user), pk, updated_at.isoformat(), CONTENT_RENDERER_VERSION, *versions.values())
+    return etag, updated_at
+
+
+def _timestamp(last_modified):
+    return timegm(last_modified.utctimetuple()) if last_modified else None
+
+
+def not_modified_response(request, etag, last_modified):
+    """クライアントのキャッシュが有効なら 304（または 412）を、そうでなければ None を返す。"""
+    timestamp = _timestamp(last_modified)
+    if not (etag or timestamp):
+        return None
+    return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def set_validators(response, etag, last_modified):
+    if response.status_code != 200:
+        return response
+    timestamp = _timestamp(last_modified)
+    if etag:
+        response.headers.setdefault('ETag', etag)
+    if timestamp:
+        response.headers.setdefault('Last-Modified', http_date(timestamp))
+    patch_page_cache_control(response)
+    return response
+
+
+def patch_shared_cache_control(response):
+    # ブラウザは max-age を過ぎたら ETag で確認し、共有キャッシュは s-maxage の間そのまま返す。
+    # 期限切れ後も stale-while-revalidate の間は古い版を返しながら裏で取り直す
+    patch_cache_control(
+        response,
+        public=True,
+        max_age=getattr(settings, 'SHARED_PAGE_MAX_AGE', 0),
+        s_maxage=getattr(settings, 'SHARED_PAGE_S_MAXAGE', 60),
+        stale_while_revalidate=getattr(settings, 'SHARED_PAGE_STALE_WHILE_REVALIDATE', 300),
+    )
+
+
+def patch_page_cache_control(response):
+    if shared_shell_enabled():
+        patch_shared_cache_control(response)
+    else:
+        patch_cache_control(response, no_cache=True)
+        patch_vary_headers(response, ['Cookie'])
+
+
+class SharedShellMixin:
+    """テンプレートに ``shared_shell`` を渡し、SHARED_PAGE_SHELL が有効なら殻で描画させる。"""
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['shared_shell'] = shared_shell_enabled()
+        return context
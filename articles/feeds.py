@@ -0,0 +1,97 @@
+"""
+新着記事の RSS / Atom フィード。
+
+フィードリーダーは頻繁にポーリングしてくるので、生成した XML を一覧ページと同じ世代番号付きの
+キーでキャッシュする。記事が保存・削除されると世代が進み、次のリクエストで作り直される。
+"""
+import hashlib
+
+from django.contrib.syndication.views import Feed
+from django.http import HttpResponse
+from django.urls import reverse_lazy
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.feedgenerator import Atom1Feed
+from django.utils.http import parse_http_date_safe, quote_etag
+
+from .cache import get_cache, get_timeout, list_generation
+from .models import Article
+
+FEED_ITEMS = 30
+# フィードは閲覧者に依存しないので、共有キャッシュにも短時間置いてよい
+FEED_MAX_AGE = 60
+
+
+class CachedFeed(Feed):
+    cache_name = None
+
+    def feed_cache_key(self, request):
+        # リンクの絶対 URL がホスト名に依存するので、ホストごとに分ける
+        host = hashlib.md5(request.get_host().encode()).hexdigest()
+        return f'articles:feed:{self.cache_name}:{list_generation()}:{host}'
+
+    def __call__(self, request, *args, **kwargs):
+        cache = get_cache()
+        key = self.feed_cache_key(request)
+        cached = cache.get(key)
+        if cached is None:
+            response = super().__call__(request, *args, **kwargs)
+            cached = {
+                'content': response.content,
+                'content_type': response['Content-Type'],
+                'etag': quote_etag(hashlib.md5(response.content).hexdigest()),
+                'last_modified': response.get('Last-Modified'),
+            }
+            cache.set(key, cached, get_timeout())
+            status = 'MISS'
+        else:
+            status = 'HIT'
+
+        response = get_conditional_response(
+            request,
+            etag=cached['etag'],
+            last_modified=parse_http_date_safe(cached['last_modified']) if cached['last_modified'] else None,
+        )
+        if response is None:
+            response = HttpResponse(cached['content'], content_type=cached['content_type'])
+            response['X-Cache'] = status
+        response['ETag'] = cached['etag']
+        if cached['last_modified']:
+            response['Last-Modified'] = cached['last_modified']
+        patch_cache_control(response, public=True, max_age=FEED_MAX_AGE)
+        return response
+
+
+class LatestArticlesFeed(CachedFeed):
+    cache_name = 'rss'
+    title = 'Jazz Guitarist Paper 新着記事'
+    link = reverse_lazy('articles:list')
+    description = 'Jazz Guitarist Paper に投稿された新しい記事'
+
+    def items(self):
+        # 本文は読まず、抜粋と投稿者名だけを取得する
+        return (
+            Article.objects.select_related('author')
+            .only('title', 'excerpt', 'created_at', 'updated_at', 'author__username')
+            [:FEED_ITEMS]
+        )
+
+    def item_title(self, item):
+        return item.title
+
+    def item_description(self, item):
+        return item.excerpt
+
+    def item_author_name(self, item):
+        return item.author.username
+
+    def item_pubdate(self, item):
+        return item.created_at
+
+    def item_updateddate(self, item):
+        return item.updated_at
+
+
+class LatestArticlesAtomFeed(LatestArticlesFeed):
+    cache_name = 'atom'
+    feed_type = Atom1Feed
+    subtitle = LatestArticlesFeed.description
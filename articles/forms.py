@@ -21,3 +21,10 @@ class ArticleForm(forms.ModelForm):
             'title': 'タイトル',
             'content': '内容',
         }
+
+    def save(self, commit=True):
+        # 抜粋と語数は一覧にすぐ出るのでここで作る。本文の HTML は articles.tasks.render_html が生成する
+        self.instance.refresh_summary()
+        if 'content' in self.changed_data:
+            self.instance.mark_content_html_stale()
+        return super().save(commit=commit)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from articles.cache import reset_response_cache_stats, response_cache_stats
+
+
+class Command(BaseCommand):
+    help = '記事ページのレスポンスキャッシュのヒット数・ミス数を表示します。'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='表示後にカウンタをリセットします。')
+
+    def handle(self, *args, **options):
+        stats = response_cache_stats()
+        self.stdout.write(f"hits: {stats['hits']}")
+        self.stdout.write(f"misses: {stats['misses']}")
+        self.stdout.write(f"hit ratio: {stats['hit_ratio']:.1%}")
+        if options['reset']:
+            reset_response_cache_stats()
+            self.stdout.write(self.style.SUCCESS('カウンタをリセットしました。'))
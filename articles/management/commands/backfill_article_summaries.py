@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from articles.models import Article
+
+
+class Command(BaseCommand):
+    help = '既存記事の抜粋（excerpt）と語数（word_count）をまとめて計算し直します。'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='計算済みの記事も含めてすべて再計算します。',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = Article.objects.only('pk', 'content').order_by('pk')
+        if not options['all']:
+            queryset = queryset.filter(excerpt='')
+
+        updated = 0
+        last_pk = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            for article in batch:
+                article.refresh_summary()
+            with transaction.atomic():
+                Article.objects.bulk_update(batch, ['excerpt', 'word_count'])
+            last_pk = batch[-1].pk
+            updated += len(batch)
+            self.stdout.write(f'{updated} 件更新しました (id <= {last_pk})')
+
+        self.stdout.write(self.style.SUCCESS(f'完了: {updated} 件の記事を更新しました。'))
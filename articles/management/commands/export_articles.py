@@ -0,0 +1,113 @@
+import json
+import os
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from articles.models import Article
+from articles.transfer import BACKUP_FIELDS, FIELD_SOURCES, FORMATS, guess_format, serialize, value_sources
+
+
+class Command(BaseCommand):
+    help = (
+        '記事を JSON Lines / CSV で書き出します。サーバーサイドカーソルで id 順に流し読みするので、'
+        '件数が多くてもメモリ使用量は一定です。出力は import_articles で取り込めます。'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='出力先ファイル（- で標準出力）')
+        parser.add_argument('--format', choices=FORMATS, help='省略時は拡張子から判断します。')
+        parser.add_argument(
+            '--fields',
+            default=','.join(BACKUP_FIELDS),
+            help=f'出力する列（カンマ区切り）。選べる列: {", ".join(FIELD_SOURCES)}',
+        )
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument(
+            '--checkpoint',
+            help='書き出し済みの最後の id と出力ファイルのバイト位置を記録するファイル（既定: <path>.checkpoint）。',
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help=(
+                '出力ファイルをチェックポイントのバイト位置まで切り詰め（途中で切れた行を捨て）、'
+                'チェックポイントの id より後ろから追記します。'
+            ),
+        )
+
+    def handle(self, *args, **options):
+        fields = [field.strip() for field in options['fields'].split(',') if field.strip()]
+        unknown = set(fields) - set(FIELD_SOURCES)
+        if unknown:
+            raise CommandError(f'不明な列です: {", ".join(sorted(unknown))}')
+        # id 順に読み進めるので、再開用に id は必ず取得する
+        sources = list(dict.fromkeys(['id', *value_sources(fields)]))
+
+        to_stdout = options['path'] == '-'
+        path = Path(options['path'])
+        format = options['format'] or guess_format(path)
+        checkpoint = None if to_stdout else Path(options['checkpoint'] or f'{path}.checkpoint')
+
+        last_id = offset = 0
+        if options['resume']:
+            if checkpoint is None or not checkpoint.exists():
+                raise CommandError('再開できるチェックポイントがありません。')
+            if format == 'csv':
+                raise CommandError('CSV はヘッダー行が重複するため再開できません。JSON Lines を使ってください。')
+            saved = json.loads(checkpoint.read_text())
+            if 'offset' not in saved:
+                raise CommandError('チェックポイントにバイト位置がありません（古い形式）。最初から書き出し直してください。')
+            last_id, offset = saved['last_id'], saved['offset']
+            self.stderr.write(f'id {last_id} より後ろから再開します。')
+
+        rows = (
+            Article.objects.filter(pk__gt=last_id)
+            .order_by('pk')
+            .values(*sources)
+            .iterator(chunk_size=options['chunk_size'])
+        )
+
+        state = {'last_id': last_id, 'count': 0}
+
+        def tracked(rows):
+            for row in rows:
+                state['last_id'] = row['id']
+                state['count'] += 1
+                yield row
+
+        started = time.monotonic()
+        if to_stdout:
+            for line in serialize(tracked(rows), fields, format):
+                self.stdout.write(line, ending='')
+        else:
+            # チェックポイントには flush 済みのバイト位置を id と一緒に記録する。再開時はその位置まで
+            # 切り詰めるので、最後のチェックポイントより後ろに書かれた行（途中で切れた行を含む）は
+            # 捨てられて重複しない
+            with open(path, 'r+b' if options['resume'] else 'wb') as stream:
+                if options['resume']:
+                    stream.truncate(offset)
+                    stream.seek(offset)
+                for line in serialize(tracked(rows), fields, format):
+                    stream.write(line.encode('utf-8'))
+                    if state['count'] and state['count'] % options['chunk_size'] == 0:
+                        stream.flush()
+                        os.fsync(stream.fileno())
+                        save_checkpoint(checkpoint, state['last_id'], stream.tell())
+                        self.report_progress(state['count'], started)
+            checkpoint.unlink(missing_ok=True)
+
+        self.report_progress(state['count'], started)
+        self.stderr.write(self.style.SUCCESS(f"完了: {state['count']} 件を書き出しました。"))
+
+    def report_progress(self, count, started):
+        elapsed = time.monotonic() - started
+        self.stderr.write(f'{count} 件書き出し ({count / elapsed if elapsed else 0:.0f} 件/秒)')
+
+
+def save_checkpoint(checkpoint, last_id, offset):
+    # 書き込み中に止まっても壊れたチェックポイントが残らないよう、一時ファイルから置き換える
+    temporary = checkpoint.with_name(f'{checkpoint.name}.tmp')
+    temporary.write_text(json.dumps({'last_id': last_id, 'offset': offset}))
+    os.replace(temporary, checkpoint)
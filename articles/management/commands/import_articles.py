@@ -0,0 +1,150 @@
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from articles import authors, cache, search
+from articles.bulk import insert_articles
+from articles.models import Article, ImportCheckpoint
+from articles.transfer import FORMATS, InvalidRecord, clean_record, guess_format, read_records
+from jazz_guitarist_paper.routers import use_primary
+
+User = get_user_model()
+
+# 取り込めなかった行を 1 件ずつ表示する上限（それ以降は件数だけ数える）
+MAX_REPORTED_INVALID = 20
+
+
+class Command(BaseCommand):
+    help = (
+        'JSON Lines / CSV から記事を一括で取り込みます。ファイルは 1 行ずつ読み、'
+        'バッチごとに INSERT（PostgreSQL では COPY）で書き込みます。'
+        '投稿者は author_email 列のメールアドレスで解決します。'
+        '取り込めない行は読み飛ばして報告し、最後にエラーで終了します。'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='取り込むファイル（.jsonl / .csv）')
+        parser.add_argument('--format', choices=FORMATS, help='省略時は拡張子から判断します。')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--checkpoint',
+            help=(
+                '進捗の記録名（既定: ファイルの絶対パス）。進捗はデータベースに保存し、'
+                'バッチと同じトランザクションで更新します。'
+            ),
+        )
+        parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='チェックポイントに記録された件数を読み飛ばして続きから取り込みます。',
+        )
+        parser.add_argument('--no-copy', action='store_true', help='PostgreSQL でも COPY を使いません。')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f'{path} が見つかりません。')
+        format = options['format'] or guess_format(path)
+        batch_size = options['batch_size']
+        source = options['checkpoint'] or str(path.resolve())
+        use_copy = not options['no_copy']
+
+        skip = 0
+        if options['resume']:
+            with use_primary():
+                skip = ImportCheckpoint.objects.filter(source=source).values_list('records', flat=True).first() or 0
+            if skip:
+                self.stderr.write(f'{skip} 件目まで取り込み済みのため、続きから再開します。')
+
+        processed = skip
+        imported = invalid = 0
+        started = time.monotonic()
+
+        with open(path, encoding='utf-8', newline='') as stream:
+            records = islice(read_records(stream, format), skip, None)
+            while True:
+                batch = list(islice(records, batch_size))
+                if not batch:
+                    break
+                articles, errors = self.build_articles(batch, first_number=processed + 1)
+                for number, error in errors:
+                    invalid += 1
+                    if invalid <= MAX_REPORTED_INVALID:
+                        self.stderr.write(self.style.WARNING(f'{number} 件目を読み飛ばしました: {error}'))
+                with transaction.atomic():
+                    self.insert(articles, use_copy)
+                    # 一括投入はビューを通らないので、投稿者ごとの件数をまとめて足し込む
+                    authors.record_articles_created(articles)
+                    # 進捗も同じトランザクションで記録し、コミットされたバッチとずれないようにする
+                    ImportCheckpoint.objects.update_or_create(
+                        source=source, defaults={'records': processed + len(batch)},
+                    )
+                processed += len(batch)
+                imported += len(articles)
+
+                elapsed = time.monotonic() - started
+                self.stderr.write(
+                    f'{processed} 件処理 / {imported} 件取り込み / {invalid} 件スキップ '
+                    f'({imported / elapsed if elapsed else 0:.0f} 件/秒)'
+                )
+
+        # 一覧のキャッシュは新しい記事を含まないので世代を進める
+        cache.invalidate_articles([])
+        if not cache.is_shared():
+            self.stderr.write(self.style.WARNING(
+                'キャッシュがプロセスごと（LocMemCache）なので、Web プロセスの一覧ページは最大 '
+                f'{cache.get_timeout()} 秒間、取り込み前の内容のままです。REDIS_URL で共有キャッシュを設定してください。'
+            ))
+        ImportCheckpoint.objects.filter(source=source).delete()
+        elapsed = time.monotonic() - started
+        summary = f'{imported} 件を取り込みました（スキップ {invalid} 件、{elapsed:.1f} 秒）。'
+        if invalid:
+            raise CommandError(f'取り込めない行がありました: {summary}')
+        self.stdout.write(self.style.SUCCESS(f'完了: {summary}'))
+
+    def resolve_authors(self, emails):
+        emails = set(emails)
+        return dict(
+            User.objects.annotate(email_lower=Lower('email'))
+            .filter(email_lower__in=emails)
+            .values_list('email_lower', 'pk')
+        )
+
+    def build_articles(self, batch, first_number):
+        """検証を通ったレコードから記事を作る。戻り値は (記事, [(何件目か, 理由)])。"""
+        cleaned, errors = [], []
+        for number, record in enumerate(batch, first_number):
+            try:
+                cleaned.append((number, clean_record(record)))
+            except InvalidRecord as exc:
+                errors.append((number, str(exc)))
+        authors = self.resolve_authors(values['author_email'] for _, values in cleaned)
+        now = timezone.now()
+        articles = []
+        for number, values in cleaned:
+            author_id = authors.get(values['author_email'])
+            if author_id is None:
+                errors.append((number, f'投稿者が見つかりません: {values["author_email"]}'))
+                continue
+            article = Article(
+                author_id=author_id,
+                title=values['title'],
+                content=values['content'],
+                created_at=values['created_at'] or now,
+                updated_at=values['updated_at'] or now,
+            )
+            article.refresh_derived_fields()
+            articles.append(article)
+        errors.sort()
+        return articles, errors
+
+    def insert(self, articles, use_copy):
+        insert_articles(articles, use_copy=use_copy)
+        # SQLite では bulk_create が id を埋めるので、そのまま全文検索に登録できる
+        search.index_articles(articles)
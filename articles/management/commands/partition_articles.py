@@ -0,0 +1,141 @@
+from datetime import datetime, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, router, transaction
+from django.utils import timezone
+
+from articles import authors, cache, partitions
+from articles.models import Article
+
+
+def parse_date(value):
+    try:
+        return datetime.fromisoformat(value).replace(tzinfo=dt_timezone.utc)
+    except ValueError:
+        raise CommandError(f'日付は YYYY-MM-DD の形式で指定してください: {value}')
+
+
+class Command(BaseCommand):
+    help = (
+        '記事テーブルを created_at の範囲でパーティション分割します（PostgreSQL のみ、ARTICLE_PARTITIONING が必要）。'
+        'status: 一覧、convert: 既存テーブルの置き換え、create: 先の期間の作成、detach: 古い期間の切り離し。'
+    )
+
+    def add_arguments(self, parser):
+        subcommands = parser.add_subparsers(dest='subcommand')
+        subcommands.add_parser('status', help='パーティションと推定行数・サイズを表示します。')
+
+        convert = subcommands.add_parser(
+            'convert',
+            help='分割していない記事テーブルを分割済みのテーブルに置き換えます。終わるまで記事の読み書きが止まります。',
+        )
+        create = subcommands.add_parser('create', help='現在から --ahead 期間先までのパーティションを作ります。')
+        for subparser in (convert, create):
+            subparser.add_argument('--ahead', type=int, help='前もって作る期間の数（既定は月なら 3、年なら 1）')
+
+        detach = subcommands.add_parser('detach', help='上限が --before 以前のパーティションを切り離します。')
+        detach.add_argument('--before', required=True, help='この日付（YYYY-MM-DD）より前の期間を切り離します。')
+        target = detach.add_mutually_exclusive_group()
+        target.add_argument('--archive', metavar='SCHEMA', help='切り離したテーブルをこのスキーマへ移します。')
+        target.add_argument('--drop', action='store_true', help='切り離したテーブルを削除します。')
+
+        for subparser in (convert, create, detach):
+            subparser.add_argument('--print-sql', action='store_true', help='実行せずに SQL を表示します。')
+
+    def handle(self, *args, **options):
+        self.using = router.db_for_write(Article)
+        connection = connections[self.using]
+        if connection.vendor != 'postgresql':
+            raise CommandError('パーティション分割は PostgreSQL でだけ使えます（SQLite では 1 つのテーブルのままです）。')
+        self.interval = partitions.get_interval()
+        subcommand = options['subcommand'] or 'status'
+        if subcommand != 'status' and self.interval is None:
+            raise CommandError('ARTICLE_PARTITIONING に month か year を設定してください。')
+        getattr(self, subcommand)(connection, options)
+
+    def ahead(self, options):
+        return options['ahead'] if options['ahead'] is not None else partitions.DEFAULT_AHEAD[self.interval]
+
+    def execute_sql(self, connection, statements, options):
+        if options['print_sql']:
+            for statement in statements:
+                self.stdout.write(f'{statement.strip()};')
+            return False
+        with connection.cursor() as cursor:
+            for statement in statements:
+                cursor.execute(statement)
+        return True
+
+    def status(self, connection, options):
+        with connection.cursor() as cursor:
+            if not partitions.is_partitioned(cursor):
+                self.stdout.write(f'{partitions.TABLE} は分割されていません。')
+                return
+            rows = partitions.list_partitions(cursor)
+        for name, lower, upper, estimated, size in rows:
+            lower = f'{lower:%Y-%m-%d}' if lower else 'MINVALUE'
+            upper = f'{upper:%Y-%m-%d}' if upper else 'MAXVALUE'
+            self.stdout.write(f'{name:32} {lower:>10} 〜 {upper:>10}  約 {estimated} 行  {size / 1024 / 1024:.1f} MiB')
+
+    def convert(self, connection, options):
+        with transaction.atomic(using=self.using), connection.cursor() as cursor:
+            if partitions.is_partitioned(cursor):
+                raise CommandError(f'{partitions.TABLE} はすでに分割されています。')
+            referencing = partitions.referencing_tables(cursor)
+            if referencing:
+                raise CommandError(f'記事テーブルを外部キーで参照しているテーブルがあります: {", ".join(referencing)}')
+            statements = partitions.convert_sql(cursor, self.interval, timezone.now(), self.ahead(options))
+            if not self.execute_sql(connection, statements, options):
+                return
+        self.stdout.write(self.style.SUCCESS(f'{partitions.TABLE} を {self.interval} ごとのパーティションに分割しました。'))
+
+    def create(self, connection, options):
+        with transaction.atomic(using=self.using), connection.cursor() as cursor:
+            self.require_partitioned(cursor)
+            statements = partitions.missing_partitions_sql(cursor, self.interval, timezone.now(), self.ahead(options))
+            if not self.execute_sql(connection, statements, options):
+                return
+        self.stdout.write(self.style.SUCCESS(f'パーティションを {len(statements)} 個作成しました。'))
+
+    def detach(self, connection, options):
+        before = parse_date(options['before'])
+        if before > partitions.period_start(timezone.now(), self.interval):
+            raise CommandError('現在の期間を含むパーティションは切り離せません。')
+        with connection.cursor() as cursor:
+            self.require_partitioned(cursor)
+            names = [
+                name for name, lower, upper, *_ in partitions.list_partitions(cursor)
+                if upper is not None and upper <= before
+            ]
+        if not names:
+            self.stdout.write(f'{before:%Y-%m-%d} より前に終わるパーティションはありません。')
+            return
+        if options['print_sql']:
+            for name in names:
+                self.execute_sql(connection, partitions.detach_sql(name, options['archive'], options['drop']), options)
+            return
+
+        for name in names:
+            with transaction.atomic(using=self.using), connection.cursor() as cursor:
+                # 行を読み込まずに、投稿者ごとの件数だけを数える
+                cursor.execute(f'SELECT author_id, count(*) FROM {name} GROUP BY author_id')
+                counts = dict(cursor.fetchall())
+                for statement in partitions.detach_sql(name, options['archive'], options['drop']):
+                    cursor.execute(statement)
+                # 切り離した記事は投稿者の記事数から外れる
+                authors.record_articles_deleted(counts, using=self.using)
+                # 記事ごとに消さず、投稿者の版と一覧の世代を進めて詳細・一覧のキャッシュをまとめて無効にする
+                transaction.on_commit(
+                    lambda author_ids=list(counts): cache.invalidate_authors(author_ids), using=self.using,
+                )
+            self.stdout.write(f'{name} を切り離しました（記事 {sum(counts.values())} 件）。')
+        self.stdout.write(self.style.SUCCESS(f'パーティションを {len(names)} 個切り離しました。'))
+        if not cache.is_shared():
+            self.stderr.write(self.style.WARNING(
+                'キャッシュがプロセスごと（LocMemCache）なので、Web プロセスは切り離した記事のページを最大 '
+                f'{cache.get_timeout()} 秒間表示し続けます。REDIS_URL で共有キャッシュを設定してください。'
+            ))
+
+    def require_partitioned(self, cursor):
+        if not partitions.is_partitioned(cursor):
+            raise CommandError(f'{partitions.TABLE} は分割されていません。先に convert を実行してください。')
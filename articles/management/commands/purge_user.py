@@ -0,0 +1,71 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from articles import cache, purge, tasks
+from articles.models import Article
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'ユーザーの記事をバッチに分けて削除し、最後にユーザー自身を削除します。'
+        'バッチごとにコミットするので、途中で止めても再実行すれば続きから消えます。'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('users', nargs='+', type=int, metavar='USER_ID')
+        parser.add_argument('--batch-size', type=int, default=purge.PURGE_BATCH_SIZE)
+        parser.add_argument('--sleep', type=float, default=0, help='バッチの間に待つ秒数（レプリカの遅延を抑えたいとき）')
+        parser.add_argument('--keep-user', action='store_true', help='記事だけを削除し、ユーザーは残します。')
+        parser.add_argument('--background', action='store_true', help='その場では消さず、ジョブキューに入れます。')
+
+    def handle(self, *args, **options):
+        if options['background'] and not tasks.can_purge_in_background():
+            raise CommandError(
+                'キャッシュがプロセスごと（LocMemCache）なので、ジョブワーカーで消すと Web プロセスに削除した'
+                'ユーザーのページが残ります。REDIS_URL で共有キャッシュを設定してください。'
+            )
+        if not options['background'] and not cache.is_shared():
+            self.stderr.write(self.style.WARNING(
+                'キャッシュがプロセスごと（LocMemCache）なので、Web プロセスは削除した記事のページを最大 '
+                f'{cache.get_timeout()} 秒間表示し続けます。REDIS_URL で共有キャッシュを設定してください。'
+            ))
+        for user_id in options['users']:
+            user = User.objects.filter(pk=user_id).only('pk', 'email', 'article_count').first()
+            if user is None:
+                raise CommandError(f'ユーザー {user_id} は存在しません。')
+            if options['background']:
+                if options['keep_user']:
+                    raise CommandError('--background と --keep-user は同時に指定できません。')
+                tasks.enqueue_purge_user(user_id)
+                self.stdout.write(f'{user}（記事 {user.article_count} 件）の削除をジョブに入れました。')
+                continue
+            self.purge(user, options)
+
+    def purge(self, user, options):
+        started = time.monotonic()
+
+        def progress(deleted):
+            elapsed = time.monotonic() - started
+            remaining = max(user.article_count - deleted, 0)
+            self.stderr.write(
+                f'{user}: 記事 {deleted} 件を削除（残り約 {remaining} 件、{deleted / elapsed if elapsed else 0:.0f} 件/秒）'
+            )
+
+        if options['keep_user']:
+            deleted, _ = purge.purge_articles(
+                Article.objects.filter(author_id=user.pk),
+                batch_size=options['batch_size'],
+                sleep=options['sleep'],
+                progress=progress,
+            )
+            message = f'{user} の記事 {deleted} 件を削除しました'
+        else:
+            deleted, _ = purge.purge_user(
+                user.pk, batch_size=options['batch_size'], sleep=options['sleep'], progress=progress,
+            )
+            message = f'{user} と記事 {deleted} 件を削除しました'
+        self.stdout.write(self.style.SUCCESS(f'{message}（{time.monotonic() - started:.1f} 秒）。'))
@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from articles.models import Article
+from articles.text import CONTENT_RENDERER_VERSION
+
+
+class Command(BaseCommand):
+    help = '記事本文の HTML（content_html）をまとめて生成し直します。'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='現在の版で生成済みの記事も含めてすべて生成し直します。',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = Article.objects.only('pk', 'content').order_by('pk')
+        if not options['all']:
+            queryset = queryset.exclude(content_html_version=CONTENT_RENDERER_VERSION)
+
+        updated = 0
+        last_pk = 0
+        while True:
+            batch = list(queryset.filter(pk__gt=last_pk)[:batch_size])
+            if not batch:
+                break
+            for article in batch:
+                article.render_content()
+            with transaction.atomic():
+                Article.objects.bulk_update(batch, ['content_html', 'content_html_version'])
+            last_pk = batch[-1].pk
+            updated += len(batch)
+            self.stdout.write(f'{updated} 件更新しました (id <= {last_pk})')
+
+        self.stdout.write(self.style.SUCCESS(
+            f'完了: {updated} 件の記事をバージョン {CONTENT_RENDERER_VERSION} で生成しました。'
+        ))
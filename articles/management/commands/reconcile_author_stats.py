@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from articles import authors
+
+
+class Command(BaseCommand):
+    help = (
+        '記事テーブルから投稿者ごとの記事数と最新投稿日時を数え直し、'
+        'accounts.User の非正規化フィールドとずれている分を修正します。'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--user', type=int, action='append', dest='user_ids', help='対象のユーザー ID（複数指定可）')
+
+    def handle(self, *args, **options):
+        fixed = authors.reconcile(options['user_ids'], batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'{fixed} 人の記事数・最新投稿日時を修正しました。'))
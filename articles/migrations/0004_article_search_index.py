@@ -0,0 +1,60 @@
+import django.db.models.deletion
+from django.db import migrations, models
+
+SQLITE_FORWARD = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS articles_article_fts "
+    "USING fts5(title, content, tokenize='trigram')",
+    "INSERT INTO articles_article_fts (rowid, title, content) "
+    "SELECT id, title, content FROM articles_article",
+]
+SQLITE_BACKWARD = [
+    "DROP TABLE IF EXISTS articles_article_fts",
+]
+
+POSTGRESQL_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS article_title_trgm_idx "
+    "ON articles_article USING gin (title gin_trgm_ops)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS article_content_trgm_idx "
+    "ON articles_article USING gin (content gin_trgm_ops)",
+]
+POSTGRESQL_BACKWARD = [
+    "DROP INDEX CONCURRENTLY IF EXISTS article_content_trgm_idx",
+    "DROP INDEX CONCURRENTLY IF EXISTS article_title_trgm_idx",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        for sql in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(sql)
+    return run
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY はトランザクション内で実行できない
+    atomic = False
+
+    dependencies = [
+        ('articles', '0003_article_excerpt_word_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            _run({'postgresql': POSTGRESQL_FORWARD, 'sqlite': SQLITE_FORWARD}),
+            _run({'postgresql': POSTGRESQL_BACKWARD, 'sqlite': SQLITE_BACKWARD}),
+        ),
+        # 上で作った FTS5 テーブルを検索時に JOIN するための管理外モデル（テーブルは作らない）
+        migrations.CreateModel(
+            name='ArticleSearchIndex',
+            fields=[
+                ('article', models.OneToOneField(db_column='rowid', db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, primary_key=True, related_name='search_index', serialize=False, to='articles.article')),
+                ('title', models.TextField()),
+                ('content', models.TextField()),
+            ],
+            options={
+                'db_table': 'articles_article_fts',
+                'managed': False,
+            },
+        ),
+    ]
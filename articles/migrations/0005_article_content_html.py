@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-17 01:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0004_article_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='article',
+            name='content_html',
+            field=models.TextField(blank=True, editable=False, verbose_name='内容（HTML）'),
+        ),
+        migrations.AddField(
+            model_name='article',
+            name='content_html_version',
+            field=models.PositiveSmallIntegerField(default=0, editable=False, verbose_name='HTML 生成バージョン'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-17 02:18
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_author_stats(apps, schema_editor):
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    Article = apps.get_model('articles', 'Article')
+    db = schema_editor.connection.alias
+    articles = Article.objects.using(db).filter(author=OuterRef('pk')).order_by()
+    User.objects.using(db).update(
+        article_count=Coalesce(
+            Subquery(articles.values('author').annotate(count=Count('pk')).values('count')), 0,
+        ),
+        latest_article_at=Subquery(articles.order_by('-created_at').values('created_at')[:1]),
+    )
+
+
+class Migration(migrations.Migration):
+
+    # 0008_article_author_created_idx として出していたものを改名した。適用済みのデータベースでは適用済みとして扱う
+    replaces = [('articles', '0008_article_author_created_idx')]
+
+    dependencies = [
+        ('articles', '0006_article_updated_id_idx'),
+        ('accounts', '0003_user_article_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='article',
+            index=models.Index(fields=['author', '-created_at', '-id'], name='article_author_created_idx'),
+        ),
+        migrations.RunPython(populate_author_stats, migrations.RunPython.noop),
+    ]
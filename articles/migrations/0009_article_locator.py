@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-17 02:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0007_article_author_created_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleLocator',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('created_at', models.DateTimeField()),
+            ],
+            options={
+                'db_table': 'articles_article_locator',
+                'managed': False,
+            },
+        ),
+    ]
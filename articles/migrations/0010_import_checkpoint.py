@@ -0,0 +1,26 @@
+# Generated by Django 5.2.6 on 2026-10-17 03:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('articles', '0009_article_locator'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(max_length=500, unique=True, verbose_name='取り込み元')),
+                ('records', models.PositiveBigIntegerField(default=0, verbose_name='処理済みの行数')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='更新日時')),
+            ],
+            options={
+                'verbose_name': '取り込みの進捗',
+                'verbose_name_plural': '取り込みの進捗',
+            },
+        ),
+    ]
@@ -1,6 +1,9 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from django.urls import reverse
+from django.utils.safestring import mark_safe
+
+from .text import CONTENT_RENDERER_VERSION, count_words, make_excerpt, render_content_html
 
 User = get_user_model()
 
@@ -17,6 +20,27 @@ class Article(models.Model):
     content = models.TextField(
         verbose_name="内容"
     )
+    excerpt = models.CharField(
+        max_length=200,
+        blank=True,
+        editable=False,
+        verbose_name="抜粋"
+    )
+    word_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="語数"
+    )
+    content_html = models.TextField(
+        blank=True,
+        editable=False,
+        verbose_name="内容（HTML）"
+    )
+    content_html_version = models.PositiveSmallIntegerField(
+        default=0,
+        editable=False,
+        verbose_name="HTML 生成バージョン"
+    )
     created_at = models.DateTimeField(
         auto_now_add=True,
         verbose_name="作成日時"
@@ -27,12 +51,95 @@ class Article(models.Model):
     )
 
     class Meta:
-        ordering = ['-created_at']
+        ordering = ['-created_at', '-id']
+        indexes = [
+            models.Index(fields=['-created_at', '-id'], name='article_created_id_idx'),
+            models.Index(fields=['updated_at', 'id'], name='article_updated_id_idx'),
+            models.Index(fields=['author', '-created_at', '-id'], name='article_author_created_idx'),
+        ]
         verbose_name = "記事"
         verbose_name_plural = "記事"
 
     def __str__(self):
         return self.title
 
+    def refresh_summary(self):
+        self.excerpt = make_excerpt(self.content)
+        self.word_count = count_words(self.content)
+
+    def render_content(self):
+        self.content_html = render_content_html(self.content)
+        self.content_html_version = CONTENT_RENDERER_VERSION
+
+    def mark_content_html_stale(self):
+        # 0 はどの版でもないので、次に表示されるときかジョブで生成し直される
+        self.content_html_version = 0
+
+    def refresh_derived_fields(self):
+        self.refresh_summary()
+        self.render_content()
+
+    @property
+    def content_html_is_current(self):
+        return self.content_html_version == CONTENT_RENDERER_VERSION
+
+    @property
+    def rendered_content(self):
+        if not self.content_html_is_current:
+            self.render_content()
+        return mark_safe(self.content_html)
+
     def get_absolute_url(self):
         return reverse('articles:detail', kwargs={'pk': self.pk})
+
+
+class ArticleSearchIndex(models.Model):
+    """
+    SQLite の全文検索用 FTS5 仮想テーブル（マイグレーション 0004 で作成）。
+    検索時に記事テーブルと JOIN するためだけに定義しており、PostgreSQL には存在しない。
+    """
+    article = models.OneToOneField(
+        Article,
+        on_delete=models.DO_NOTHING,
+        primary_key=True,
+        db_column='rowid',
+        db_constraint=False,
+        related_name='search_index',
+    )
+    title = models.TextField()
+    content = models.TextField()
+
+    class Meta:
+        managed = False
+        db_table = 'articles_article_fts'
+
+
+class ArticleLocator(models.Model):
+    """
+    記事 ID から作成日時を引く表（PostgreSQL でパーティション分割したときだけ存在する）。
+    ``manage.py partition_articles convert`` が作り、記事テーブルのトリガーで同期する。
+    pk で 1 件を引くクエリに作成日時の条件を足し、1 つのパーティションだけを読ませるために使う。
+    """
+    id = models.BigIntegerField(primary_key=True)
+    created_at = models.DateTimeField()
+
+    class Meta:
+        managed = False
+        db_table = 'articles_article_locator'
+
+
+class ImportCheckpoint(models.Model):
+    """
+    ``manage.py import_articles`` の進捗。取り込んだバッチと同じトランザクションで更新するので、
+    途中で止まっても記録とデータベースの内容がずれない（再開時に同じバッチを二重に取り込まない）。
+    """
+    source = models.CharField(max_length=500, unique=True, verbose_name="取り込み元")
+    records = models.PositiveBigIntegerField(default=0, verbose_name="処理済みの行数")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="更新日時")
+
+    class Meta:
+        verbose_name = "取り込みの進捗"
+        verbose_name_plural = "取り込みの進捗"
+
+    def __str__(self):
+        return f'{self.source} ({self.records})'
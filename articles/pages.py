@@ -0,0 +1,211 @@
+"""
+記事一覧・詳細ページを返す手順（条件付き GET → レスポンスキャッシュ → 描画）。
+
+同期ビュー（``CachedPageMixin``）と ASGI 用の非同期ビューは、どちらもこのモジュールの
+``serve`` / ``aserve`` を通る。検証子やキャッシュの扱いを変えるときはここだけを直す。
+"""
+from contextlib import nullcontext
+
+from django.http import Http404
+
+from jazz_guitarist_paper.routers import use_primary
+
+from . import partitions
+from .cache import (
+    aget_cached,
+    arecently_invalidated,
+    astore_response,
+    cached_response,
+    get_cached,
+    recently_invalidated,
+    store_response,
+)
+from .conditional import not_modified_response, set_validators, shared_shell_enabled
+from .models import Article
+from .pagination import InvalidCursor, KeysetPaginator
+
+# 一覧ページの検証子を作るときに引く列
+LIST_VALIDATOR_FIELDS = ('id', 'created_at', 'updated_at')
+
+
+def page_user(request):
+    """殻で描画するときは None を、そうでなければ request.user を返す。"""
+    return None if shared_shell_enabled() else request.user
+
+
+async def resolve_user(request):
+    """page_user の非同期版。ユーザーは非同期に解決する。"""
+    if shared_shell_enabled():
+        return None
+    return await request.auser()
+
+
+def cacheable(user):
+    # 殻（user が None）か匿名ユーザーなら、全員に同じレスポンスを返せる
+    return user is None or not user.is_authenticated
+
+
+def shell_context(user, context):
+    if user is None:
+        context['shared_shell'] = True
+    else:
+        # request.user はテンプレートで評価すると同期 ORM を呼ぶので、解決済みのユーザーを渡す
+        context['user'] = user
+    return context
+
+
+def validate_cursor(cursor, ordering):
+    """カーソルを検証して返す（最初のページは空文字列）。壊れていれば 404。"""
+    if cursor:
+        try:
+            KeysetPaginator(Article.objects.none(), 1, ordering=ordering).decode_cursor(cursor)
+        except InvalidCursor:
+            raise Http404('無効なページです。')
+    return cursor or ''
+
+
+def paginate(queryset, cursor, per_page, ordering):
+    paginator = KeysetPaginator(queryset, per_page, ordering=ordering)
+    try:
+        return paginator, paginator.page(cursor)
+    except InvalidCursor:
+        raise Http404('無効なページです。')
+
+
+async def apaginate(queryset, cursor, per_page, ordering):
+    paginator = KeysetPaginator(queryset, per_page, ordering=ordering)
+    try:
+        return paginator, await paginator.apage(cursor)
+    except InvalidCursor:
+        raise Http404('無効なページです。')
+
+
+def list_context(paginator, page):
+    """ListView が作るのと同じ一覧テンプレートのコンテキスト。"""
+    return {
+        'articles': page.object_list,
+        'object_list': page.object_list,
+        'paginator': paginator,
+        'page_obj': page,
+        'is_paginated': page.has_other_pages(),
+    }
+
+
+def detail_validator_queryset(pk):
+    return partitions.filter_pk(Article.objects.all(), pk).values_list('updated_at', 'author_id')
+
+
+def _current_row(article):
+    # created_at も条件にして、分割しているときは 1 つのパーティションだけを更新させる
+    return Article.objects.filter(pk=article.pk, created_at=article.created_at)
+
+
+def refresh_content_html(article):
+    """古い版で生成された HTML を一度だけ描き直して保存する（updated_at は変えない）。"""
+    if article.content_html_is_current:
+        return
+    article.render_content()
+    _current_row(article).update(
+        content_html=article.content_html,
+        content_html_version=article.content_html_version,
+    )
+
+
+async def arefresh_content_html(article):
+    if article.content_html_is_current:
+        return
+    current = _current_row(article)
+    # 本文は defer しているので、非同期では遅延読み込みに頼らず明示的に引く
+    article.content = await current.values_list('content', flat=True).aget()
+    article.render_content()
+    await current.aupdate(
+        content_html=article.content_html,
+        content_html_version=article.content_html_version,
+    )
+
+
+def _store_after_render(cache_key, response, etag, last_modified, versions):
+    if hasattr(response, 'add_post_render_callback'):
+        response.add_post_render_callback(
+            lambda rendered: store_response(cache_key, rendered, etag, last_modified, versions)
+        )
+    else:
+        store_response(cache_key, response, etag, last_modified, versions)
+
+
+def _finish(response, etag, last_modified):
+    # 検証子のないページ（投稿者ページ）は Cache-Control も変えない
+    if etag or last_modified:
+        return set_validators(response, etag, last_modified)
+    return response
+
+
+def _from_cache(request, cached):
+    etag, last_modified = cached['etag'], cached['last_modified']
+    response = not_modified_response(request, etag, last_modified) or cached_response(cached)
+    return _finish(response, etag, last_modified)
+
+
+def _reads(from_primary):
+    return use_primary() if from_primary else nullcontext()
+
+
+def serve(request, validators, cache_key, render):
+    """
+    ``cache_key`` があればまずキャッシュを引き、保存しておいた検証子で条件付き GET に答える。
+    なければ ``validators()`` が返す ``(etag, last_modified, versions)`` で答え、``render()`` で
+    描画したページを検証子と一緒に保存する。
+    """
+    cached = get_cached(cache_key) if cache_key else None
+    if cached is not None:
+        return _from_cache(request, cached)
+    # 無効にした直後にレプリカから読むと、書き込み前の内容でキャッシュを埋め直してしまう
+    with _reads(cache_key is not None and recently_invalidated()):
+        etag, last_modified, versions = validators()
+        response = not_modified_response(request, etag, last_modified)
+        if response is not None:
+            return response
+        response = render()
+        if cache_key:
+            _store_after_render(cache_key, response, etag, last_modified, versions)
+    return _finish(response, etag, last_modified)
+
+
+async def aserve(request, validators, cache_key, render):
+    """serve の非同期版。``validators`` と ``render`` はコルーチン関数。"""
+    cached = await aget_cached(cache_key) if cache_key else None
+    if cached is not None:
+        return _from_cache(request, cached)
+    with _reads(cache_key is not None and await arecently_invalidated()):
+        etag, last_modified, versions = await validators()
+        response = not_modified_response(request, etag, last_modified)
+        if response is not None:
+            return response
+        response = await render()
+        if cache_key:
+            await astore_response(cache_key, response, etag, last_modified, versions)
+    return _finish(response, etag, last_modified)
+
+
+class CachedPageMixin:
+    """
+    ビューの ``get`` を ``serve`` に通す。``get_response_cache_key`` を実装すること。
+    条件付き GET に答えるビューやキャッシュを投稿者の版と照合するビューは
+    ``get_conditional_validators`` で ``(etag, last_modified, versions)`` を返す。
+    SHARED_PAGE_SHELL が有効なら（SharedShellMixin と組み合わせて）全員に同じレスポンスを返す。
+    """
+
+    def get_response_cache_key(self):
+        raise NotImplementedError
+
+    def get_conditional_validators(self):
+        return None, None, {}
+
+    def get(self, request, *args, **kwargs):
+        cache_key = self.get_response_cache_key() if cacheable(page_user(request)) else None
+        return serve(
+            request,
+            self.get_conditional_validators,
+            cache_key,
+            lambda: super(CachedPageMixin, self).get(request, *args, **kwargs),
+        )
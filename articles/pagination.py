@@ -0,0 +1,141 @@
+import base64
+import binascii
+import datetime
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _json_default(value):
+    # DjangoJSONEncoder はマイクロ秒をミリ秒に丸めてしまい、境界行の比較がずれるため使わない
+    if isinstance(value, (datetime.datetime, datetime.date, datetime.time)):
+        return value.isoformat()
+    return str(value)
+
+
+class CursorPage:
+    def __init__(self, object_list, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class KeysetPaginator:
+    """
+    (created_at, id) のような複合キーで並べたクエリセットを、OFFSET も COUNT(*) も
+    使わずにページ分割する。カーソルは境界行のキー値を base64 で包んだ不透明なトークン。
+    キーの最後は一意な列（通常は id）にすること。
+    """
+
+    def __init__(self, queryset, per_page, ordering=('-created_at', '-id')):
+        self.queryset = queryset
+        self.per_page = int(per_page)
+        self.ordering = tuple(ordering)
+        self.keys = tuple(key.lstrip('-') for key in self.ordering)
+
+    def page(self, cursor=None):
+        queryset, backwards = self._page_queryset(cursor)
+        return self._build_page(list(queryset), cursor, backwards)
+
+    async def apage(self, cursor=None):
+        queryset, backwards = self._page_queryset(cursor)
+        return self._build_page([obj async for obj in queryset], cursor, backwards)
+
+    def _page_queryset(self, cursor):
+        backwards = False
+        queryset = self.queryset
+        ordering = self.ordering
+        if cursor:
+            direction, values = self.decode_cursor(cursor)
+            backwards = direction == 'prev'
+            if backwards:
+                ordering = tuple(self._reverse(key) for key in ordering)
+            queryset = queryset.filter(self._after(values, ordering))
+        return queryset.order_by(*ordering)[:self.per_page + 1], backwards
+
+    def _build_page(self, rows, cursor, backwards):
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if backwards:
+            rows.reverse()
+        if not rows:
+            return CursorPage(rows)
+
+        next_cursor = previous_cursor = None
+        if has_more or backwards:
+            next_cursor = self.encode_cursor('next', rows[-1])
+        if cursor and (has_more or not backwards):
+            previous_cursor = self.encode_cursor('prev', rows[0])
+        return CursorPage(rows, next_cursor, previous_cursor)
+
+    def encode_cursor(self, direction, obj):
+        values = [self._key_value(obj, key) for key in self.keys]
+        payload = json.dumps([direction, values], default=_json_default, separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            direction, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        except (binascii.Error, UnicodeDecodeError, ValueError, TypeError):
+            raise InvalidCursor(cursor)
+        if direction not in ('next', 'prev') or not isinstance(values, list) or len(values) != len(self.keys):
+            raise InvalidCursor(cursor)
+        try:
+            return direction, [self._to_python(key, value) for key, value in zip(self.keys, values)]
+        except ValidationError:
+            raise InvalidCursor(cursor)
+
+    def _after(self, values, ordering):
+        # (a, b) < (x, y)  =>  a <= x AND (a < x OR (a = x AND b < y))
+        condition = Q()
+        for index, key in enumerate(ordering):
+            name = key.lstrip('-')
+            lookup = 'lt' if key.startswith('-') else 'gt'
+            clause = Q(**{f'{name}__{lookup}': values[index]})
+            for previous, value in zip(self.keys[:index], values):
+                clause &= Q(**{previous: value})
+            condition |= clause
+        if len(ordering) > 1:
+            # OR だけでは先頭キーの範囲がインデックスに渡らないので、冗長な a <= x を AND で足して
+            # (-created_at, -id) のインデックスを範囲スキャンさせる
+            first = ordering[0]
+            lookup = 'lte' if first.startswith('-') else 'gte'
+            condition = Q(**{f'{first.lstrip("-")}__{lookup}': values[0]}) & condition
+        return condition
+
+    def _key_value(self, obj, key):
+        if isinstance(obj, dict):
+            return obj[key]
+        return getattr(obj, key)
+
+    def _to_python(self, key, value):
+        try:
+            field = self.queryset.model._meta.get_field(key)
+        except FieldDoesNotExist:
+            return value
+        return field.to_python(value)
+
+    @staticmethod
+    def _reverse(key):
+        return key[1:] if key.startswith('-') else f'-{key}'
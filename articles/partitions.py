@@ -0,0 +1,242 @@
+"""
+記事テーブルを PostgreSQL の範囲パーティションで created_at ごと（月または年）に分割する（任意）。
+
+``ARTICLE_PARTITIONING`` に ``month`` か ``year`` を設定し、``manage.py partition_articles convert`` で
+既存のテーブルを分割済みのテーブルに置き換える。その後は ``partition_articles create`` で先の期間の
+パーティションを作り足し、``partition_articles detach`` で古い期間を切り離す（またはアーカイブする）。
+
+- 一覧はキーセットの条件（created_at < ...）と並び順でパーティションが絞られる。
+- pk で 1 件を引くクエリは ``filter_pk`` を通す。id → created_at の表（ArticleLocator）を引く
+  副問い合わせを条件に足すので、実行時に 1 つのパーティションだけを読む。
+- 主キーにはパーティションキーを含める必要があるので (id, created_at) になる。id の一意性は
+  シーケンスが保証する。
+- DEFAULT パーティションは作らない（あると一覧の順序どおりの読み出しが使えなくなる）。最初の期間より
+  前は MINVALUE からの 1 つのパーティションに入れ、先の期間は create で前もって作っておく。
+
+SQLite や設定がない場合は、これまでどおり 1 つのテーブルのまま。
+"""
+import re
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import connections
+from django.db.models import Subquery
+
+from .models import Article, ArticleLocator
+
+INTERVALS = ('month', 'year')
+DEFAULT_AHEAD = {'month': 3, 'year': 1}
+TABLE = Article._meta.db_table
+LOCATOR_TABLE = ArticleLocator._meta.db_table
+SEQUENCE = f'{TABLE}_id_seq'
+UNPARTITIONED_TABLE = f'{TABLE}_unpartitioned'
+BEFORE_PARTITION = f'{TABLE}_p_before'
+LOCATOR_FUNCTION = f'{TABLE}_locate'
+BOUND_PATTERN = re.compile(r"FOR VALUES FROM \((MINVALUE|'[^']+')\) TO \((MAXVALUE|'[^']+')\)")
+
+
+def get_interval():
+    interval = getattr(settings, 'ARTICLE_PARTITIONING', '') or None
+    if interval not in (None, *INTERVALS):
+        raise ImproperlyConfigured(f'ARTICLE_PARTITIONING は {" / ".join(INTERVALS)} のどちらかにしてください。')
+    return interval
+
+
+def enabled(using):
+    return get_interval() is not None and connections[using].vendor == 'postgresql'
+
+
+def filter_pk(queryset, pk):
+    """pk で 1 件に絞る。分割しているときは作成日時の条件も足し、読むパーティションを 1 つにする。"""
+    queryset = queryset.filter(pk=pk)
+    if enabled(queryset.db):
+        created_at = ArticleLocator.objects.using(queryset.db).filter(pk=pk).values('created_at')[:1]
+        queryset = queryset.filter(created_at=Subquery(created_at))
+    return queryset
+
+
+def period_start(moment, interval):
+    moment = moment.astimezone(dt_timezone.utc)
+    return datetime(moment.year, 1 if interval == 'year' else moment.month, 1, tzinfo=dt_timezone.utc)
+
+
+def next_period(start, interval):
+    if interval == 'year':
+        return start.replace(year=start.year + 1)
+    if start.month == 12:
+        return start.replace(year=start.year + 1, month=1)
+    return start.replace(month=start.month + 1)
+
+
+def periods(first, last, interval):
+    """``first`` から ``last`` を含む期間までの開始日時を順に返す。"""
+    start = period_start(first, interval)
+    last = period_start(last, interval)
+    while start <= last:
+        yield start
+        start = next_period(start, interval)
+
+
+def partition_name(start, interval):
+    return f'{TABLE}_p{start:%Y}' if interval == 'year' else f'{TABLE}_p{start:%Y_%m}'
+
+
+def _literal(moment):
+    return f"'{moment:%Y-%m-%d %H:%M:%S}+00'"
+
+
+def create_partition_sql(start, interval):
+    return (
+        f'CREATE TABLE IF NOT EXISTS {partition_name(start, interval)} PARTITION OF {TABLE} '
+        f'FOR VALUES FROM ({_literal(start)}) TO ({_literal(next_period(start, interval))})'
+    )
+
+
+def _parse_bound(value):
+    if value in ('MINVALUE', 'MAXVALUE'):
+        return None
+    return datetime.fromisoformat(value.strip("'"))
+
+
+def is_partitioned(cursor):
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", [TABLE])
+    row = cursor.fetchone()
+    return bool(row) and row[0] == 'p'
+
+
+def list_partitions(cursor):
+    """``(名前, 下限, 上限, 推定行数, バイト数)`` を下限の順に返す。MINVALUE の下限は None。"""
+    cursor.execute(
+        """
+        SELECT child.relname, pg_get_expr(child.relpartbound, child.oid), child.reltuples::bigint,
+               pg_total_relation_size(child.oid)
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = to_regclass(%s)
+        """,
+        [TABLE],
+    )
+    partitions = []
+    for name, bound, rows, size in cursor.fetchall():
+        match = BOUND_PATTERN.match(bound)
+        if match is None:
+            continue
+        lower, upper = (_parse_bound(value) for value in match.groups())
+        partitions.append((name, lower, upper, max(rows, 0), size))
+    return sorted(partitions, key=lambda partition: (partition[1] is not None, partition[1] or 0))
+
+
+def _existing_definitions(cursor):
+    """主キー以外のインデックスと外部キー制約の定義。新しいテーブルに同じ名前で作り直す。"""
+    cursor.execute(
+        """
+        SELECT indexdef FROM pg_indexes
+        WHERE schemaname = current_schema() AND tablename = %s
+          AND indexname NOT IN (SELECT conname FROM pg_constraint WHERE conrelid = to_regclass(%s) AND contype = 'p')
+        ORDER BY indexname
+        """,
+        [TABLE, TABLE],
+    )
+    indexes = [row[0] for row in cursor.fetchall()]
+    cursor.execute(
+        "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = to_regclass(%s) AND contype = 'f' ORDER BY conname",
+        [TABLE],
+    )
+    foreign_keys = [f'ALTER TABLE {TABLE} ADD CONSTRAINT {name} {definition}' for name, definition in cursor.fetchall()]
+    return indexes, foreign_keys
+
+
+def referencing_tables(cursor):
+    cursor.execute(
+        "SELECT DISTINCT conrelid::regclass::text FROM pg_constraint "
+        "WHERE confrelid = to_regclass(%s) AND contype = 'f'",
+        [TABLE],
+    )
+    return [row[0] for row in cursor.fetchall()]
+
+
+def convert_sql(cursor, interval, now, ahead):
+    """
+    分割していない記事テーブルを分割済みのテーブルに置き換える SQL を返す。
+    1 つのトランザクションで実行し、その間は記事テーブルへの読み書きが止まる。
+    """
+    cursor.execute(f'SELECT min(created_at) FROM {TABLE}')
+    first = cursor.fetchone()[0] or now
+    last = now
+    for _ in range(ahead):
+        last = next_period(period_start(last, interval), interval)
+    starts = list(periods(first, last, interval))
+    indexes, foreign_keys = _existing_definitions(cursor)
+
+    return [
+        f'LOCK TABLE {TABLE} IN ACCESS EXCLUSIVE MODE',
+        f'ALTER TABLE {TABLE} RENAME TO {UNPARTITIONED_TABLE}',
+        # id の IDENTITY とインデックスは写さず、データを入れた後で作る
+        f'CREATE TABLE {TABLE} (LIKE {UNPARTITIONED_TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS '
+        f'INCLUDING STORAGE INCLUDING COMMENTS) PARTITION BY RANGE (created_at)',
+        f'CREATE TABLE {BEFORE_PARTITION} PARTITION OF {TABLE} '
+        f'FOR VALUES FROM (MINVALUE) TO ({_literal(starts[0])})',
+        *(create_partition_sql(start, interval) for start in starts),
+        f'INSERT INTO {TABLE} SELECT * FROM {UNPARTITIONED_TABLE}',
+        f'CREATE TABLE IF NOT EXISTS {LOCATOR_TABLE} '
+        '(id bigint PRIMARY KEY, created_at timestamp with time zone NOT NULL)',
+        f'TRUNCATE {LOCATOR_TABLE}',
+        f'INSERT INTO {LOCATOR_TABLE} (id, created_at) SELECT id, created_at FROM {UNPARTITIONED_TABLE}',
+        f'CREATE SEQUENCE {SEQUENCE}_new',
+        f"SELECT setval('{SEQUENCE}_new', (SELECT coalesce(max(id), 0) + 1 FROM {UNPARTITIONED_TABLE}), false)",
+        f'DROP TABLE {UNPARTITIONED_TABLE}',
+        f'ALTER SEQUENCE {SEQUENCE}_new RENAME TO {SEQUENCE}',
+        f"ALTER TABLE {TABLE} ALTER COLUMN id SET DEFAULT nextval('{SEQUENCE}')",
+        f'ALTER SEQUENCE {SEQUENCE} OWNED BY {TABLE}.id',
+        f'ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_pkey PRIMARY KEY (id, created_at)',
+        *indexes,
+        *foreign_keys,
+        f"""
+        CREATE OR REPLACE FUNCTION {LOCATOR_FUNCTION}() RETURNS trigger LANGUAGE plpgsql AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                DELETE FROM {LOCATOR_TABLE} WHERE id = OLD.id;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO {LOCATOR_TABLE} (id, created_at) VALUES (NEW.id, NEW.created_at);
+            END IF;
+            RETURN NULL;
+        END
+        $$
+        """,
+        f'CREATE TRIGGER {LOCATOR_FUNCTION} AFTER INSERT OR DELETE OR UPDATE OF id, created_at ON {TABLE} '
+        f'FOR EACH ROW EXECUTE FUNCTION {LOCATOR_FUNCTION}()',
+        f'ANALYZE {TABLE}',
+        f'ANALYZE {LOCATOR_TABLE}',
+    ]
+
+
+def missing_partitions_sql(cursor, interval, now, ahead):
+    """現在の期間から ``ahead`` 期間先までで、まだないパーティションを作る SQL を返す。"""
+    existing = {name for name, *_ in list_partitions(cursor)}
+    last = now
+    for _ in range(ahead):
+        last = next_period(period_start(last, interval), interval)
+    return [
+        create_partition_sql(start, interval)
+        for start in periods(now, last, interval)
+        if partition_name(start, interval) not in existing
+    ]
+
+
+def detach_sql(name, archive_schema=None, drop=False):
+    """パーティションを切り離し、その記事を ArticleLocator から消す SQL を返す。"""
+    statements = [
+        f'ALTER TABLE {TABLE} DETACH PARTITION {name}',
+        f'DELETE FROM {LOCATOR_TABLE} USING {name} WHERE {LOCATOR_TABLE}.id = {name}.id',
+    ]
+    if drop:
+        statements.append(f'DROP TABLE {name}')
+    elif archive_schema:
+        statements += [
+            f'CREATE SCHEMA IF NOT EXISTS {archive_schema}',
+            f'ALTER TABLE {name} SET SCHEMA {archive_schema}',
+        ]
+    return statements
@@ -0,0 +1,92 @@
+"""
+記事の大量削除と、記事の多いユーザーの削除。
+
+``delete()`` は CASCADE とシグナルのために対象を全部メモリに読み込み、1 つのトランザクションで
+消すので、記事の多い投稿者を消すとロックが長く続いて書き込みが止まる。ここでは主キーだけを
+``batch_size`` 件ずつ読み、バッチごとに別のトランザクションで DELETE 文 1 回で消す。
+検索インデックス・応答キャッシュ・投稿者の記事数（F() 式で減らす）も同じバッチの中で片付けるので、
+途中で止めても不整合は残らず、もう一度実行すれば続きから消える。
+"""
+import time
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db import connections, router, transaction
+
+from accounts.backends import invalidate_cached_user
+
+from . import authors, cache, search
+from .models import Article
+
+User = get_user_model()
+
+PURGE_BATCH_SIZE = 1000
+
+
+def _delete_rows(pks, using):
+    # delete() は Collector が行を読み込んでシグナルを 1 件ずつ送るので、主キーを指定して直接消す
+    placeholders = ', '.join(['%s'] * len(pks))
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {Article._meta.db_table} WHERE id IN ({placeholders})', pks)
+        return cursor.rowcount
+
+
+def purge_articles(queryset, batch_size=PURGE_BATCH_SIZE, sleep=0, time_budget=None,
+                   update_authors=True, progress=None):
+    """
+    ``queryset`` の記事をバッチに分けて削除する。``(削除した件数, 全部消えたか)`` を返す。
+
+    ``time_budget`` 秒を過ぎると、残りがあっても区切りのよいところで止める。
+    ``progress`` は各バッチのコミット後に、それまでに削除した件数を渡して呼ばれる。
+    """
+    using = router.db_for_write(Article)
+    # 消した行は次の SELECT に出てこないので、毎回先頭から取り直せばよい
+    rows = queryset.using(using).order_by().values_list('pk', 'author_id')
+    deadline = None if time_budget is None else time.monotonic() + time_budget
+    deleted = 0
+    while True:
+        batch = list(rows[:batch_size])
+        if not batch:
+            return deleted, True
+        pks = [pk for pk, _ in batch]
+        with transaction.atomic(using=using):
+            count = _delete_rows(pks, using)
+            search.unindex_articles(pks, using=using)
+            if update_authors:
+                authors.record_articles_deleted(Counter(author_id for _, author_id in batch), using=using)
+            transaction.on_commit(lambda pks=pks: cache.invalidate_articles(pks), using=using)
+        deleted += count
+        if progress:
+            progress(deleted)
+        if deadline is not None and time.monotonic() >= deadline:
+            return deleted, not rows.exists()
+        if sleep:
+            time.sleep(sleep)
+
+
+def deactivate_user(user_id):
+    """削除が終わるまでの間にログインや投稿ができないよう、先に無効にする。"""
+    User.objects.using(router.db_for_write(User)).filter(pk=user_id).update(is_active=False)
+    invalidate_cached_user(user_id)
+
+
+def purge_user(user_id, batch_size=PURGE_BATCH_SIZE, sleep=0, time_budget=None, progress=None):
+    """
+    ユーザーの記事をバッチに分けて削除し、全部消えたらユーザーも削除する。
+    ``(削除した記事の件数, ユーザーまで削除したか)`` を返す。
+    """
+    deactivate_user(user_id)
+    deleted, done = purge_articles(
+        Article.objects.filter(author_id=user_id),
+        batch_size=batch_size,
+        sleep=sleep,
+        time_budget=time_budget,
+        update_authors=False,
+        progress=progress,
+    )
+    if done:
+        using = router.db_for_write(User)
+        with transaction.atomic(using=using):
+            # 記事はもう残っていないので、Collector がたどるのは管理画面のログなど小さな関連だけ
+            User.objects.using(using).filter(pk=user_id).delete()
+    return deleted, done
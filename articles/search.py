@@ -0,0 +1,130 @@
+"""
+記事の全文検索。
+
+PostgreSQL では pg_trgm の GIN インデックス（title / content）に対する ILIKE で絞り込み、
+trigram の類似度で順位付けする。SQLite では trigram トークナイザの FTS5 仮想テーブル
+``articles_article_fts`` を引き、bm25 で順位付けする。どちらも n-gram なので、
+分かち書きされない日本語でも部分一致で検索できる。
+"""
+import re
+
+from django.db import connections
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+
+FTS_TABLE = 'articles_article_fts'
+# trigram インデックスが効くのは 3 文字以上の語だけ
+MIN_INDEXED_TERM_LENGTH = 3
+MAX_TERMS = 8
+
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def parse_query(query):
+    terms = []
+    for term in _WHITESPACE_RE.split(query or ''):
+        if term and term not in terms:
+            terms.append(term)
+    return terms[:MAX_TERMS]
+
+
+def search_articles(queryset, query):
+    """
+    ``queryset`` を ``query`` で絞り込み、``search_rank`` 注釈（大きいほど上位）を付けて返す。
+    """
+    terms = parse_query(query)
+    if not terms:
+        return queryset.none().annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        return _search_postgresql(queryset, terms)
+    if vendor == 'sqlite':
+        return _search_sqlite(queryset, terms)
+    return _search_fallback(queryset, terms)
+
+
+def _contains_all(terms):
+    condition = Q()
+    for term in terms:
+        condition &= Q(title__icontains=term) | Q(content__icontains=term)
+    return condition
+
+
+def _search_postgresql(queryset, terms):
+    from django.contrib.postgres.search import TrigramWordSimilarity
+
+    query = ' '.join(terms)
+    return queryset.filter(_contains_all(terms)).annotate(
+        search_rank=TrigramWordSimilarity(query, 'title') * 2 + TrigramWordSimilarity(query, 'content'),
+    )
+
+
+def _fts_phrase(term):
+    return '"{}"'.format(term.replace('"', '""'))
+
+
+def _search_sqlite(queryset, terms):
+    indexed = [term for term in terms if len(term) >= MIN_INDEXED_TERM_LENGTH]
+    short = [term for term in terms if len(term) < MIN_INDEXED_TERM_LENGTH]
+
+    # FTS テーブルと JOIN して 1 回の MATCH で絞り込みと順位付けを行う。
+    # 記事ごとに MATCH を実行する相関サブクエリだと、ヒット件数の 2 乗に比例して遅くなる
+    queryset = queryset.filter(search_index__isnull=False)
+    for term in short:
+        # 2 文字以下の語は trigram で引けないので FTS テーブル上の LIKE で補う
+        queryset = queryset.filter(Q(search_index__title__icontains=term) | Q(search_index__content__icontains=term))
+    if not indexed:
+        return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+    phrase = ' '.join(_fts_phrase(term) for term in indexed)
+    return queryset.filter(
+        RawSQL(f'{FTS_TABLE} MATCH %s', [phrase], output_field=BooleanField()),
+    ).annotate(
+        # bm25 は小さいほど関連が高いので符号を反転する（title を content の 2 倍で重み付け）
+        search_rank=RawSQL(f'-bm25({FTS_TABLE}, 2.0, 1.0)', [], output_field=FloatField()),
+    )
+
+
+def _search_fallback(queryset, terms):
+    return queryset.filter(_contains_all(terms)).annotate(
+        search_rank=Value(0.0, output_field=FloatField()),
+    )
+
+
+def uses_fts(using):
+    return connections[using].vendor == 'sqlite'
+
+
+def index_articles(articles, using='default'):
+    """SQLite の FTS テーブルへ記事を登録（上書き）する。PostgreSQL ではインデックスが自動更新される。"""
+    if not uses_fts(using):
+        return
+    rows = [(article.pk, article.title, article.content) for article in articles]
+    if not rows:
+        return
+    with connections[using].cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(row[0],) for row in rows])
+        cursor.executemany(f'INSERT INTO {FTS_TABLE} (rowid, title, content) VALUES (%s, %s, %s)', rows)
+
+
+def unindex_articles(pks, using='default'):
+    if not uses_fts(using):
+        return
+    pks = list(pks)
+    if not pks:
+        return
+    with connections[using].cursor() as cursor:
+        cursor.executemany(f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [(pk,) for pk in pks])
+
+
+def rebuild_index(using='default'):
+    """SQLite の FTS テーブルを記事テーブルの内容から作り直す。一括投入の後に使う。"""
+    if not uses_fts(using):
+        return
+    with connections[using].cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {FTS_TABLE} (rowid, title, content) '
+            'SELECT id, title, content FROM articles_article'
+        )
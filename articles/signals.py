@@ -0,0 +1,38 @@
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import cache, tasks
+from .models import Article
+
+User = get_user_model()
+
+
+@receiver(post_save, sender=Article, dispatch_uid='articles_index_article')
+def index_article(sender, instance, raw=False, using='default', **kwargs):
+    if raw:
+        return
+    tasks.enqueue_search_index([instance.pk], using=using)
+
+
+@receiver(post_delete, sender=Article, dispatch_uid='articles_unindex_article')
+def unindex_article(sender, instance, using='default', **kwargs):
+    tasks.enqueue_search_index([instance.pk], using=using)
+
+
+@receiver(post_save, sender=Article, dispatch_uid='articles_invalidate_saved_article')
+@receiver(post_delete, sender=Article, dispatch_uid='articles_invalidate_deleted_article')
+def invalidate_article_cache(sender, instance, using='default', **kwargs):
+    pk = instance.pk
+    transaction.on_commit(lambda: cache.invalidate_articles([pk]), using=using)
+
+
+@receiver(post_save, sender=User, dispatch_uid='articles_invalidate_author_articles')
+def invalidate_author_cache(sender, instance, created=False, update_fields=None, using='default', **kwargs):
+    # ログインのたびに last_login だけが保存されるので、その場合はページに影響しない
+    if created or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    # 記事を 1 件ずつ消すと記事数に比例して遅くなるので、投稿者の版を進めてまとめて無効にする
+    author_id = instance.pk
+    transaction.on_commit(lambda: cache.invalidate_authors([author_id]), using=using)
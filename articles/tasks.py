@@ -0,0 +1,84 @@
+"""
+記事の保存後の処理をジョブキュー（jobs）で実行するタスク。
+
+本文 HTML の生成と SQLite の全文検索インデックスの更新はリクエストの外で行う。
+HTML が生成されるまでは、詳細ページが古い版として扱ってその場で描画する。
+ユーザーの削除も、記事をバッチに分けて消す長い処理なのでここで行う。
+"""
+import logging
+
+from django.db import router, transaction
+
+from jobs.queue import enqueue, enqueue_many, get_backend, task
+
+from . import cache, purge, search
+from .models import Article
+
+logger = logging.getLogger('articles.purge')
+
+RENDER_HTML = 'articles.render_html'
+SYNC_SEARCH_INDEX = 'articles.sync_search_index'
+PURGE_USER = 'articles.purge_user'
+# 1 回のジョブで削除を続ける秒数。残りは次のジョブに引き継ぎ、JOBS_LOCK_TIMEOUT に掛からないようにする
+PURGE_JOB_SECONDS = 60
+
+
+def enqueue_render_html(article):
+    if not article.content_html_is_current:
+        enqueue(RENDER_HTML, {'pk': article.pk})
+
+
+def enqueue_search_index(pks, using='default'):
+    if search.uses_fts(using):
+        enqueue_many(SYNC_SEARCH_INDEX, [{'pk': pk} for pk in pks])
+
+
+def can_purge_in_background():
+    """
+    ユーザーの削除をジョブワーカーに任せてよいか。ワーカーは Web プロセスとは別のプロセスなので、
+    キャッシュがプロセスごと（LocMemCache）だと記事を消したときの無効化が Web プロセスに届かず、
+    削除したユーザーのページがキャッシュのタイムアウトまで表示され続ける。
+    """
+    return get_backend() != 'database' or cache.is_shared()
+
+
+def enqueue_purge_user(user_id):
+    """ユーザーをすぐに無効にし、記事とユーザー自身の削除をジョブに回す。"""
+    purge.deactivate_user(user_id)
+    enqueue(PURGE_USER, {'user_id': user_id})
+
+
+@task(RENDER_HTML, batch=True)
+def render_html(payloads):
+    using = router.db_for_write(Article)
+    pks = {payload['pk'] for payload in payloads}
+    articles = list(Article.objects.using(using).filter(pk__in=pks).only('pk', 'content'))
+    for article in articles:
+        article.render_content()
+    # updated_at は変えない（auto_now は bulk_update では更新されない）
+    Article.objects.using(using).bulk_update(articles, ['content_html', 'content_html_version'])
+
+
+@task(SYNC_SEARCH_INDEX, batch=True)
+def sync_search_index(payloads):
+    """保存された記事を索引に登録し、削除された記事を索引から外す。"""
+    using = router.db_for_write(Article)
+    pks = {payload['pk'] for payload in payloads}
+    articles = list(Article.objects.using(using).filter(pk__in=pks).only('pk', 'title', 'content'))
+    with transaction.atomic(using=using):
+        search.index_articles(articles, using=using)
+        search.unindex_articles(pks - {article.pk for article in articles}, using=using)
+
+
+@task(PURGE_USER, max_attempts=5)
+def purge_user(payload):
+    user_id = payload['user_id']
+    deleted, done = purge.purge_user(
+        user_id,
+        time_budget=PURGE_JOB_SECONDS,
+        progress=lambda count: logger.info('user %s: deleted %d articles', user_id, count),
+    )
+    if done:
+        logger.info('user %s: deleted (%d articles in the last job)', user_id, deleted)
+    else:
+        enqueue(PURGE_USER, payload)
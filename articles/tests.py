@@ -1,3 +1,374 @@
-from django.test import TestCase
+import json
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from . import authors, cache, purge
+from .bulk import insert_articles
+from .management.commands import export_articles
+from .models import Article, ImportCheckpoint
+from .pagination import InvalidCursor, KeysetPaginator
+from .search import rebuild_index, search_articles
+
+User = get_user_model()
+
+
+def make_articles(author, count, start=None, step=timedelta(minutes=1), title='記事 {}'):
+    """作成日時を指定して記事を一括で作る（新しい順に ``step`` ずつ古くなる）。"""
+    start = start or timezone.now()
+    articles = []
+    for index in range(count):
+        created_at = start - step * index
+        article = Article(
+            author=author,
+            title=title.format(index),
+            content=f'本文 {index}',
+            created_at=created_at,
+            updated_at=created_at,
+        )
+        article.refresh_derived_fields()
+        articles.append(article)
+    insert_articles(articles)
+    authors.reconcile([author.pk])
+    rebuild_index()
+    return list(Article.objects.filter(author=author).order_by('-created_at', '-id'))
+
+
+class ArticleTestCase(TestCase):
+    def setUp(self):
+        cache.get_cache().clear()
+        self.author = User.objects.create_user('wes', 'wes@example.com', 'password')
+
+
+class KeysetPaginatorTests(ArticleTestCase):
+    def walk(self, paginator):
+        seen, cursor = [], None
+        while True:
+            page = paginator.page(cursor)
+            seen += [article.pk for article in page]
+            if not page.has_next():
+                return seen
+            cursor = page.next_cursor
+
+    def test_walks_every_row_once_with_tied_timestamps(self):
+        # 同じ作成日時の行が並んでも、id で順序が決まって重複も抜けもない
+        make_articles(self.author, 25, step=timedelta(0))
+        make_articles(self.author, 10, start=timezone.now() - timedelta(days=1))
+        expected = list(Article.objects.order_by('-created_at', '-id').values_list('pk', flat=True))
+        self.assertEqual(self.walk(KeysetPaginator(Article.objects.all(), 7)), expected)
+
+    def test_previous_cursor_returns_previous_page(self):
+        make_articles(self.author, 12)
+        paginator = KeysetPaginator(Article.objects.all(), 5)
+        first = paginator.page()
+        second = paginator.page(first.next_cursor)
+        self.assertFalse(first.has_previous())
+        self.assertEqual(
+            [article.pk for article in paginator.page(second.previous_cursor)],
+            [article.pk for article in first],
+        )
+
+    def test_cursor_query_has_sargable_leading_bound(self):
+        paginator = KeysetPaginator(Article.objects.all(), 5)
+        condition = paginator._after([timezone.now(), 10], paginator.ordering)
+        sql = str(Article.objects.filter(condition).query)
+        self.assertIn('"created_at" <=', sql)
+
+    def test_invalid_cursor(self):
+        paginator = KeysetPaginator(Article.objects.all(), 5)
+        for cursor in ('garbage', 'W10', paginator.encode_cursor('next', {'created_at': 'x', 'id': 1})):
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidCursor):
+                paginator.decode_cursor(cursor)
+
+    def test_list_view_returns_404_for_broken_cursor(self):
+        response = self.client.get(reverse('articles:list'), {'cursor': 'garbage'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_list_view_pages_through_articles(self):
+        articles = make_articles(self.author, 25)
+        response = self.client.get(reverse('articles:list'))
+        page = response.context['page_obj']
+        self.assertEqual([article.pk for article in page], [article.pk for article in articles[:20]])
+        response = self.client.get(reverse('articles:list'), {'cursor': page.next_cursor})
+        self.assertEqual([article.pk for article in response.context['page_obj']], [a.pk for a in articles[20:]])
+
+
+class ResponseCacheTests(ArticleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.articles = make_articles(self.author, 3)
+
+    def test_second_request_is_served_from_cache_without_queries(self):
+        url = reverse('articles:list')
+        self.assertEqual(self.client.get(url)['X-Cache'], 'MISS')
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'HIT')
+
+    def test_unknown_query_parameters_share_the_cache_key(self):
+        url = reverse('articles:list')
+        self.client.get(url)
+        self.assertEqual(self.client.get(url, {'utm_source': 'x'})['X-Cache'], 'HIT')
+
+    def test_saving_an_article_invalidates_list_and_detail(self):
+        article = self.articles[0]
+        list_url, detail_url = reverse('articles:list'), reverse('articles:detail', kwargs={'pk': article.pk})
+        self.client.get(list_url)
+        self.client.get(detail_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            article.title = '新しいタイトル'
+            article.save()
+        for url in (list_url, detail_url):
+            response = self.client.get(url)
+            self.assertEqual(response['X-Cache'], 'MISS')
+            self.assertContains(response, '新しいタイトル')
+
+    def test_renaming_the_author_invalidates_detail(self):
+        url = reverse('articles:detail', kwargs={'pk': self.articles[0].pk})
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.username = 'montgomery'
+            self.author.save()
+        response = self.client.get(url)
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertContains(response, 'montgomery')
+
+    def test_last_login_does_not_invalidate(self):
+        url = reverse('articles:detail', kwargs={'pk': self.articles[0].pk})
+        self.client.get(url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.last_login = timezone.now()
+            self.author.save(update_fields=['last_login'])
+        self.assertEqual(self.client.get(url)['X-Cache'], 'HIT')
+
+    def test_logged_in_pages_are_not_cached(self):
+        self.client.force_login(self.author)
+        response = self.client.get(reverse('articles:list'))
+        self.assertNotIn('X-Cache', response)
+
+
+class ConditionalGetTests(ArticleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.article = make_articles(self.author, 3)[0]
+        self.detail_url = reverse('articles:detail', kwargs={'pk': self.article.pk})
+
+    def test_list_has_etag_but_no_last_modified(self):
+        response = self.client.get(reverse('articles:list'))
+        self.assertIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
+        response = self.client.get(reverse('articles:list'), headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_detail_answers_304_from_cache(self):
+        response = self.client.get(self.detail_url)
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(0):
+            response = self.client.get(self.detail_url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    def test_detail_answers_304_before_rendering(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        cache.get_cache().delete(cache.detail_cache_key(self.article.pk))
+        response = self.client.get(self.detail_url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+    def test_etag_changes_with_article_and_author(self):
+        etag = self.client.get(self.detail_url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.author.username = 'montgomery'
+            self.author.save()
+        response = self.client.get(self.detail_url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_deleted_article_is_404(self):
+        self.client.get(self.detail_url)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.article.delete()
+        self.assertEqual(self.client.get(self.detail_url).status_code, 404)
+
+
+class ExportTests(ArticleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.articles = make_articles(self.author, 3)
+
+    def test_jsonl(self):
+        response = self.client.get(reverse('articles:export'), {'fields': 'id,title'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        records = [json.loads(line) for line in lines]
+        # (updated_at, id) の古い順
+        self.assertEqual(records, [{'id': a.pk, 'title': a.title} for a in reversed(self.articles)])
+
+    def test_csv_and_updated_since(self):
+        response = self.client.get(reverse('articles:export'), {
+            'format': 'csv',
+            'fields': 'id',
+            'updated_since': self.articles[0].updated_at.isoformat(),
+        })
+        self.assertEqual(b''.join(response.streaming_content).decode().split(), ['id', str(self.articles[0].pk)])
+
+    def test_rejects_bad_parameters(self):
+        url = reverse('articles:export')
+        for params in ({'format': 'xml'}, {'fields': 'author_email'}, {'updated_since': 'yesterday'}):
+            with self.subTest(params=params):
+                self.assertEqual(self.client.get(url, params).status_code, 400)
+
+
+class ImportArticlesTests(ArticleTestCase):
+    def write_records(self, lines):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = Path(directory.name) / 'articles.jsonl'
+        path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+        return path
+
+    def record(self, **values):
+        return json.dumps({'author_email': 'WES@example.com', 'title': 'swing', 'content': 'guitar', **values})
+
+    def test_imports_valid_rows_and_reports_bad_ones(self):
+        created_at = '2020-05-01T12:00:00+00:00'
+        path = self.write_records([
+            self.record(title='bossa nova', created_at=created_at, updated_at=created_at),
+            self.record(title=None),
+            self.record(created_at='yesterday'),
+            'not json',
+            self.record(author_email='nobody@example.com'),
+            self.record(title='blues'),
+        ])
+        with self.assertRaisesMessage(CommandError, 'スキップ 4 件'):
+            call_command('import_articles', str(path), batch_size=2, stderr=StringIO())
+        self.assertEqual(
+            sorted(Article.objects.values_list('title', flat=True)), ['blues', 'bossa nova'],
+        )
+        imported = Article.objects.get(title='bossa nova')
+        self.assertEqual(imported.created_at.isoformat(), created_at)
+        self.assertEqual(imported.word_count, 1)
+        self.assertEqual(User.objects.get(pk=self.author.pk).article_count, 2)
+        self.assertEqual(search_articles(Article.objects.all(), 'bossa').get(), imported)
+        self.assertFalse(ImportCheckpoint.objects.exists())
+
+    def test_resume_skips_committed_records(self):
+        path = self.write_records([self.record(title=f'take {index}') for index in range(5)])
+        ImportCheckpoint.objects.create(source=str(path.resolve()), records=3)
+        call_command('import_articles', str(path), resume=True, stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(sorted(Article.objects.values_list('title', flat=True)), ['take 3', 'take 4'])
+
+    def test_counts_are_added_to_existing_stats(self):
+        make_articles(self.author, 2, start=timezone.now() - timedelta(days=1))
+        latest = '2030-01-01T00:00:00+00:00'
+        path = self.write_records([self.record(), self.record(created_at=latest, updated_at=latest)])
+        call_command('import_articles', str(path), stdout=StringIO(), stderr=StringIO())
+        author = User.objects.get(pk=self.author.pk)
+        self.assertEqual(author.article_count, 4)
+        self.assertEqual(author.latest_article_at.isoformat(), latest)
+        self.assertEqual(authors.reconcile(), 0)
+
+
+class ExportResumeTests(ArticleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.articles = make_articles(self.author, 5)
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = Path(directory.name) / 'articles.jsonl'
+
+    def test_resume_after_interrupted_export(self):
+        serialize = export_articles.serialize
+
+        def interrupted(rows, fields, format):
+            # 3 行書いたところで止まったことにする
+            for index, line in enumerate(serialize(rows, fields, format)):
+                if index == 3:
+                    raise KeyboardInterrupt
+                yield line
+
+        with mock.patch.object(export_articles, 'serialize', interrupted), self.assertRaises(KeyboardInterrupt):
+            call_command('export_articles', str(self.path), fields='id,title', chunk_size=2, stderr=StringIO())
+        # 強制終了で 4 行目が途中まで書かれたことにする
+        with open(self.path, 'ab') as stream:
+            stream.write(b'{"id": ')
+        # チェックポイントは flush した 2 行目の後ろを指し、その後ろに 3 行目と切れた行が残っている
+        ids = sorted(article.pk for article in self.articles)
+        checkpoint = json.loads(Path(f'{self.path}.checkpoint').read_text())
+        lines = self.path.read_bytes().splitlines(keepends=True)
+        self.assertEqual(checkpoint, {'last_id': ids[1], 'offset': len(lines[0]) + len(lines[1])})
+        self.assertEqual(len(lines), 4)
+
+        call_command('export_articles', str(self.path), fields='id,title', resume=True, stderr=StringIO())
+        records = [json.loads(line) for line in self.path.read_text(encoding='utf-8').splitlines()]
+        self.assertEqual([record['id'] for record in records], ids)
+        self.assertFalse(Path(f'{self.path}.checkpoint').exists())
+
+    def test_resume_requires_checkpoint(self):
+        with self.assertRaisesMessage(CommandError, 'チェックポイントがありません'):
+            call_command('export_articles', str(self.path), resume=True, stderr=StringIO())
+
+
+class SearchTests(ArticleTestCase):
+    @override_settings(JOBS_BACKEND='immediate')
+    def test_saved_article_is_indexed(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            article = Article.objects.create(author=self.author, title='Django Reinhardt', content='manouche swing')
+        self.assertEqual(list(search_articles(Article.objects.all(), 'manouche')), [article])
+        with self.captureOnCommitCallbacks(execute=True):
+            article.delete()
+        self.assertFalse(search_articles(Article.objects.all(), 'manouche').exists())
+
+    def test_search_view(self):
+        make_articles(self.author, 2, title='ジャンゴ {}')
+        response = self.client.get(reverse('articles:search'), {'q': 'ジャンゴ'})
+        self.assertEqual(len(response.context['articles']), 2)
+
+
+class PurgeTests(ArticleTestCase):
+    def setUp(self):
+        super().setUp()
+        self.other = User.objects.create_user('joe', 'joe@example.com', 'password')
+        make_articles(self.author, 7)
+        make_articles(self.other, 4)
+
+    def test_purge_articles_updates_author_stats(self):
+        queryset = Article.objects.filter(title__in=['記事 0', '記事 1', '記事 5'])
+        with self.captureOnCommitCallbacks(execute=True):
+            deleted, done = purge.purge_articles(queryset, batch_size=2)
+        self.assertEqual((deleted, done), (5, True))
+        self.assertEqual(User.objects.get(pk=self.author.pk).article_count, 4)
+        self.assertEqual(User.objects.get(pk=self.other.pk).article_count, 2)
+        # F() で減らした結果が数え直しと一致する
+        self.assertEqual(authors.reconcile(), 0)
+        self.assertEqual(search_articles(Article.objects.all(), '記事').count(), 6)
+
+    def test_purge_user_stops_at_time_budget_and_resumes(self):
+        deleted, done = purge.purge_user(self.author.pk, batch_size=3, time_budget=0)
+        self.assertEqual((deleted, done), (3, False))
+        self.assertFalse(User.objects.get(pk=self.author.pk).is_active)
+        deleted, done = purge.purge_user(self.author.pk, batch_size=3)
+        self.assertEqual((deleted, done), (4, True))
+        self.assertFalse(User.objects.filter(pk=self.author.pk).exists())
+        self.assertEqual(Article.objects.filter(author=self.other).count(), 4)
+
+    @override_settings(JOBS_BACKEND='database')
+    def test_background_purge_needs_shared_cache(self):
+        with self.assertRaisesMessage(CommandError, 'REDIS_URL'):
+            call_command('purge_user', str(self.author.pk), background=True, stdout=StringIO(), stderr=StringIO())
+        self.assertTrue(User.objects.get(pk=self.author.pk).is_active)
+
+
+class AuthorArchiveTests(ArticleTestCase):
+    def test_author_page_lists_only_their_articles(self):
+        other = User.objects.create_user('joe', 'joe@example.com', 'password')
+        make_articles(self.author, 3)
+        make_articles(other, 2)
+        response = self.client.get(reverse('articles:author', kwargs={'username': 'wes'}))
+        self.assertEqual(len(response.context['articles']), 3)
+        self.assertContains(response, '3 件')
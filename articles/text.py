@@ -0,0 +1,27 @@
+import re
+
+from django.utils.html import linebreaks
+
+EXCERPT_LENGTH = 120
+# 本文 HTML の生成方法を変えたら上げる。古い版の content_html は再生成される
+CONTENT_RENDERER_VERSION = 1
+
+_WHITESPACE_RE = re.compile(r'\s+')
+# かな・漢字は 1 文字を 1 語、それ以外の文字は連続した並びを 1 語として数える
+_CJK = '\u3040-\u30ff\u3400-\u9fff\uf900-\ufaff'
+_WORD_RE = re.compile(rf'[{_CJK}]|[^\W{_CJK}]+')
+
+
+def make_excerpt(text, length=EXCERPT_LENGTH):
+    text = _WHITESPACE_RE.sub(' ', text).strip()
+    if len(text) <= length:
+        return text
+    return text[:length - 1].rstrip() + '…'
+
+
+def count_words(text):
+    return len(_WORD_RE.findall(text))
+
+
+def render_content_html(text):
+    return linebreaks(text, autoescape=True)
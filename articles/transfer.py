@@ -0,0 +1,156 @@
+"""
+記事の JSON Lines / CSV 形式での読み書き。
+
+どちらも 1 行ずつ生成・解析するので、件数に関係なくメモリ使用量は一定に保たれる。
+インポート・エクスポート用の管理コマンドと、ストリーミングのエクスポート API から使う。
+"""
+import csv
+import datetime
+import json
+
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+FORMATS = ('jsonl', 'csv')
+
+# 出力列名 -> values() に渡す参照名
+FIELD_SOURCES = {
+    'id': 'id',
+    'title': 'title',
+    'content': 'content',
+    'excerpt': 'excerpt',
+    'word_count': 'word_count',
+    'author': 'author__username',
+    'author_email': 'author__email',
+    'created_at': 'created_at',
+    'updated_at': 'updated_at',
+}
+
+# バックアップ・移行用の列。import_articles はこの形式を読み込める
+BACKUP_FIELDS = ('id', 'author_email', 'title', 'content', 'created_at', 'updated_at')
+# 外部向けのエクスポートで選べる列（メールアドレスは含めない）
+PUBLIC_FIELDS = ('id', 'title', 'content', 'excerpt', 'word_count', 'author', 'created_at', 'updated_at')
+
+CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def guess_format(path, default='jsonl'):
+    path = str(path).lower()
+    if path.endswith('.csv'):
+        return 'csv'
+    if path.endswith(('.jsonl', '.ndjson', '.json')):
+        return 'jsonl'
+    return default
+
+
+def value_sources(fields):
+    return [FIELD_SOURCES[field] for field in fields]
+
+
+def _plain(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    return value
+
+
+def _record(row, fields):
+    return {field: _plain(row[FIELD_SOURCES[field]]) for field in fields}
+
+
+def jsonl_lines(rows, fields):
+    for row in rows:
+        yield json.dumps(_record(row, fields), ensure_ascii=False) + '\n'
+
+
+class _Line:
+    def write(self, value):
+        return value
+
+
+def csv_lines(rows, fields):
+    writer = csv.writer(_Line())
+    yield writer.writerow(fields)
+    for row in rows:
+        record = _record(row, fields)
+        yield writer.writerow([record[field] for field in fields])
+
+
+def serialize(rows, fields, format):
+    """``values()`` の行を指定形式の 1 行ずつの文字列にして返すジェネレータ。"""
+    if format == 'csv':
+        return csv_lines(rows, fields)
+    return jsonl_lines(rows, fields)
+
+
+# 取り込むタイトルの最大長（Article.title の max_length と同じ）
+TITLE_MAX_LENGTH = 200
+
+
+class InvalidRecord(ValueError):
+    """取り込めないレコード。"""
+
+
+def read_records(stream, format):
+    """
+    テキストストリームからレコード（dict）を 1 件ずつ読む。
+    JSON として読めない行は例外にせず ``InvalidRecord`` を返すので、1 行の誤りで全体が止まらない。
+    """
+    if format == 'csv':
+        yield from csv.DictReader(stream)
+        return
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as exc:
+            yield InvalidRecord(f'JSON として読めません（{exc}）')
+            continue
+        if not isinstance(record, dict):
+            yield InvalidRecord('JSON オブジェクトではありません')
+            continue
+        yield record
+
+
+def clean_record(record):
+    """
+    取り込み用に検証した値を返す（投稿者はメールアドレスのまま）。
+    必須列がない・日時が読めないなどのときは InvalidRecord を送出する。
+    """
+    if isinstance(record, InvalidRecord):
+        raise record
+    title = record.get('title')
+    if not isinstance(title, str) or not title.strip():
+        raise InvalidRecord('title がありません')
+    if len(title) > TITLE_MAX_LENGTH:
+        raise InvalidRecord(f'title が {TITLE_MAX_LENGTH} 文字を超えています')
+    content = record.get('content') or ''
+    if not isinstance(content, str):
+        raise InvalidRecord('content が文字列ではありません')
+    email = record.get('author_email') or ''
+    if not isinstance(email, str) or not email.strip():
+        raise InvalidRecord('author_email がありません')
+    cleaned = {'author_email': email.strip().lower(), 'title': title, 'content': content}
+    for field in ('created_at', 'updated_at'):
+        try:
+            cleaned[field] = parse_timestamp(record.get(field))
+        except (TypeError, ValueError):
+            raise InvalidRecord(f'{field} が日時として読めません: {record.get(field)!r}')
+    return cleaned
+
+
+def parse_timestamp(value):
+    if not value:
+        return None
+    if isinstance(value, datetime.datetime):
+        return value
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise ValueError(f'invalid datetime: {value!r}')
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
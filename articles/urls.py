@@ -1,6 +1,13 @@
+from django.conf import settings
 from django.urls import path
+from .feeds import LatestArticlesAtomFeed, LatestArticlesFeed
 from .views import (
+    AsyncArticleDetailView,
+    AsyncArticleListView,
     ArticleListView,
+    ArticleSearchView,
+    ArticleExportView,
+    AuthorArchiveView,
     ArticleCreateView,
     ArticleDetailView,
     ArticleUpdateView,
@@ -9,10 +16,23 @@ from .views import (
 
 app_name = 'articles'
 
+# ASGI で動かすときは読み取り系のページを非同期ビューで返す
+if settings.ASYNC_READ_VIEWS:
+    list_view = AsyncArticleListView.as_view()
+    detail_view = AsyncArticleDetailView.as_view()
+else:
+    list_view = ArticleListView.as_view()
+    detail_view = ArticleDetailView.as_view()
+
 urlpatterns = [
-    path('', ArticleListView.as_view(), name='list'),
+    path('', list_view, name='list'),
+    path('search/', ArticleSearchView.as_view(), name='search'),
+    path('feed/', LatestArticlesFeed(), name='feed'),
+    path('feed/atom/', LatestArticlesAtomFeed(), name='feed_atom'),
+    path('author/<str:username>/', AuthorArchiveView.as_view(), name='author'),
+    path('export/', ArticleExportView.as_view(), name='export'),
     path('create/', ArticleCreateView.as_view(), name='create'),
-    path('<int:pk>/', ArticleDetailView.as_view(), name='detail'),
+    path('<int:pk>/', detail_view, name='detail'),
     path('<int:pk>/edit/', ArticleUpdateView.as_view(), name='edit'),
     path('<int:pk>/delete/', ArticleDeleteView.as_view(), name='delete'),
 ]
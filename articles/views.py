@@ -1,18 +1,180 @@
 from django.views.generic import ListView, CreateView, DetailView, UpdateView, DeleteView
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.urls import reverse_lazy
-from django.shortcuts import redirect
+from django.contrib.auth import get_user_model
+from django.shortcuts import get_object_or_404, redirect, render
+from django.db import router, transaction
+from django.http import Http404, HttpResponseBadRequest, StreamingHttpResponse
+from django.utils.functional import cached_property
+from django.utils.http import urlencode
+from django.views import View
 from .models import Article
+from . import authors, partitions, tasks
 from .forms import ArticleForm
+from .cache import (
+    aauthor_versions,
+    alist_cache_key,
+    alist_generation,
+    author_versions,
+    detail_cache_key,
+    list_cache_key,
+    list_generation,
+)
+from .conditional import SharedShellMixin, detail_validators, list_validators
+from .pages import (
+    LIST_VALIDATOR_FIELDS,
+    CachedPageMixin,
+    aserve,
+    apaginate,
+    arefresh_content_html,
+    cacheable,
+    detail_validator_queryset,
+    list_context,
+    paginate,
+    refresh_content_html,
+    resolve_user,
+    shell_context,
+    validate_cursor,
+)
+from .search import search_articles
+from .transfer import CONTENT_TYPES, PUBLIC_FIELDS, parse_timestamp, serialize, value_sources
 
+User = get_user_model()
 
-class ArticleListView(ListView):
+# 一覧系のページで描画する列だけを取得する
+LIST_FIELDS = ('title', 'excerpt', 'created_at', 'author__username')
+
+
+class KeysetPaginationMixin:
+    paginate_by = 20
+    cursor_kwarg = 'cursor'
+    paginate_ordering = ('-created_at', '-id')
+
+    def get_cursor(self):
+        return validate_cursor(self.request.GET.get(self.cursor_kwarg), self.paginate_ordering)
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator, page = paginate(queryset, self.get_cursor(), page_size, self.paginate_ordering)
+        return paginator, page, page.object_list, page.has_other_pages()
+
+
+class ArticleListView(CachedPageMixin, SharedShellMixin, KeysetPaginationMixin, ListView):
     model = Article
     template_name = 'articles/list.html'
     context_object_name = 'articles'
 
+    def get_response_cache_key(self):
+        return list_cache_key(self.request.path, self.get_cursor())
+
+    def get_conditional_validators(self):
+        # 表示するページと同じ範囲を (id, updated_at) だけで引き直す
+        _, page = paginate(
+            Article.objects.values(*LIST_VALIDATOR_FIELDS),
+            self.get_cursor(),
+            self.get_paginate_by(None),
+            self.paginate_ordering,
+        )
+        return *list_validators(self.request.user, page, list_generation()), {}
+
     def get_queryset(self):
-        return super().get_queryset().select_related('author')
+        return (
+            super().get_queryset()
+            .select_related('author')
+            .only(*LIST_FIELDS)
+        )
+
+
+class ArticleSearchView(KeysetPaginationMixin, ListView):
+    model = Article
+    template_name = 'articles/search.html'
+    context_object_name = 'articles'
+    paginate_ordering = ('-search_rank', '-id')
+
+    def get_search_query(self):
+        return self.request.GET.get('q', '').strip()
+
+    def get_queryset(self):
+        queryset = (
+            super().get_queryset()
+            .select_related('author')
+            .only(*LIST_FIELDS)
+        )
+        return search_articles(queryset, self.get_search_query())
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        query = self.get_search_query()
+        context.update({
+            'query': query,
+            'extra_query': urlencode({'q': query}),
+        })
+        return context
+
+
+class AuthorArchiveView(CachedPageMixin, SharedShellMixin, KeysetPaginationMixin, ListView):
+    """投稿者ごとの記事一覧。(author, created_at, id) のインデックスを新しい順にたどる。"""
+    model = Article
+    template_name = 'articles/author.html'
+    context_object_name = 'articles'
+
+    def get_response_cache_key(self):
+        return list_cache_key(self.request.path, self.get_cursor())
+
+    @cached_property
+    def author(self):
+        # 記事数と最新投稿日時は User に非正規化してあるので集計しない
+        return get_object_or_404(
+            User.objects.only('username', 'article_count', 'latest_article_at'),
+            username=self.kwargs['username'],
+        )
+
+    def get_queryset(self):
+        return (
+            super().get_queryset()
+            .filter(author=self.author)
+            .select_related('author')
+            .only(*LIST_FIELDS)
+        )
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context['author'] = self.author
+        return context
+
+
+class ArticleExportView(View):
+    """
+    記事をまとめて取得するための読み取り専用 API。
+
+    ``?format=jsonl|csv&fields=id,title&updated_since=2025-01-01T00:00:00Z``
+    サーバーサイドカーソルから 1 行ずつ書き出すので、件数に関係なくメモリ使用量は一定。
+    (updated_at, id) 順に並ぶので、最後に受け取った updated_at を次回の updated_since に渡せば差分だけ取得できる。
+    """
+    chunk_size = 2000
+
+    def get(self, request, *args, **kwargs):
+        format = request.GET.get('format', 'jsonl')
+        if format not in CONTENT_TYPES:
+            return HttpResponseBadRequest('format は jsonl か csv を指定してください。')
+
+        fields = [field.strip() for field in request.GET.get('fields', '').split(',') if field.strip()]
+        fields = fields or list(PUBLIC_FIELDS)
+        unknown = [field for field in fields if field not in PUBLIC_FIELDS]
+        if unknown:
+            return HttpResponseBadRequest(f'指定できない列です: {", ".join(unknown)}')
+
+        queryset = Article.objects.order_by('updated_at', 'id')
+        try:
+            updated_since = parse_timestamp(request.GET.get('updated_since'))
+        except ValueError:
+            return HttpResponseBadRequest('updated_since は ISO 8601 形式の日時で指定してください。')
+        if updated_since:
+            queryset = queryset.filter(updated_at__gte=updated_since)
+
+        rows = queryset.values(*value_sources(fields)).iterator(chunk_size=self.chunk_size)
+        response = StreamingHttpResponse(serialize(rows, fields, format), content_type=CONTENT_TYPES[format])
+        response['Content-Disposition'] = f'attachment; filename="articles.{format}"'
+        return response
 
 
 class ArticleCreateView(LoginRequiredMixin, CreateView):
@@ -34,16 +196,37 @@ class ArticleCreateView(LoginRequiredMixin, CreateView):
 
     def form_valid(self, form):
         form.instance.author = self.request.user
-        return super().form_valid(form)
+        with transaction.atomic():
+            response = super().form_valid(form)
+            authors.record_article_created(self.object)
+            tasks.enqueue_render_html(self.object)
+        return response
 
 
-class ArticleDetailView(DetailView):
+class ArticleDetailView(CachedPageMixin, SharedShellMixin, DetailView):
     model = Article
     template_name = 'articles/detail.html'
     context_object_name = 'article'
 
+    def get_response_cache_key(self):
+        return detail_cache_key(self.kwargs['pk'])
+
     def get_queryset(self):
-        return super().get_queryset().select_related('author')
+        queryset = super().get_queryset().select_related('author').defer('content')
+        return partitions.filter_pk(queryset, self.kwargs['pk'])
+
+    def get_object(self, queryset=None):
+        article = super().get_object(queryset)
+        refresh_content_html(article)
+        return article
+
+    def get_conditional_validators(self):
+        row = detail_validator_queryset(self.kwargs['pk']).first()
+        if row is None:
+            raise Http404('記事が見つかりません。')
+        updated_at, author_id = row
+        versions = author_versions(author_id)
+        return *detail_validators(self.request.user, self.kwargs['pk'], updated_at, versions), versions
 
 
 class ArticleUpdateView(LoginRequiredMixin, UpdateView):
@@ -53,7 +236,8 @@ class ArticleUpdateView(LoginRequiredMixin, UpdateView):
     context_object_name = 'article'
 
     def get_queryset(self):
-        qs = super().get_queryset()
+        # 編集・削除の対象はレプリカの遅延に左右されないようプライマリから読む
+        qs = partitions.filter_pk(super().get_queryset().using(router.db_for_write(self.model)), self.kwargs['pk'])
         if self.request.user.is_staff or self.request.user.is_superuser:
             return qs
         return qs.filter(author=self.request.user)
@@ -68,10 +252,19 @@ class ArticleUpdateView(LoginRequiredMixin, UpdateView):
             'cancel_url': reverse_lazy('articles:detail', kwargs={'pk': self.object.pk}),
             'cancel_text': 'キャンセル',
             'submit_text': '更新する',
-            'submit_icon_path': 'M8 7H5a2 2 0 00-2 2v9a2 2 0 002 2h14a2 2 0 002-2V9a2 2 0 00-2-2h-3m-1 4l-3-3m0 0l-3 3m3-3v12'
+            'submit_icon_path': (
+                'M8 7H5a2 2 0 00-2 2v9a2 2 0 002 2h14a2 2 0 002-2V9a2 2 0 00-2-2h-3'
+                'm-1 4l-3-3m0 0l-3 3m3-3v12'
+            ),
         })
         return context
 
+    def form_valid(self, form):
+        with transaction.atomic():
+            response = super().form_valid(form)
+            tasks.enqueue_render_html(self.object)
+        return response
+
     def get_success_url(self):
         return reverse_lazy('articles:detail', kwargs={'pk': self.object.pk})
 
@@ -83,10 +276,76 @@ class ArticleDeleteView(LoginRequiredMixin, DeleteView):
     success_url = reverse_lazy('articles:list')
 
     def get_queryset(self):
-        qs = super().get_queryset()
+        # 編集・削除の対象はレプリカの遅延に左右されないようプライマリから読む
+        qs = partitions.filter_pk(super().get_queryset().using(router.db_for_write(self.model)), self.kwargs['pk'])
         if self.request.user.is_staff or self.request.user.is_superuser:
             return qs
         return qs.filter(author=self.request.user)
 
     def handle_no_permission(self):
         return redirect('/')
+
+    def form_valid(self, form):
+        with transaction.atomic():
+            response = super().form_valid(form)
+            authors.record_article_deleted(self.object)
+        return response
+
+
+class AsyncArticleListView(View):
+    """
+    ArticleListView の非同期版。ASGI で動かすときにスレッドプールを経由せず、
+    非同期 ORM とキャッシュ API だけで一覧を返す。
+    """
+    template_name = ArticleListView.template_name
+    paginate_by = ArticleListView.paginate_by
+    paginate_ordering = ArticleListView.paginate_ordering
+    cursor_kwarg = ArticleListView.cursor_kwarg
+
+    def get_queryset(self):
+        return Article.objects.select_related('author').only(*LIST_FIELDS)
+
+    async def get(self, request, *args, **kwargs):
+        user = await resolve_user(request)
+        cursor = validate_cursor(request.GET.get(self.cursor_kwarg), self.paginate_ordering)
+
+        async def validators():
+            _, page = await apaginate(
+                Article.objects.values(*LIST_VALIDATOR_FIELDS), cursor, self.paginate_by, self.paginate_ordering,
+            )
+            return *list_validators(user, page, await alist_generation()), {}
+
+        async def render_page():
+            paginator, page = await apaginate(self.get_queryset(), cursor, self.paginate_by, self.paginate_ordering)
+            return render(request, self.template_name, shell_context(user, list_context(paginator, page)))
+
+        cache_key = await alist_cache_key(request.path, cursor) if cacheable(user) else None
+        return await aserve(request, validators, cache_key, render_page)
+
+
+class AsyncArticleDetailView(View):
+    """ArticleDetailView の非同期版。"""
+    template_name = ArticleDetailView.template_name
+
+    async def get(self, request, pk, *args, **kwargs):
+        user = await resolve_user(request)
+
+        async def validators():
+            row = await detail_validator_queryset(pk).afirst()
+            if row is None:
+                raise Http404('記事が見つかりません。')
+            updated_at, author_id = row
+            versions = await aauthor_versions(author_id)
+            return *detail_validators(user, pk, updated_at, versions), versions
+
+        async def render_page():
+            queryset = partitions.filter_pk(Article.objects.select_related('author').defer('content'), pk)
+            try:
+                article = await queryset.aget()
+            except Article.DoesNotExist:
+                raise Http404('記事が見つかりません。')
+            await arefresh_content_html(article)
+            return render(request, self.template_name, shell_context(user, {'article': article, 'object': article}))
+
+        cache_key = detail_cache_key(pk) if cacheable(user) else None
+        return await aserve(request, validators, cache_key, render_page)
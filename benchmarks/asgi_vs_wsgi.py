@@ -0,0 +1,119 @@
+"""
+同じ読み取り系ページを WSGI（gunicorn + 同期ビュー）と ASGI（uvicorn + 非同期ビュー）で
+起動し、高い同時接続数でのスループットとレイテンシを比較する。
+
+    python -m benchmarks.asgi_vs_wsgi --concurrency 200 --duration 20
+
+すでに起動しているサーバーを測る場合は ``--wsgi-url`` / ``--asgi-url`` を渡す。
+サーバーを起動する場合は、環境変数（DATABASE_ENGINE など）がそのまま引き継がれる。
+"""
+import argparse
+import os
+import socket
+import subprocess
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+from .loadgen import load
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+DEFAULT_PATHS = ['/', '/articles/']
+
+
+def _free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for_port(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            with socket.create_connection(('127.0.0.1', port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'server on port {port} did not start within {timeout}s')
+
+
+@contextmanager
+def _server(command, port, env):
+    process = subprocess.Popen(command, cwd=BASE_DIR, env=env, stdout=subprocess.DEVNULL)
+    try:
+        _wait_for_port(port)
+        yield f'http://127.0.0.1:{port}'
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def wsgi_command(port, workers, threads):
+    return [
+        sys.executable, '-m', 'gunicorn', 'jazz_guitarist_paper.wsgi:application',
+        '--bind', f'127.0.0.1:{port}', '--workers', str(workers), '--threads', str(threads),
+        '--worker-class', 'gthread', '--log-level', 'warning',
+    ]
+
+
+def asgi_command(port, workers):
+    return [
+        sys.executable, '-m', 'uvicorn', 'jazz_guitarist_paper.asgi:application',
+        '--host', '127.0.0.1', '--port', str(port), '--workers', str(workers),
+        '--log-level', 'warning', '--no-access-log',
+    ]
+
+
+def _measure(label, url, args):
+    # 接続プールやテンプレートのキャッシュを温めてから測る
+    load(url, args.paths, min(args.concurrency, 10), args.warmup)
+    summary = load(url, args.paths, args.concurrency, args.duration).summary()
+    print(
+        f"{label:<5} {summary['throughput']:>10.1f} req/s"
+        f"  p50 {summary['p50_ms']:>8.1f} ms  p95 {summary['p95_ms']:>8.1f} ms"
+        f"  p99 {summary['p99_ms']:>8.1f} ms  errors {summary['errors']}  {summary['statuses']}"
+    )
+    return summary
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--paths', nargs='+', default=DEFAULT_PATHS)
+    parser.add_argument('--concurrency', type=int, default=200)
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--warmup', type=float, default=3)
+    parser.add_argument('--workers', type=int, default=1, help='どちらのサーバーも同じプロセス数で比べる')
+    parser.add_argument('--threads', type=int, default=8, help='WSGI ワーカー 1 つあたりのスレッド数')
+    parser.add_argument('--wsgi-url')
+    parser.add_argument('--asgi-url')
+    args = parser.parse_args(argv)
+
+    print(f'concurrency={args.concurrency} duration={args.duration}s workers={args.workers} paths={args.paths}')
+    results = {}
+
+    if args.wsgi_url:
+        results['wsgi'] = _measure('WSGI', args.wsgi_url, args)
+    else:
+        port = _free_port()
+        env = {**os.environ, 'ASYNC_READ_VIEWS': 'False'}
+        with _server(wsgi_command(port, args.workers, args.threads), port, env) as url:
+            results['wsgi'] = _measure('WSGI', url, args)
+
+    if args.asgi_url:
+        results['asgi'] = _measure('ASGI', args.asgi_url, args)
+    else:
+        port = _free_port()
+        env = {**os.environ, 'ASYNC_READ_VIEWS': 'True'}
+        with _server(asgi_command(port, args.workers), port, env) as url:
+            results['asgi'] = _measure('ASGI', url, args)
+
+    if results['wsgi']['throughput']:
+        ratio = results['asgi']['throughput'] / results['wsgi']['throughput']
+        print(f'ASGI / WSGI throughput: {ratio:.2f}x')
+    return results
+
+
+if __name__ == '__main__':
+    main()
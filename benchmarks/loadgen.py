@@ -0,0 +1,130 @@
+"""
+依存パッケージなしの HTTP/1.1 負荷生成器。
+
+同時接続数ぶんのコルーチンがそれぞれ keep-alive 接続を 1 本持ち、指定時間のあいだ
+パスを順番に GET し続ける。レイテンシはリクエスト送信から本文の受信完了まで。
+"""
+import asyncio
+import itertools
+import time
+from dataclasses import dataclass, field
+from urllib.parse import urlsplit
+
+
+@dataclass
+class LoadResult:
+    latencies: list = field(default_factory=list)
+    statuses: dict = field(default_factory=dict)
+    errors: int = 0
+    elapsed: float = 0.0
+
+    @property
+    def requests(self):
+        return len(self.latencies)
+
+    @property
+    def throughput(self):
+        return self.requests / self.elapsed if self.elapsed else 0.0
+
+    def percentile(self, p):
+        return percentile(self.latencies, p)
+
+    def summary(self):
+        return {
+            'requests': self.requests,
+            'errors': self.errors,
+            'throughput': self.throughput,
+            'p50_ms': self.percentile(50) * 1000,
+            'p95_ms': self.percentile(95) * 1000,
+            'p99_ms': self.percentile(99) * 1000,
+            'statuses': dict(sorted(self.statuses.items())),
+        }
+
+
+def percentile(values, p):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(p / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+async def _read_response(reader):
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError('connection closed')
+    status = int(status_line.split()[1])
+    length = None
+    chunked = False
+    close = False
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        name = name.strip().lower()
+        value = value.strip()
+        if name == 'content-length':
+            length = int(value)
+        elif name == 'transfer-encoding' and 'chunked' in value.lower():
+            chunked = True
+        elif name == 'connection' and value.lower() == 'close':
+            close = True
+
+    if chunked:
+        while True:
+            size = int((await reader.readline()).split(b';')[0], 16)
+            await reader.readexactly(size + 2)
+            if size == 0:
+                break
+    elif length:
+        await reader.readexactly(length)
+    elif status not in (204, 304) and length is None:
+        await reader.read()
+        close = True
+    return status, close
+
+
+async def _worker(host, port, paths, headers, deadline, result):
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        path = next(paths)
+        request = f'GET {path} HTTP/1.1\r\nHost: {host}\r\n{headers}\r\n'.encode()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            started = time.perf_counter()
+            writer.write(request)
+            await writer.drain()
+            status, close = await _read_response(reader)
+            result.latencies.append(time.perf_counter() - started)
+            result.statuses[status] = result.statuses.get(status, 0) + 1
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError, IndexError):
+            result.errors += 1
+            close = True
+        if close and writer is not None:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def run_load(base_url, paths, concurrency, duration, headers=None):
+    parts = urlsplit(base_url)
+    host, port = parts.hostname, parts.port or 80
+    prefix = parts.path.rstrip('/')
+    header_lines = ''.join(f'{name}: {value}\r\n' for name, value in (headers or {}).items())
+    cycle = itertools.cycle([prefix + path for path in paths])
+
+    result = LoadResult()
+    started = time.perf_counter()
+    deadline = started + duration
+    await asyncio.gather(*(
+        _worker(host, port, cycle, header_lines, deadline, result) for _ in range(concurrency)
+    ))
+    result.elapsed = time.perf_counter() - started
+    return result
+
+
+def load(base_url, paths, concurrency, duration, headers=None):
+    return asyncio.run(run_load(base_url, paths, concurrency, duration, headers))
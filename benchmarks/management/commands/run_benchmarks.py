@@ -0,0 +1,123 @@
+import json
+import os
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from articles.models import Article
+from benchmarks import runner
+from benchmarks.asgi_vs_wsgi import _free_port, _server, asgi_command, wsgi_command
+from benchmarks.scenarios import SCENARIOS, build_context, uncovered_url_names
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = (
+        'articles / accounts / tribute の全 URL を叩き、ビューごとの p50/p95/p99・スループット・SQL 件数を'
+        '表示します。benchmarks/baseline.json と比べて悪化していればエラー終了します。'
+        '先に seed_benchmark_data でデータを作成してください。'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--mode', choices=('client', 'server', 'both'), default='client')
+        parser.add_argument('--scenarios', nargs='+', help='実行するシナリオ名（既定: すべて）')
+        parser.add_argument('--iterations', type=int, default=30, help='client モードでの 1 シナリオあたりの回数')
+        parser.add_argument('--warmup', type=int, default=3, help='client モードでの事前リクエスト回数')
+        parser.add_argument('--server', choices=('wsgi', 'asgi'), default='wsgi', help='server モードで起動するサーバー')
+        parser.add_argument('--url', help='起動済みのサーバーを測る場合のベース URL')
+        parser.add_argument('--workers', type=int, default=2)
+        parser.add_argument('--concurrency', type=int, default=20)
+        parser.add_argument('--duration', type=float, default=5, help='server モードでの 1 シナリオあたりの秒数')
+        parser.add_argument('--server-warmup', type=float, default=1)
+        parser.add_argument('--baseline', default=str(runner.BASELINE_PATH))
+        parser.add_argument('--tolerance', type=float, default=runner.DEFAULT_TOLERANCE)
+        parser.add_argument('--update-baseline', action='store_true', help='今回の結果でベースラインを書き換えます。')
+        parser.add_argument('--output', help='結果を JSON で書き出すファイル')
+
+    def handle(self, *args, **options):
+        uncovered = uncovered_url_names()
+        if uncovered:
+            raise CommandError(f'シナリオのない URL があります: {", ".join(uncovered)}（benchmarks/scenarios.py に追加してください）')
+
+        scenarios = SCENARIOS
+        if options['scenarios']:
+            unknown = set(options['scenarios']) - {scenario.name for scenario in SCENARIOS}
+            if unknown:
+                raise CommandError(f'不明なシナリオです: {", ".join(sorted(unknown))}')
+            scenarios = [scenario for scenario in SCENARIOS if scenario.name in options['scenarios']]
+
+        try:
+            context = build_context()
+        except LookupError as e:
+            raise CommandError(str(e))
+
+        dataset = {'users': User.objects.count(), 'articles': Article.objects.count()}
+        self.stderr.write(f"{connection.vendor}: ユーザー {dataset['users']} 人 / 記事 {dataset['articles']} 件")
+
+        results = {}
+        if options['mode'] in ('client', 'both'):
+            results['client'] = runner.run_client(scenarios, context, options['iterations'], options['warmup'])
+            self.stdout.write(f'\n[client] iterations={options["iterations"]}')
+            self.stdout.write(runner.format_table(results['client']))
+
+        if options['mode'] in ('server', 'both'):
+            queries = {name: summary['queries'] for name, summary in results.get('client', {}).items()}
+            if not queries:
+                queries = runner.query_counts([scenario for scenario in scenarios if scenario.method == 'get'], context)
+            results['server'] = self.run_server(scenarios, context, queries, options)
+            self.stdout.write(
+                f'\n[server:{options["url"] or options["server"]}] '
+                f'concurrency={options["concurrency"]} duration={options["duration"]}s'
+            )
+            self.stdout.write(runner.format_table(results['server']))
+
+        if options['output']:
+            with open(options['output'], 'w') as stream:
+                json.dump({'vendor': connection.vendor, 'dataset': dataset, 'results': results}, stream, indent=2)
+
+        baseline = runner.load_baseline(options['baseline'])
+        if options['update_baseline']:
+            entry = baseline.setdefault(connection.vendor, {})
+            entry['dataset'] = dataset
+            for mode, mode_results in results.items():
+                entry[mode] = runner.baseline_entry(mode_results)
+            runner.save_baseline(baseline, options['baseline'])
+            self.stdout.write(self.style.SUCCESS(f'\nベースラインを更新しました: {options["baseline"]}'))
+            return
+
+        self.check_regressions(baseline.get(connection.vendor), dataset, results, options['tolerance'])
+
+    def run_server(self, scenarios, context, queries, options):
+        args = (scenarios, context, options['concurrency'], options['duration'], options['server_warmup'], queries)
+        if options['url']:
+            return runner.run_server(options['url'], *args)
+        port = _free_port()
+        if options['server'] == 'asgi':
+            command = asgi_command(port, options['workers'])
+            env = {**os.environ, 'ASYNC_READ_VIEWS': 'True'}
+        else:
+            command = wsgi_command(port, options['workers'], threads=8)
+            env = {**os.environ, 'ASYNC_READ_VIEWS': 'False'}
+        with _server(command, port, env) as url:
+            return runner.run_server(url, *args)
+
+    def check_regressions(self, baseline, dataset, results, tolerance):
+        if not baseline:
+            self.stdout.write(self.style.WARNING(
+                f'\n{connection.vendor} のベースラインがないため比較しません（--update-baseline で作成できます）。'
+            ))
+            return
+        if baseline.get('dataset') != dataset:
+            self.stdout.write(self.style.WARNING(
+                f"\nベースラインのデータ量 {baseline.get('dataset')} と今回 {dataset} が異なります。"
+            ))
+
+        regressions = []
+        for mode, mode_results in results.items():
+            lines = runner.compare(mode_results, baseline.get(mode, {}), tolerance, check_throughput=mode == 'server')
+            regressions += [f'[{mode}] {line}' for line in lines]
+        if regressions:
+            raise CommandError('ベースラインより悪化しました:\n  ' + '\n  '.join(regressions))
+        self.stdout.write(self.style.SUCCESS('\nベースラインからの悪化はありません。'))
@@ -0,0 +1,133 @@
+import random
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection, router, transaction
+from django.utils import timezone
+
+from articles import authors, cache, search
+from articles.bulk import insert_articles
+from articles.models import Article
+
+User = get_user_model()
+
+USERNAME_PREFIX = 'bench_user_'
+PASSWORD = 'benchmark'
+
+GUITARISTS = ['ジャンゴ', 'ステファン', 'チャボロ', 'ビレリ', 'ストーケロ', 'ローゼンバーグ', 'Django', 'Bireli', 'Stochelo']
+TOPICS = ['マイナースウィング', 'ラ・ポンプ', 'アルペジオ', 'レスト・ストローク', 'ジプシー・ピッキング', 'コード・ソロ', 'スウィング', 'manouche']
+SENTENCES = [
+    '{guitarist}の{topic}を今日も練習した。',
+    '{topic}はテンポを落として確認するのが近道だ。',
+    '{guitarist}の録音を聴き直すと、{topic}の細かいニュアンスに気づく。',
+    'セッションで{topic}を試したら、{guitarist}風だと言われた。',
+    'Practising {topic} with a metronome at 120 bpm, inspired by {guitarist}.',
+    '{topic}の運指を{guitarist}の譜面から書き写した。',
+]
+
+
+def bench_username(index):
+    return f'{USERNAME_PREFIX}{index:05d}'
+
+
+class Command(BaseCommand):
+    help = (
+        'ベンチマーク用のユーザーと記事を大量に作成します。乱数のシードを固定しているので、'
+        '同じ引数なら毎回同じデータになります。全ユーザーのパスワードは "benchmark" です。'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10_000)
+        parser.add_argument('--articles', type=int, default=1_000_000)
+        parser.add_argument('--days', type=int, default=3650, help='記事の作成日時を散らばらせる期間')
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--flush', action='store_true', help='既存のデータをすべて削除してから作成します。')
+
+    def handle(self, *args, **options):
+        if options['flush']:
+            call_command('flush', interactive=False, verbosity=0)
+        rng = random.Random(options['seed'])
+        started = time.monotonic()
+
+        author_ids = self.create_users(options['users'], options['batch_size'])
+        self.create_articles(rng, author_ids, options['articles'], options['days'], options['batch_size'])
+
+        self.stderr.write('投稿者の記事数、検索インデックス、統計情報を更新しています...')
+        authors.reconcile(author_ids)
+        search.rebuild_index()
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        cache.invalidate_articles([])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'完了: ユーザー {len(author_ids)} 人、記事 {options["articles"]} 件（{time.monotonic() - started:.1f} 秒）。'
+        ))
+
+    def create_users(self, count, batch_size):
+        # ハッシュ計算は重いので 1 回だけ行い、全員で共有する
+        password = make_password(PASSWORD)
+        now = timezone.now()
+        existing = set(
+            User.objects.filter(username__startswith=USERNAME_PREFIX).values_list('username', flat=True)
+        )
+        users = [
+            User(
+                username=bench_username(i),
+                email=f'{bench_username(i)}@example.com',
+                password=password,
+                date_joined=now,
+            )
+            for i in range(count)
+            if bench_username(i) not in existing
+        ]
+        User.objects.bulk_create(users, batch_size=batch_size)
+        self.stderr.write(f'ユーザー {len(users)} 人を作成しました（既存 {len(existing)} 人）。')
+        # 作成直後なので、レプリカの遅延に影響されないようプライマリから読む
+        return list(
+            User.objects.using(router.db_for_write(User))
+            .filter(username__startswith=USERNAME_PREFIX)
+            .order_by('username')
+            .values_list('pk', flat=True)[:count]
+        )
+
+    def create_articles(self, rng, author_ids, count, days, batch_size):
+        end = timezone.now()
+        start = end - timedelta(days=days)
+        step = (end - start) / max(count, 1)
+        created = 0
+        started = time.monotonic()
+        while created < count:
+            articles = []
+            for i in range(created, min(created + batch_size, count)):
+                created_at = start + step * i
+                articles.append(self.build_article(rng, author_ids[i % len(author_ids)], created_at, end))
+            with transaction.atomic():
+                insert_articles(articles)
+            created += len(articles)
+            elapsed = time.monotonic() - started
+            self.stderr.write(f'記事 {created}/{count} 件 ({created / elapsed if elapsed else 0:.0f} 件/秒)')
+
+    def build_article(self, rng, author_id, created_at, now):
+        words = {'guitarist': rng.choice(GUITARISTS), 'topic': rng.choice(TOPICS)}
+        paragraphs = [
+            ''.join(rng.choice(SENTENCES).format(**words) for _ in range(rng.randint(1, 4)))
+            for _ in range(rng.randint(1, 3))
+        ]
+        # 1 割の記事は作成後に更新されたことにする
+        updated_at = created_at
+        if rng.random() < 0.1:
+            updated_at = min(now, created_at + timedelta(days=rng.randint(1, 30)))
+        article = Article(
+            author_id=author_id,
+            title=f'{words["guitarist"]}に学ぶ{words["topic"]} #{rng.randint(1, 9999)}',
+            content='\n\n'.join(paragraphs),
+            created_at=created_at,
+            updated_at=updated_at,
+        )
+        article.refresh_derived_fields()
+        return article
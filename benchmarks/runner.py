@@ -0,0 +1,180 @@
+"""
+シナリオを実行して、ビューごとのレイテンシ・スループット・SQL 件数を集計する。
+
+``client`` モードは Django のテストクライアントで 1 件ずつ順番に、``server`` モードは
+起動した gunicorn / uvicorn（または既存のサーバー）へ ``loadgen`` で並列にリクエストする。
+SQL 件数はどちらのモードでもテストクライアントで 1 回実行して数える。
+"""
+import json
+import time
+from contextlib import ExitStack
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from .loadgen import LoadResult, load
+
+BASELINE_PATH = Path(__file__).resolve().parent / 'baseline.json'
+DEFAULT_TOLERANCE = 0.5
+# 数 ms のページは揺らぎの割合が大きいので、これ未満の悪化は無視する
+MIN_LATENCY_DELTA_MS = 5
+
+
+def _client_request(client, scenario, context):
+    if scenario.fresh_session:
+        client.force_login(context['user'])
+    return getattr(client, scenario.method)(scenario.path(context))
+
+
+def _consume(response):
+    if response.streaming:
+        for _ in response.streaming_content:
+            pass
+
+
+def count_queries(client, scenario, context):
+    if scenario.fresh_session:
+        client.force_login(context['user'])
+    # レプリカへ振り分けられた読み取りも数える
+    with ExitStack() as stack:
+        captured = [stack.enter_context(CaptureQueriesContext(connection)) for connection in connections.all()]
+        _consume(getattr(client, scenario.method)(scenario.path(context)))
+    return sum(len(queries) for queries in captured)
+
+
+def query_counts(scenarios, context):
+    counts = {}
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        for scenario in scenarios:
+            client = make_client(scenario, context)
+            # キャッシュが温まった状態の件数を数える
+            _consume(_client_request(client, scenario, context))
+            counts[scenario.name] = count_queries(client, scenario, context)
+    return counts
+
+
+def make_client(scenario, context):
+    client = Client()
+    if scenario.auth:
+        client.force_login(context['user'])
+    return client
+
+
+def run_client(scenarios, context, iterations, warmup):
+    results = {}
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        for scenario in scenarios:
+            client = make_client(scenario, context)
+            for _ in range(warmup):
+                _consume(_client_request(client, scenario, context))
+
+            result = LoadResult()
+            for _ in range(iterations):
+                if scenario.fresh_session:
+                    client.force_login(context['user'])
+                started = time.perf_counter()
+                response = getattr(client, scenario.method)(scenario.path(context))
+                _consume(response)
+                result.latencies.append(time.perf_counter() - started)
+                result.statuses[response.status_code] = result.statuses.get(response.status_code, 0) + 1
+                if response.status_code >= 400:
+                    result.errors += 1
+            result.elapsed = sum(result.latencies)
+
+            results[scenario.name] = {
+                **result.summary(),
+                'queries': count_queries(client, scenario, context),
+            }
+    return results
+
+
+def session_cookie(user):
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        client = Client()
+        client.force_login(user)
+    return f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+
+
+def run_server(base_url, scenarios, context, concurrency, duration, warmup, queries=None):
+    """GET のシナリオだけを実サーバーに流す。状態を変えるシナリオは除外する。"""
+    cookie = session_cookie(context['user'])
+    results = {}
+    for scenario in scenarios:
+        if scenario.method != 'get':
+            continue
+        headers = {'Cookie': cookie} if scenario.auth else None
+        path = scenario.path(context)
+        if warmup:
+            load(base_url, [path], min(concurrency, 10), warmup, headers)
+        summary = load(base_url, [path], concurrency, duration, headers).summary()
+        summary['errors'] += sum(count for status, count in summary['statuses'].items() if status >= 400)
+        if queries and scenario.name in queries:
+            summary['queries'] = queries[scenario.name]
+        results[scenario.name] = summary
+    return results
+
+
+def load_baseline(path=BASELINE_PATH):
+    if not Path(path).exists():
+        return {}
+    return json.loads(Path(path).read_text())
+
+
+def save_baseline(baseline, path=BASELINE_PATH):
+    Path(path).write_text(json.dumps(baseline, indent=2, ensure_ascii=False, sort_keys=True) + '\n')
+
+
+def compare(results, baseline, tolerance=DEFAULT_TOLERANCE, check_throughput=True):
+    """
+    ベースラインより悪化した項目を文字列のリストで返す。
+
+    SQL 件数は 1 件でも増えたら、p95 は ``tolerance`` の割合かつ ``MIN_LATENCY_DELTA_MS`` を超えて
+    遅くなったら、スループットは ``tolerance`` の割合を超えて下がったら回帰とみなす。
+    逐次実行のスループットは平均レイテンシの逆数にすぎないので、``check_throughput`` で省ける。
+    """
+    regressions = []
+    for name, current in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        if 'queries' in expected and current.get('queries', 0) > expected['queries']:
+            regressions.append(f"{name}: SQL {expected['queries']} -> {current['queries']} 件")
+        if (
+            current['p95_ms'] > expected['p95_ms'] * (1 + tolerance)
+            and current['p95_ms'] - expected['p95_ms'] > MIN_LATENCY_DELTA_MS
+        ):
+            regressions.append(f"{name}: p95 {expected['p95_ms']:.1f} -> {current['p95_ms']:.1f} ms")
+        if check_throughput and current['throughput'] < expected['throughput'] * (1 - tolerance):
+            regressions.append(
+                f"{name}: スループット {expected['throughput']:.1f} -> {current['throughput']:.1f} req/s"
+            )
+        if current['errors'] and not expected.get('errors'):
+            regressions.append(f"{name}: エラー {current['errors']} 件 {current['statuses']}")
+    return regressions
+
+
+def baseline_entry(results):
+    keys = ('p50_ms', 'p95_ms', 'p99_ms', 'throughput', 'queries', 'errors')
+    return {
+        name: {
+            key: round(value, 2) if isinstance(value, float) else value
+            for key, value in summary.items()
+            if key in keys
+        }
+        for name, summary in results.items()
+    }
+
+
+def format_table(results):
+    lines = [
+        f"{'scenario':<14} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'SQL':>5} {'errors':>7}"
+    ]
+    for name, summary in results.items():
+        lines.append(
+            f"{name:<14} {summary['throughput']:>9.1f} {summary['p50_ms']:>9.1f} {summary['p95_ms']:>9.1f}"
+            f" {summary['p99_ms']:>9.1f} {summary.get('queries', '-'):>5} {summary['errors']:>7}"
+        )
+    return '\n'.join(lines)
@@ -0,0 +1,116 @@
+"""
+ベンチマークで叩く URL の一覧。
+
+``articles`` / ``accounts`` / ``tribute`` の URL はすべてここに載せる。載っていない URL 名があると
+``run_benchmarks`` がエラーにするので、URL を追加したらシナリオも追加すること。
+"""
+from dataclasses import dataclass, field
+
+from django.contrib.auth import get_user_model
+from django.urls import get_resolver, reverse
+from django.utils.http import urlencode
+
+from articles.models import Article
+from articles.pagination import KeysetPaginator
+
+from .management.commands.seed_benchmark_data import bench_username
+
+User = get_user_model()
+
+URLCONF_MODULES = {'articles.urls', 'accounts.urls', 'tribute.urls'}
+
+SEARCH_TERM = 'スウィング'
+DEEP_PAGE_OFFSET = 1000
+EXPORT_ROWS = 500
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    url_name: str
+    query: dict = field(default_factory=dict)
+    article: bool = False
+    author: bool = False
+    auth: bool = False
+    method: str = 'get'
+    # ログアウトのように状態を変えるリクエストは、毎回ログインし直したセッションで送る
+    fresh_session: bool = False
+
+    def path(self, context):
+        kwargs = {}
+        if self.article:
+            kwargs['pk'] = context['article_pk']
+        if self.author:
+            kwargs['username'] = context['user'].username
+        path = reverse(self.url_name, kwargs=kwargs)
+        if self.query:
+            path += '?' + urlencode({key: value.format(**context) for key, value in self.query.items()})
+        return path
+
+
+SCENARIOS = (
+    Scenario('tribute', 'for_reinhardt'),
+    Scenario('tribute_auth', 'for_reinhardt', auth=True),
+    Scenario('register', 'accounts:register'),
+    Scenario('login', 'accounts:login'),
+    Scenario('logout', 'accounts:logout', auth=True, method='post', fresh_session=True),
+    Scenario('session', 'accounts:session'),
+    Scenario('session_auth', 'accounts:session', auth=True),
+    Scenario('list', 'articles:list'),
+    Scenario('list_auth', 'articles:list', auth=True),
+    Scenario('list_deep', 'articles:list', query={'cursor': '{deep_cursor}'}),
+    Scenario('search', 'articles:search', query={'q': '{search_term}'}),
+    Scenario('export', 'articles:export', query={'fields': 'id,title,updated_at', 'updated_since': '{export_since}'}),
+    Scenario('feed', 'articles:feed'),
+    Scenario('feed_atom', 'articles:feed_atom'),
+    Scenario('author', 'articles:author', author=True),
+    Scenario('create_form', 'articles:create', auth=True),
+    Scenario('detail', 'articles:detail', article=True),
+    Scenario('detail_auth', 'articles:detail', article=True, auth=True),
+    Scenario('edit_form', 'articles:edit', article=True, auth=True),
+    Scenario('delete_form', 'articles:delete', article=True, auth=True),
+)
+
+
+def _url_names(resolver, namespace=None, included=False):
+    for pattern in resolver.url_patterns:
+        if hasattr(pattern, 'url_patterns'):
+            if getattr(pattern.urlconf_module, '__name__', None) in URLCONF_MODULES:
+                yield from _url_names(pattern, pattern.namespace, included=True)
+        elif included and pattern.name:
+            yield f'{namespace}:{pattern.name}' if namespace else pattern.name
+
+
+def uncovered_url_names():
+    covered = {scenario.url_name for scenario in SCENARIOS}
+    return sorted(set(_url_names(get_resolver())) - covered)
+
+
+def build_context():
+    """シナリオの URL に埋め込む値（記事 ID、カーソルなど）をデータベースから選ぶ。"""
+    user = User.objects.filter(username=bench_username(0)).first()
+    if user is None:
+        raise LookupError('ベンチマーク用のユーザーがいません。先に seed_benchmark_data を実行してください。')
+    article = Article.objects.filter(author=user).only('pk').first()
+    if article is None:
+        raise LookupError(f'{user.username} の記事がありません。')
+
+    # 一覧の 50 ページ目あたりを指すカーソル。キーセットページネーションなら先頭ページと同じ速さになるはず
+    paginator = KeysetPaginator(Article.objects.all(), 1)
+    deep_row = (
+        Article.objects.order_by(*paginator.ordering)
+        .values(*paginator.keys)[DEEP_PAGE_OFFSET:DEEP_PAGE_OFFSET + 1]
+        .first()
+    )
+    since = (
+        Article.objects.order_by('-updated_at', '-id')
+        .values_list('updated_at', flat=True)[EXPORT_ROWS - 1:EXPORT_ROWS]
+        .first()
+    )
+    return {
+        'user': user,
+        'article_pk': article.pk,
+        'deep_cursor': paginator.encode_cursor('next', deep_row) if deep_row else '',
+        'export_since': since.isoformat() if since else '',
+        'search_term': SEARCH_TERM,
+    }
@@ -0,0 +1,106 @@
+import hashlib
+import os
+import re
+import subprocess
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# BASE_DIR からの glob。frontend/tailwind.css の @source と同じファイルを読み、CSS のないクラスを探す
+SOURCES = ('templates/**/*.html', '*/templates/**/*.html', '*/forms.py')
+INPUT = Path('frontend', 'tailwind.css')
+OUTPUT = Path('frontend', 'static', 'css', 'site.css')
+# CSS を持たず、ほかのクラスの目印にだけ使うクラス（group-hover: などのバリアント用）
+MARKER_CLASSES = {'group', 'peer'}
+
+_CLASS_ATTR_RE = re.compile(r'''(?:class|'class')\s*[=:]\s*(["'])(.*?)\1''', re.S)
+
+
+def find_tailwindcss():
+    """Tailwind のスタンドアロン CLI のパス。TAILWINDCSS_BIN で差し替えられる。"""
+    path = getattr(settings, 'TAILWINDCSS_BIN', '')
+    if path:
+        return path
+    try:
+        from tailwindcss_bin._find_tailwindcss import find_tailwindcss_bin
+    except ImportError:
+        raise CommandError('tailwindcss-bin がインストールされていません（requirements.txt を参照）。') from None
+    return find_tailwindcss_bin()
+
+
+def extract_class_attributes(text):
+    """class 属性（と widget の attrs の 'class'）に書いたクラスを返す。テンプレートタグの部分は除く。"""
+    classes = set()
+    for match in _CLASS_ATTR_RE.finditer(text):
+        value = re.sub(r'\{[{%].*?[%}]\}', ' ', match.group(2))
+        classes.update(value.split())
+    return classes
+
+
+def escape_class(name):
+    return re.sub(r'([^A-Za-z0-9_-])', r'\\\1', name)
+
+
+def missing_classes(css, classes):
+    """生成した CSS にセレクタのないクラスを返す。"""
+    return sorted(
+        name for name in classes - MARKER_CLASSES
+        if not re.search(rf'\.{re.escape(escape_class(name))}(?![\w\\-])', css)
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Tailwind CSS のスタンドアロン CLI（tailwindcss-bin）で、テンプレートで使っているクラスだけの'
+        '縮小済みの CSS（frontend/static/css/site.css）を生成します。CSS にならないクラスがあればエラーにします。'
+        '配信用のハッシュ付きファイルと gzip / brotli 版は collectstatic が作ります。'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='書き込まずに、生成結果がコミット済みのファイルと一致するかだけを確認します（CI 用）。',
+        )
+
+    def handle(self, *args, **options):
+        base_dir = Path(settings.BASE_DIR)
+        css = self.run_tailwindcss(base_dir / INPUT)
+
+        sources = sorted({path for pattern in SOURCES for path in base_dir.glob(pattern)})
+        classes = set()
+        for path in sources:
+            classes |= extract_class_attributes(path.read_text(encoding='utf-8'))
+        missing = missing_classes(css, classes)
+        if missing:
+            raise CommandError(f'CSS にならないクラスがあります（タイプミスか、Tailwind にないクラス）: {" ".join(missing)}')
+
+        output = base_dir / OUTPUT
+        if options['check']:
+            if not output.exists() or output.read_text(encoding='utf-8') != css:
+                raise CommandError(f'{OUTPUT} が古くなっています。manage.py build_css を実行してください。')
+            self.stdout.write(self.style.SUCCESS(f'{OUTPUT} は最新です。'))
+            return
+
+        output.parent.mkdir(parents=True, exist_ok=True)
+        output.write_text(css, encoding='utf-8')
+        digest = hashlib.md5(css.encode()).hexdigest()[:12]
+        self.stdout.write(self.style.SUCCESS(
+            f'{OUTPUT} を書き出しました: ファイル {len(sources)} 個のクラス {len(classes)} 個、'
+            f'{len(css.encode()) / 1024:.1f} KiB（内容のハッシュ {digest}）。'
+        ))
+
+    def run_tailwindcss(self, input_path):
+        # -o を省くと標準出力に書く。進捗は標準エラーに出る
+        command = [find_tailwindcss(), '--input', str(input_path), '--minify']
+        try:
+            result = subprocess.run(
+                command, capture_output=True, text=True, encoding='utf-8', check=False,
+                env={**os.environ, 'NO_COLOR': '1'},
+            )
+        except OSError as exc:
+            raise CommandError(f'Tailwind CSS の CLI を実行できません: {exc}') from exc
+        if result.returncode != 0:
+            raise CommandError(f'Tailwind CSS の CLI が失敗しました:\n{result.stderr}')
+        return result.stdout
@@ -0,0 +1,20 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase
+
+from .management.commands.build_css import extract_class_attributes, missing_classes
+
+
+class BuildCssTests(SimpleTestCase):
+    def test_committed_css_is_current(self):
+        stdout = StringIO()
+        call_command('build_css', check=True, stdout=stdout)
+        self.assertIn('最新です', stdout.getvalue())
+
+    def test_classes_without_css_are_reported(self):
+        css = '.prose{color:red}.sm\\:px-6{padding:0}.prose-a\\:text-blue-600 :where(a){color:blue}'
+        classes = extract_class_attributes(
+            '<div class="prose sm:px-6 prose-a:text-blue-600 group {{ extra_class }} prose-bluish">'
+        )
+        self.assertEqual(missing_classes(css, classes), ['prose-bluish'])
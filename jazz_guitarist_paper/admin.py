@@ -0,0 +1,103 @@
+"""
+大きなテーブル向けの ModelAdmin 部品。
+
+- 一覧の件数は統計情報からの概算を使い、毎回の ``COUNT(*)`` を避ける
+- 全件数（``show_full_result_count``）は表示しない
+- 一括操作は主キー順のチャンクに分けて、チャンクごとにコミットする
+- 削除確認画面では CASCADE で消える関連オブジェクトを全部たどらず、件数だけを出す
+"""
+from django.core.paginator import Paginator
+from django.db import router, transaction
+from django.utils.functional import cached_property
+from django.utils.text import capfirst
+
+from .db import estimated_row_count, explain_row_estimate
+
+ACTION_CHUNK_SIZE = 500
+# 削除確認画面に名前を並べる件数の上限
+DELETION_PREVIEW_LIMIT = 100
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    件数が ``estimate_threshold`` を超えそうなときは正確な数の代わりに概算を返す。
+
+    絞り込みがなければテーブルの統計情報を、絞り込みがあれば閾値までの件数を数え、
+    超えた場合は PostgreSQL の実行計画の見積もりを使う。
+    """
+    estimate_threshold = 10_000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not queryset.query.where:
+            estimated = estimated_row_count(queryset.model, queryset.db)
+            if estimated is not None and estimated > self.estimate_threshold:
+                return estimated
+            return queryset.count()
+
+        capped = queryset.order_by()[:self.estimate_threshold + 1].count()
+        if capped <= self.estimate_threshold:
+            return capped
+        return max(capped, explain_row_estimate(queryset) or 0)
+
+
+def iter_pk_chunks(queryset, chunk_size=ACTION_CHUNK_SIZE):
+    """``queryset`` の主キーを昇順に ``chunk_size`` 件ずつのリストで返す。"""
+    pks = queryset.order_by('pk').values_list('pk', flat=True)
+    last_pk = None
+    while True:
+        chunk_query = pks if last_pk is None else pks.filter(pk__gt=last_pk)
+        chunk = list(chunk_query[:chunk_size])
+        if not chunk:
+            return
+        yield chunk
+        last_pk = chunk[-1]
+
+
+class LargeTableAdminMixin:
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    action_chunk_size = ACTION_CHUNK_SIZE
+
+    def run_in_chunks(self, queryset, func):
+        """
+        ``func(chunk_queryset)`` を主キー順のチャンクごとに別トランザクションで実行する。
+        戻り値（処理件数）の合計を返す。
+        """
+        using = router.db_for_write(queryset.model)
+        queryset = queryset.using(using)
+        total = 0
+        for chunk in iter_pk_chunks(queryset, self.action_chunk_size):
+            with transaction.atomic(using=using):
+                total += func(queryset.model._default_manager.using(using).filter(pk__in=chunk)) or 0
+        return total
+
+    def delete_queryset(self, request, queryset):
+        # 管理画面の「選択したものを削除」も 1 トランザクションで全件消さず、チャンクごとに消す
+        self.run_in_chunks(queryset, lambda chunk: chunk.delete()[0])
+
+    def get_deleted_objects(self, objs, request):
+        """
+        標準の実装は削除される関連オブジェクトを Collector で全部読み込んで並べるので、
+        記事の多いユーザーや大量の選択では確認画面が開かない。対象の先頭だけと件数を返す。
+        """
+        opts = self.model._meta
+        count = len(objs) if isinstance(objs, list) else objs.count()
+        preview = list(objs[:DELETION_PREVIEW_LIMIT])
+        to_delete = [f'{capfirst(opts.verbose_name)}: {obj}' for obj in preview]
+        if count > len(preview):
+            to_delete.append(f'ほか {count - len(preview)} 件')
+        model_count = {opts.verbose_name_plural: count}
+        perms_needed = set() if self.has_delete_permission(request) else {opts.verbose_name}
+        for model, related_count in self.get_related_deletion_counts(objs).items():
+            model_count[model._meta.verbose_name_plural] = related_count
+            # 標準の実装と同じく、管理画面に登録された関連モデルは削除権限も確かめる
+            if related_count and self.admin_site.is_registered(model):
+                if not self.admin_site.get_model_admin(model).has_delete_permission(request):
+                    perms_needed.add(model._meta.verbose_name)
+        return to_delete, model_count, perms_needed, []
+
+    def get_related_deletion_counts(self, objs):
+        """一緒に削除される関連オブジェクトの件数（``{モデル: 件数}``）。"""
+        return {}
@@ -0,0 +1,78 @@
+import json
+
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+
+def pool_stats(alias=DEFAULT_DB_ALIAS):
+    """
+    psycopg のコネクションプールの状態を返す。プールを使っていない場合は None。
+    ``requests_*`` / ``connections_*`` はプール作成以降の累計。
+    """
+    connection = connections[alias]
+    if connection.vendor != 'postgresql' or not connection.settings_dict['OPTIONS'].get('pool'):
+        return None
+    pool = connection.pool
+    stats = pool.get_stats()
+
+    # 最初の接続要求まではプールが開かれていない
+    in_use = 0 if pool.closed else stats.get('pool_size', 0) - stats.get('pool_available', 0)
+    queued = stats.get('requests_queued', 0)
+    return {
+        'size': stats.get('pool_size', 0),
+        'min_size': stats.get('pool_min', 0),
+        'max_size': stats.get('pool_max', 0),
+        'available': stats.get('pool_available', 0),
+        'in_use': in_use,
+        'waiting': stats.get('requests_waiting', 0),
+        # 使用中の接続数が上限に占める割合。1.0 に張り付くなら max_size が足りない
+        'saturation': in_use / stats['pool_max'] if stats.get('pool_max') else 0.0,
+        'requests': stats.get('requests_num', 0),
+        'requests_queued': queued,
+        'requests_wait_ms': stats.get('requests_wait_ms', 0),
+        'average_wait_ms': stats.get('requests_wait_ms', 0) / queued if queued else 0.0,
+        'requests_timeouts': stats.get('requests_errors', 0),
+        'connections_opened': stats.get('connections_num', 0),
+        'connections_lost': stats.get('connections_lost', 0),
+    }
+
+
+def estimated_row_count(model, using=DEFAULT_DB_ALIAS):
+    """
+    テーブルの行数を統計情報から概算する。PostgreSQL は pg_class.reltuples、SQLite は
+    ANALYZE が作る sqlite_stat1 を読む。統計がない場合は None。
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            # パーティション分割した親テーブルは autovacuum が ANALYZE しないので、子テーブルの値を合計する
+            cursor.execute(
+                '''
+                SELECT CASE WHEN parent.relkind = 'p' THEN (
+                    SELECT sum(greatest(child.reltuples, 0))::bigint FROM pg_inherits
+                    JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                    WHERE pg_inherits.inhparent = parent.oid
+                ) ELSE parent.reltuples::bigint END
+                FROM pg_class parent WHERE parent.oid = to_regclass(%s)
+                ''',
+                [table],
+            )
+            row = cursor.fetchone()
+            # 一度も VACUUM / ANALYZE されていないテーブルは -1
+            return row[0] if row and row[0] is not None and row[0] >= 0 else None
+        if connection.vendor == 'sqlite':
+            try:
+                cursor.execute('SELECT stat FROM sqlite_stat1 WHERE tbl = %s LIMIT 1', [table])
+            except DatabaseError:
+                return None
+            row = cursor.fetchone()
+            return int(row[0].split()[0]) if row else None
+    return None
+
+
+def explain_row_estimate(queryset):
+    """PostgreSQL の実行計画から、クエリが返す行数の見積もりを得る。それ以外では None。"""
+    if connections[queryset.db].vendor != 'postgresql':
+        return None
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
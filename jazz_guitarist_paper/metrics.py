@@ -0,0 +1,190 @@
+"""
+Prometheus のテキスト形式で公開するプロセス内メトリクス。
+
+外部パッケージは使わず、ヒストグラムとカウンターを辞書で持つだけの最小実装。
+値はプロセスごとに独立しているので、複数ワーカーで動かす場合は各ワーカーを個別に
+スクレイプするか、ワーカー数を 1 にして測る。
+"""
+import bisect
+import hmac
+import ipaddress
+import threading
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
+from django.views.decorators.http import require_GET
+
+from .db import pool_stats
+
+# 秒単位のバケット上限
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _label_text(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in zip(names, values)
+    )
+    return '{' + pairs + '}'
+
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Histogram:
+    def __init__(self, name, documentation, labels, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def collect(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        for label_values, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip((*self.buckets, float('inf')), counts):
+                cumulative += bucket_count
+                labels = _label_text((*self.labels, 'le'), (*label_values, _number(bound)))
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _label_text(self.labels, label_values)
+            lines.append(f'{self.name}_sum{labels} {_number(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class Counter:
+    def __init__(self, name, documentation, labels):
+        self.name = name
+        self.documentation = documentation
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def collect(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        with self._lock:
+            values = dict(self._values)
+        for label_values, value in sorted(values.items()):
+            lines.append(f'{self.name}{_label_text(self.labels, label_values)} {_number(value)}')
+        return lines
+
+
+REQUEST_DURATION = Histogram(
+    'django_request_duration_seconds', 'Time spent handling a request, by URL name.',
+    ('view', 'method'), DURATION_BUCKETS,
+)
+SQL_DURATION = Histogram(
+    'django_request_sql_duration_seconds', 'Time spent in SQL per request, by URL name.',
+    ('view',), DURATION_BUCKETS,
+)
+SQL_QUERIES = Histogram(
+    'django_request_sql_queries', 'Number of SQL queries per request, by URL name.',
+    ('view',), QUERY_COUNT_BUCKETS,
+)
+TEMPLATE_DURATION = Histogram(
+    'django_request_template_duration_seconds', 'Time spent rendering TemplateResponse, by URL name.',
+    ('view',), DURATION_BUCKETS,
+)
+RESPONSES = Counter('django_responses_total', 'Responses by URL name and status code.', ('view', 'status'))
+SLOW_REQUESTS = Counter('django_slow_requests_total', 'Requests slower than SLOW_REQUEST_THRESHOLD_MS.', ('view',))
+
+REGISTRY = (REQUEST_DURATION, SQL_DURATION, SQL_QUERIES, TEMPLATE_DURATION, RESPONSES, SLOW_REQUESTS)
+
+
+def _gauge(name, documentation, value):
+    return [f'# HELP {name} {documentation}', f'# TYPE {name} gauge', f'{name} {_number(value)}']
+
+
+def _cache_lines():
+    from articles.cache import response_cache_stats
+
+    stats = response_cache_stats()
+    return [
+        *_gauge('articles_response_cache_hits', 'Response cache hits (shared across processes).', stats['hits']),
+        *_gauge('articles_response_cache_misses', 'Response cache misses (shared across processes).', stats['misses']),
+        *_gauge('articles_response_cache_hit_ratio', 'Response cache hit ratio.', stats['hit_ratio']),
+    ]
+
+
+def _pool_lines():
+    stats = pool_stats()
+    if stats is None:
+        return []
+    lines = []
+    for key in ('size', 'available', 'in_use', 'waiting', 'saturation', 'requests_queued', 'requests_timeouts'):
+        lines += _gauge(f'db_pool_{key}', f'psycopg pool {key} for the default database.', stats[key])
+    return lines
+
+
+def _job_lines():
+    from jobs.queue import status_counts
+
+    lines = []
+    for status, count in status_counts().items():
+        lines += _gauge(f'jobs_{status}', f'Background jobs currently {status}.', count)
+    return lines
+
+
+def render_metrics():
+    lines = []
+    for metric in REGISTRY:
+        lines += metric.collect()
+    lines += _cache_lines()
+    lines += _pool_lines()
+    lines += _job_lines()
+    return '\n'.join(lines) + '\n'
+
+
+def _has_valid_token(request):
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token:
+        return False
+    return hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {token}')
+
+
+def _from_allowed_network(request):
+    # X-Forwarded-For は偽装できるので、直接つないできた相手のアドレスだけを見る
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    networks = getattr(settings, 'METRICS_ALLOWED_NETWORKS', [])
+    return any(address in ipaddress.ip_network(network, strict=False) for network in networks)
+
+
+def metrics_allowed(request):
+    """トークンが一致するか、許可したネットワークからのリクエストだけに公開する。"""
+    return _has_valid_token(request) or _from_allowed_network(request)
+
+
+@require_GET
+def metrics_view(request):
+    if not metrics_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE)
@@ -0,0 +1,205 @@
+import logging
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from . import metrics, routers
+
+logger = logging.getLogger('jazz_guitarist_paper.slow_requests')
+
+# 遅いリクエストのログに載せるクエリの上限
+MAX_RECORDED_QUERIES = 100
+LOGGED_QUERIES = 10
+
+_current = ContextVar('request_timing', default=None)
+
+
+class RequestTiming:
+    __slots__ = ('started', 'sql_count', 'sql_time', 'queries', 'template_started', 'template_time')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sql_count = 0
+        self.sql_time = 0.0
+        self.queries = []
+        self.template_started = None
+        self.template_time = 0.0
+
+    def add_query(self, sql, duration):
+        self.sql_count += 1
+        self.sql_time += duration
+        if len(self.queries) < MAX_RECORDED_QUERIES:
+            self.queries.append((duration, sql))
+
+
+def _record_query(execute, sql, params, many, context):
+    timing = _current.get()
+    if timing is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timing.add_query(sql, time.perf_counter() - started)
+
+
+def _install_query_recorder(sender=None, connection=None, **kwargs):
+    # 接続ごとに一度だけ登録する。リクエスト外のクエリは _current が None なので素通りする
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+class RequestTimingMiddleware:
+    """
+    リクエストごとの SQL 件数・SQL 時間・テンプレート描画時間・全体の時間を計測し、
+    ``Server-Timing`` ヘッダーと ``/metrics`` のヒストグラムに反映する。
+    ``SLOW_REQUEST_THRESHOLD_MS`` を超えたリクエストは、時間のかかったクエリと一緒にログへ出す。
+
+    クエリは execute_wrapper、状態は ContextVar で持つので、非同期ビューから
+    sync_to_async 経由で実行されたクエリも同じリクエストに数えられる。
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = getattr(settings, 'SERVER_TIMING_HEADER', True)
+        self.slow_threshold = getattr(settings, 'SLOW_REQUEST_THRESHOLD_MS', 500) / 1000
+        connection_created.connect(_install_query_recorder, dispatch_uid='request_timing_query_recorder')
+        for connection in connections.all(initialized_only=True):
+            _install_query_recorder(connection=connection)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        timing = RequestTiming()
+        token = _current.set(timing)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timing)
+
+    async def __acall__(self, request):
+        timing = RequestTiming()
+        token = _current.set(timing)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timing)
+
+    def process_template_response(self, request, response):
+        # 描画はこのフックの直後に行われ、post_render_callback は描画の直後に呼ばれる
+        timing = _current.get()
+        if timing is not None:
+            timing.template_started = time.perf_counter()
+            response.add_post_render_callback(lambda rendered: self.template_rendered(timing))
+        return response
+
+    @staticmethod
+    def template_rendered(timing):
+        timing.template_time += time.perf_counter() - timing.template_started
+
+    def finish(self, request, response, timing):
+        total = time.perf_counter() - timing.started
+        match = request.resolver_match
+        view = match.view_name if match else '<unresolved>'
+
+        metrics.REQUEST_DURATION.observe(total, view, request.method)
+        metrics.SQL_DURATION.observe(timing.sql_time, view)
+        metrics.SQL_QUERIES.observe(timing.sql_count, view)
+        if timing.template_started is not None:
+            metrics.TEMPLATE_DURATION.observe(timing.template_time, view)
+        metrics.RESPONSES.inc(view, response.status_code)
+
+        if self.server_timing:
+            entries = [f'sql;dur={timing.sql_time * 1000:.1f};desc="{timing.sql_count} queries"']
+            if timing.template_started is not None:
+                entries.append(f'tpl;dur={timing.template_time * 1000:.1f}')
+            entries.append(f'total;dur={total * 1000:.1f}')
+            response['Server-Timing'] = ', '.join(entries)
+
+        if total >= self.slow_threshold:
+            metrics.SLOW_REQUESTS.inc(view)
+            self.log_slow_request(request, view, total, timing)
+        return response
+
+    def log_slow_request(self, request, view, total, timing):
+        slowest = sorted(timing.queries, key=lambda query: query[0], reverse=True)[:LOGGED_QUERIES]
+        lines = [
+            f'slow request: {request.method} {request.get_full_path()} ({view}) '
+            f'{total * 1000:.0f} ms, {timing.sql_count} queries / {timing.sql_time * 1000:.0f} ms SQL, '
+            f'{timing.template_time * 1000:.0f} ms template'
+        ]
+        lines += [f'  {duration * 1000:8.1f} ms  {sql}' for duration, sql in slowest]
+        logger.warning('\n'.join(lines))
+
+
+STICKY_COOKIE_NAME = 'db_primary_until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+
+
+class PrimaryStickinessMiddleware:
+    """
+    書き込み（GET 以外）のリクエストと、その後 ``DATABASE_STICKY_SECONDS`` 秒間の同じブラウザからの
+    リクエストでは、読み取りもプライマリから行う。期限は Cookie に持たせる。
+    レプリカが設定されていなければ何もしない。
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sticky_seconds = getattr(settings, 'DATABASE_STICKY_SECONDS', 10)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        if not routers.replicas():
+            return self.get_response(request)
+        token = routers.pin_to_primary() if self.should_pin(request) else None
+        try:
+            response = self.get_response(request)
+        finally:
+            if token is not None:
+                routers.unpin(token)
+        return self.mark_sticky(request, response)
+
+    async def __acall__(self, request):
+        if not routers.replicas():
+            return await self.get_response(request)
+        token = routers.pin_to_primary() if self.should_pin(request) else None
+        try:
+            response = await self.get_response(request)
+        finally:
+            if token is not None:
+                routers.unpin(token)
+        return self.mark_sticky(request, response)
+
+    def should_pin(self, request):
+        if request.method not in SAFE_METHODS:
+            return True
+        try:
+            return float(request.COOKIES.get(STICKY_COOKIE_NAME, 0)) > time.time()
+        except ValueError:
+            return False
+
+    def mark_sticky(self, request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 500:
+            response.set_cookie(
+                STICKY_COOKIE_NAME,
+                f'{time.time() + self.sticky_seconds:.0f}',
+                max_age=self.sticky_seconds,
+                httponly=True,
+                samesite='Lax',
+            )
+        return response
@@ -10,6 +10,8 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -27,6 +29,9 @@ DEBUG = True
 
 ALLOWED_HOSTS = []
 
+# manage.py test で動いているか
+TESTING = sys.argv[1:2] == ['test']
+
 
 # Application definition
 
@@ -36,14 +41,26 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',
     'django.contrib.messages',
+    # runserver でも WhiteNoise で静的ファイルを配信し、本番と同じヘッダーで確認できるようにする
+    'whitenoise.runserver_nostatic',
     'django.contrib.staticfiles',
     'accounts',
     'articles',
     'tribute',
+    'benchmarks',
+    'jobs',
+    'frontend',
+    'snapshots',
 ]
 
 MIDDLEWARE = [
+    'jazz_guitarist_paper.middleware.RequestTimingMiddleware',
+    # SNAPSHOT_SERVE=always ではセッションやデータベースに触れる前に静的 HTML を返す
+    'snapshots.middleware.SnapshotMiddleware',
+    # セッションの読み込みより前に、プライマリへ固定するかどうかを決める
+    'jazz_guitarist_paper.middleware.PrimaryStickinessMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -71,20 +88,117 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'jazz_guitarist_paper.wsgi.application'
 
+# ASGI サーバー（uvicorn など）で動かすときは True にすると、記事一覧・詳細と
+# トリビュートページが非同期ビューに切り替わる。WSGI では False のままにする
+ASYNC_READ_VIEWS = os.environ.get('ASYNC_READ_VIEWS', 'False') == 'True'
+
 
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.postgresql',
-        'NAME': 'jazz_guitarist_paper_db',
-        'USER': 'world_company',
-        'PASSWORD': 'djan2005go',
-        'HOST': 'db',
-        'PORT': '5432',
+# DATABASE_ENGINE=sqlite にすると PostgreSQL なしで（テストなどを）SQLite で動かせる
+DATABASE_ENGINE = os.environ.get('DATABASE_ENGINE', 'postgresql')
+
+if DATABASE_ENGINE == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': os.environ.get('SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+        }
     }
-}
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('POSTGRES_DB', 'jazz_guitarist_paper_db'),
+            'USER': os.environ.get('POSTGRES_USER', 'world_company'),
+            'PASSWORD': os.environ.get('POSTGRES_PASSWORD', 'djan2005go'),
+            'HOST': os.environ.get('POSTGRES_HOST', 'db'),
+            'PORT': os.environ.get('POSTGRES_PORT', '5432'),
+            # プール利用時は貸し出し前に、永続接続時はリクエストの開始時に接続の生存を確認する
+            'CONN_HEALTH_CHECKS': True,
+        }
+    }
+
+    # psycopg 3 のコネクションプール。DB_POOL_ENABLED=False にすると CONN_MAX_AGE による
+    # 永続接続（リクエストをまたいで 1 スレッド 1 接続を使い回す）に切り替わる
+    if os.environ.get('DB_POOL_ENABLED', 'True') == 'True':
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS'] = {
+            'pool': {
+                'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 2)),
+                'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', 10)),
+                # 接続を取り出すまでに待てる秒数。超えると PoolTimeout
+                'timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+                'max_lifetime': float(os.environ.get('DB_POOL_MAX_LIFETIME', 1800)),
+                'max_idle': float(os.environ.get('DB_POOL_MAX_IDLE', 300)),
+            },
+        }
+    else:
+        DATABASES['default']['CONN_MAX_AGE'] = int(os.environ.get('DB_CONN_MAX_AGE', 60))
+
+# 読み取り専用のレプリカ。読み取りはレプリカに、書き込みは default に振り分ける。
+# PostgreSQL では POSTGRES_REPLICA_HOSTS（カンマ区切り）から replica1, replica2, ... を作る。
+# SQLite では同じファイルを指す replica を代役として置く（テストでは default をミラーする）
+if DATABASE_ENGINE == 'sqlite':
+    replica_hosts = ['local'] if os.environ.get('SQLITE_REPLICA', 'True') == 'True' else []
+else:
+    replica_hosts = [host.strip() for host in os.environ.get('POSTGRES_REPLICA_HOSTS', '').split(',') if host.strip()]
+
+DATABASE_REPLICAS = []
+for number, host in enumerate(replica_hosts, start=1):
+    alias = 'replica' if DATABASE_ENGINE == 'sqlite' else f'replica{number}'
+    DATABASES[alias] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+    if DATABASE_ENGINE != 'sqlite':
+        DATABASES[alias]['HOST'] = host
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['jazz_guitarist_paper.routers.PrimaryReplicaRouter']
+# 書き込んだユーザーの読み取りをプライマリに固定しておく秒数（レプリカの遅延より長くする）
+DATABASE_STICKY_SECONDS = int(os.environ.get('DATABASE_STICKY_SECONDS', 10))
+
+# PostgreSQL で記事テーブルを created_at の範囲で分割する単位（month / year）。空なら分割しない。
+# 設定したら manage.py partition_articles convert で既存のテーブルを置き換える
+ARTICLE_PARTITIONING = os.environ.get('ARTICLE_PARTITIONING', '')
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+# REDIS_URL を設定すると全プロセスで共有する Redis を使う。未設定なら LocMemCache（プロセスごと）で、
+# ログイン中のユーザーとセッションはキャッシュしない（別のワーカーから無効にできないため）
+REDIS_URL = os.environ.get('REDIS_URL', '')
+
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'jazz-guitarist-paper',
+        }
+    }
+
+# 匿名ユーザー向けの記事一覧・詳細ページをキャッシュする秒数
+ARTICLES_RESPONSE_CACHE_TIMEOUT = 300
+
+# True にすると記事一覧・詳細・投稿者ページをユーザーに依存しない殻で描画し（ヘッダーのログイン状態は
+# accounts:session から読み込む）、Cache-Control: public で CDN などの共有キャッシュを許可する
+SHARED_PAGE_SHELL = os.environ.get('SHARED_PAGE_SHELL', 'False') == 'True'
+SHARED_PAGE_MAX_AGE = int(os.environ.get('SHARED_PAGE_MAX_AGE', 0))
+SHARED_PAGE_S_MAXAGE = int(os.environ.get('SHARED_PAGE_S_MAXAGE', 60))
+SHARED_PAGE_STALE_WHILE_REVALIDATE = int(os.environ.get('SHARED_PAGE_STALE_WHILE_REVALIDATE', 300))
+
+# manage.py build_snapshots が静的 HTML を書き出す場所と、一覧を何ページ先まで書き出すか
+SNAPSHOT_ROOT = Path(os.environ.get('SNAPSHOT_ROOT', BASE_DIR / 'static_site'))
+SNAPSHOT_LIST_PAGES = int(os.environ.get('SNAPSHOT_LIST_PAGES', 10))
+# off: 使わない / fallback: ビューが 5xx を返したときだけ返す / always: あれば常に返す
+SNAPSHOT_SERVE = os.environ.get('SNAPSHOT_SERVE', 'off')
 
 
 # Password validation
@@ -122,6 +236,24 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = BASE_DIR / 'staticfiles'
+
+# collectstatic でファイル名に内容のハッシュを付け（css/site.3f2a….css）、gzip / brotli 版も作る。
+# ハッシュ付きのファイルは WhiteNoise が 10 年の immutable な Cache-Control で返す。
+# マニフェストにないファイルは、DEBUG 時と STATICFILES_ALLOW_UNHASHED（テスト）のときだけ
+# ハッシュなしの URL で返し、それ以外は例外にする
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'jazz_guitarist_paper.storage.ManifestStaticFilesStorage',
+    },
+}
+STATICFILES_ALLOW_UNHASHED = TESTING
+
+# Tailwind CSS のスタンドアロン CLI（manage.py build_css）。空なら tailwindcss-bin に同梱のものを使う
+TAILWINDCSS_BIN = os.environ.get('TAILWINDCSS_BIN', '')
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -130,6 +262,40 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 AUTH_USER_MODEL = 'accounts.User'
 
+# メールアドレスは大文字・小文字を区別せずに照合し、ログイン中のユーザーはキャッシュから解決する。
+# キャッシュが LocMemCache のときは、ユーザーの変更を他のワーカーに伝えられないのでキャッシュしない
+AUTHENTICATION_BACKENDS = ['accounts.backends.EmailBackend']
+ACCOUNTS_USER_CACHE_TIMEOUT = 300
+
+# 共有キャッシュがあるときは、セッションをキャッシュから先に読み、なければ DB から読む（書き込みは両方）。
+# LocMemCache では他のワーカーのキャッシュにログアウト済みのセッションが残るので DB だけを使う。
+# DB を使わない signed_cookies なども環境変数で選べる
+SESSION_ENGINE = os.environ.get(
+    'SESSION_ENGINE',
+    'django.contrib.sessions.backends.cached_db' if REDIS_URL else 'django.contrib.sessions.backends.db',
+)
+
+# リクエストごとの計測（Server-Timing ヘッダー、/metrics、遅いリクエストのログ）
+SERVER_TIMING_HEADER = os.environ.get('SERVER_TIMING_HEADER', 'True') == 'True'
+SLOW_REQUEST_THRESHOLD_MS = int(os.environ.get('SLOW_REQUEST_THRESHOLD_MS', 500))
+# /metrics は "Authorization: Bearer <token>" が一致するか、METRICS_ALLOWED_NETWORKS（カンマ区切りの CIDR）
+# から直接つないできたリクエストにだけ答える。どちらも満たさなければ 403。
+# 同じホストのリバースプロキシ経由では REMOTE_ADDR が 127.0.0.1 になるので、ネットワークの既定は空にしている
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
+METRICS_ALLOWED_NETWORKS = [
+    network.strip()
+    for network in os.environ.get('METRICS_ALLOWED_NETWORKS', '').split(',')
+    if network.strip()
+]
+
+# ジョブキュー（jobs）。database はワーカー（manage.py run_jobs）が実行し、
+# immediate はコミット直後に同じプロセスで実行する
+JOBS_BACKEND = os.environ.get('JOBS_BACKEND', 'database')
+# 失敗したジョブを再実行するまでの秒数（2 回目以降は倍々に延ばす）
+JOBS_RETRY_DELAY = int(os.environ.get('JOBS_RETRY_DELAY', 10))
+# これより長く実行中のままのジョブは、ワーカーが落ちたものとみなして再実行する
+JOBS_LOCK_TIMEOUT = int(os.environ.get('JOBS_LOCK_TIMEOUT', 300))
+
 LOGIN_REDIRECT_URL = 'articles:list'
 LOGOUT_REDIRECT_URL = 'accounts:login'
 LOGIN_URL = 'accounts:login'
@@ -0,0 +1,29 @@
+"""
+静的ファイルのストレージ。
+
+WhiteNoise の CompressedManifestStaticFilesStorage は、collectstatic で作るマニフェストに
+ないファイルの URL を求められると例外を送出する。DEBUG 時とテスト（DEBUG=False で動く）では
+collectstatic 前でもページを描画できるよう、マニフェストにも STATIC_ROOT にもないファイルは
+ハッシュなしの名前で返す。本番では従来どおり例外にし、collectstatic の漏れに気付けるようにする。
+"""
+from django.conf import settings
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+
+def allow_unhashed():
+    return settings.DEBUG or getattr(settings, 'STATICFILES_ALLOW_UNHASHED', False)
+
+
+class ManifestStaticFilesStorage(CompressedManifestStaticFilesStorage):
+    @property
+    def manifest_strict(self):
+        return not allow_unhashed()
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            if not allow_unhashed():
+                raise
+            # collectstatic 前。WhiteNoise は finders（DEBUG 時）か STATIC_ROOT から配信する
+            return name
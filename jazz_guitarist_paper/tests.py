@@ -0,0 +1,114 @@
+import time
+
+from django.db import DEFAULT_DB_ALIAS
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.urls import reverse
+
+from articles.checks import check_future_partitions
+from articles.models import Article
+
+from . import routers
+from .middleware import STICKY_COOKIE_NAME, PrimaryStickinessMiddleware
+from .storage import ManifestStaticFilesStorage
+
+
+@override_settings(DATABASE_REPLICAS=['replica'])
+class RouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = routers.PrimaryReplicaRouter()
+
+    def test_reads_go_to_replica(self):
+        self.assertEqual(self.router.db_for_read(Article), 'replica')
+        self.assertEqual(self.router.db_for_write(Article), DEFAULT_DB_ALIAS)
+
+    def test_pinned_reads_go_to_primary(self):
+        with routers.use_primary():
+            self.assertEqual(self.router.db_for_read(Article), DEFAULT_DB_ALIAS)
+        self.assertEqual(self.router.db_for_read(Article), 'replica')
+
+    def test_instance_from_primary_stays_on_primary(self):
+        article = Article()
+        article._state.db = DEFAULT_DB_ALIAS
+        self.assertEqual(self.router.db_for_read(Article, instance=article), DEFAULT_DB_ALIAS)
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_without_replicas(self):
+        self.assertEqual(self.router.db_for_read(Article), DEFAULT_DB_ALIAS)
+
+    def test_migrations_only_on_primary(self):
+        self.assertTrue(self.router.allow_migrate(DEFAULT_DB_ALIAS, 'articles'))
+        self.assertFalse(self.router.allow_migrate('replica', 'articles'))
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], DATABASE_STICKY_SECONDS=10)
+class PrimaryStickinessMiddlewareTests(SimpleTestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.pinned = []
+
+        def view(request):
+            self.pinned.append(routers.is_pinned())
+            return HttpResponse()
+
+        self.middleware = PrimaryStickinessMiddleware(view)
+
+    def test_writes_pin_and_set_cookie(self):
+        response = self.middleware(self.factory.post('/'))
+        self.assertEqual(self.pinned, [True])
+        self.assertIn(STICKY_COOKIE_NAME, response.cookies)
+        self.assertFalse(routers.is_pinned())
+
+    def test_reads_are_pinned_while_cookie_is_valid(self):
+        self.middleware(self.factory.get('/'))
+        self.factory.cookies[STICKY_COOKIE_NAME] = str(time.time() + 10)
+        self.middleware(self.factory.get('/'))
+        self.factory.cookies[STICKY_COOKIE_NAME] = str(time.time() - 10)
+        self.middleware(self.factory.get('/'))
+        self.assertEqual(self.pinned, [False, True, False])
+
+
+class MetricsAccessTests(TestCase):
+    def test_forbidden_by_default(self):
+        # 同じホストのプロキシ経由だと REMOTE_ADDR はループバックになるので、既定では許可しない
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='127.0.0.1').status_code, 403)
+
+    @override_settings(METRICS_ALLOWED_NETWORKS=['127.0.0.0/8'])
+    def test_allowed_network(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('text/plain', response['Content-Type'])
+
+    @override_settings(METRICS_ALLOWED_NETWORKS=['10.0.0.0/8'], METRICS_TOKEN='')
+    def test_other_networks_are_forbidden(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        # X-Forwarded-For は信用しない
+        response = self.client.get(reverse('metrics'), headers={'x-forwarded-for': '10.0.0.1'})
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get(reverse('metrics'), REMOTE_ADDR='10.1.2.3')
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(METRICS_ALLOWED_NETWORKS=[], METRICS_TOKEN='secret')
+    def test_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 403)
+        response = self.client.get(reverse('metrics'), headers={'authorization': 'Bearer wrong'})
+        self.assertEqual(response.status_code, 403)
+        response = self.client.get(reverse('metrics'), headers={'authorization': 'Bearer secret'})
+        self.assertEqual(response.status_code, 200)
+
+
+class StorageTests(SimpleTestCase):
+    def test_unknown_files_fall_back_to_unhashed_names_in_tests(self):
+        storage = ManifestStaticFilesStorage()
+        self.assertEqual(storage.url('css/not-collected.css'), '/static/css/not-collected.css')
+
+    @override_settings(DEBUG=False, STATICFILES_ALLOW_UNHASHED=False)
+    def test_unknown_files_raise_in_production(self):
+        storage = ManifestStaticFilesStorage()
+        with self.assertRaises(ValueError):
+            storage.url('css/not-collected.css')
+
+
+class PartitionCheckTests(TestCase):
+    def test_unpartitioned_database_passes(self):
+        self.assertEqual(check_future_partitions(None, databases=[DEFAULT_DB_ALIAS]), [])
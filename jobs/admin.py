@@ -0,0 +1,29 @@
+from django.contrib import admin, messages
+from django.utils import timezone
+
+from jazz_guitarist_paper.admin import LargeTableAdminMixin
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ('task', 'status', 'attempts', 'run_after', 'locked_by', 'created_at')
+    list_filter = ('status',)
+    ordering = ('-id',)
+    readonly_fields = (
+        'task', 'payload', 'dedupe_key', 'status', 'attempts', 'run_after',
+        'locked_by', 'locked_at', 'last_error', 'created_at',
+    )
+    actions = ('retry_now',)
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.action(description='選択した失敗ジョブをすぐに再実行する')
+    def retry_now(self, request, queryset):
+        retried = self.run_in_chunks(
+            queryset.filter(status=Job.Status.FAILED),
+            lambda chunk: chunk.update(status=Job.Status.PENDING, attempts=0, run_after=timezone.now()),
+        )
+        self.message_user(request, f'{retried} 件のジョブを待機中に戻しました。', messages.SUCCESS)
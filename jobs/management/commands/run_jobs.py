@@ -0,0 +1,64 @@
+import os
+import signal
+import socket
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from jobs import queue
+
+# 実行中のまま放置されたジョブを探す間隔（秒）
+STALE_CHECK_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = (
+        'ジョブキュー（jobs.Job）のワーカーです。待機中のジョブを取り出して実行し続けます。'
+        '複数のプロセスで同時に動かせます。SIGTERM / SIGINT を受けると実行中のバッチを終えてから止まります。'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100, help='一度に取り出すジョブの数')
+        parser.add_argument('--sleep', type=float, default=1.0, help='キューが空のときに待つ秒数')
+        parser.add_argument('--once', action='store_true', help='キューが空になったら終了します。')
+
+    def handle(self, *args, **options):
+        worker_id = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.stopping = False
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        self.stderr.write(f'ワーカー {worker_id} を開始しました。')
+
+        total_succeeded = total_failed = 0
+        next_stale_check = 0
+        while not self.stopping:
+            # プールや永続接続を使っていても、長時間動くプロセスで壊れた接続を使い続けない
+            close_old_connections()
+            if time.monotonic() >= next_stale_check:
+                requeued = queue.requeue_stale()
+                if requeued:
+                    self.stderr.write(f'実行中のまま止まっていたジョブ {requeued} 件を再実行に回しました。')
+                next_stale_check = time.monotonic() + STALE_CHECK_INTERVAL
+
+            jobs = queue.claim(worker_id, options['batch_size'])
+            if not jobs:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+
+            succeeded, failed = queue.run(jobs)
+            total_succeeded += succeeded
+            total_failed += failed
+            if options['verbosity'] >= 2 or failed:
+                self.stderr.write(f'{len(jobs)} 件を実行しました（成功 {succeeded} 件、失敗 {failed} 件）。')
+
+        close_old_connections()
+        self.stdout.write(self.style.SUCCESS(
+            f'ワーカー {worker_id} を終了しました: 成功 {total_succeeded} 件、失敗 {total_failed} 件。'
+        ))
+
+    def stop(self, signum, frame):
+        self.stopping = True
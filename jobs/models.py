@@ -0,0 +1,45 @@
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Job(models.Model):
+    class Status(models.TextChoices):
+        PENDING = 'pending', '待機中'
+        RUNNING = 'running', '実行中'
+        FAILED = 'failed', '失敗'
+
+    task = models.CharField(max_length=100, verbose_name='タスク')
+    payload = models.JSONField(default=dict, verbose_name='引数')
+    # 同じタスク・同じ引数の待機中ジョブは 1 件だけにする（jobs_job_pending_dedupe_uniq）
+    dedupe_key = models.CharField(max_length=150, null=True, blank=True, verbose_name='重複判定キー')
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING, verbose_name='状態')
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name='実行回数')
+    run_after = models.DateTimeField(default=timezone.now, verbose_name='実行予定日時')
+    locked_by = models.CharField(max_length=100, blank=True, verbose_name='実行中のワーカー')
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name='実行開始日時')
+    last_error = models.TextField(blank=True, verbose_name='最後のエラー')
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name='作成日時')
+
+    class Meta:
+        indexes = [
+            # ワーカーが次に実行するジョブを取り出すための部分インデックス
+            models.Index(
+                fields=['run_after', 'id'],
+                name='jobs_job_pending_idx',
+                condition=Q(status='pending'),
+            ),
+            models.Index(fields=['status', 'locked_at'], name='jobs_job_status_locked_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedupe_key'],
+                name='jobs_job_pending_dedupe_uniq',
+                condition=Q(status='pending'),
+            ),
+        ]
+        verbose_name = 'ジョブ'
+        verbose_name_plural = 'ジョブ'
+
+    def __str__(self):
+        return f'{self.task} #{self.pk}'
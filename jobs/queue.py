@@ -0,0 +1,233 @@
+"""
+外部のブローカーを使わない小さなジョブキュー。
+
+``@task`` で登録した関数を ``enqueue`` でキューに入れ、リクエストの外で実行する。
+バックエンドは ``JOBS_BACKEND`` で選ぶ。
+
+- ``database``: ``jobs.Job`` テーブルに入れ、``manage.py run_jobs`` のワーカーが実行する。
+  ジョブは呼び出し元と同じトランザクションで書き込まれるので、ロールバックされた保存の
+  ジョブは残らず、コミットされた保存のジョブは失われない。
+- ``immediate``: コミット直後に同じプロセスで実行する。テストや開発用。
+
+同じタスク・同じ引数のジョブがまだ待機中なら新しくは入れない（重複排除）。
+``batch=True`` のタスクは、同じタスクの待機中のジョブをまとめて引数のリストで 1 回呼ばれる。
+失敗したジョブは指数的に間隔を空けて ``max_attempts`` 回まで再実行し、それでも失敗したら
+``failed`` として残す。成功したジョブは削除する。
+"""
+import hashlib
+import json
+import logging
+import traceback
+from dataclasses import dataclass
+from datetime import timedelta
+from itertools import groupby
+from typing import Callable
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db import IntegrityError, router, transaction
+from django.db.models import Count, F
+from django.utils import timezone
+
+from .models import Job
+
+logger = logging.getLogger('jobs')
+
+BACKENDS = ('database', 'immediate')
+
+
+@dataclass(frozen=True)
+class Task:
+    name: str
+    func: Callable
+    batch: bool
+    max_attempts: int
+
+
+_registry = {}
+
+
+def task(name, *, batch=False, max_attempts=3):
+    """
+    ジョブとして実行できる関数を登録するデコレーター。引数は JSON にできる値 1 つ（``payload``）。
+    ``batch=True`` の関数は ``payload`` のリストを受け取る。
+    """
+    def decorator(func):
+        _registry[name] = Task(name, func, batch, max_attempts)
+        return func
+    return decorator
+
+
+def get_task(name):
+    try:
+        return _registry[name]
+    except KeyError:
+        raise LookupError(f'未登録のタスクです: {name}') from None
+
+
+def get_backend():
+    backend = getattr(settings, 'JOBS_BACKEND', 'database')
+    if backend not in BACKENDS:
+        raise ImproperlyConfigured(f'JOBS_BACKEND は {", ".join(BACKENDS)} のいずれかです: {backend!r}')
+    return backend
+
+
+def dedupe_key(name, payload):
+    digest = hashlib.sha1(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+    return f'{name}:{digest}'
+
+
+def enqueue(name, payload=None, *, delay=0, dedupe=True):
+    enqueue_many(name, [payload], delay=delay, dedupe=dedupe)
+
+
+def enqueue_many(name, payloads, *, delay=0, dedupe=True):
+    task = get_task(name)
+    payloads = [{} if payload is None else payload for payload in payloads]
+    if not payloads:
+        return
+    using = router.db_for_write(Job)
+
+    if get_backend() == 'immediate':
+        transaction.on_commit(lambda: _run_immediately(task, payloads), using=using)
+        return
+
+    run_after = timezone.now() + timedelta(seconds=delay)
+    jobs = [
+        Job(
+            task=name,
+            payload=payload,
+            dedupe_key=dedupe_key(name, payload) if dedupe else None,
+            run_after=run_after,
+        )
+        for payload in payloads
+    ]
+    # 待機中の同じジョブとぶつかった行は部分ユニーク制約で捨てられる
+    Job.objects.using(using).bulk_create(jobs, ignore_conflicts=True)
+
+
+def _run_immediately(task, payloads):
+    try:
+        if task.batch:
+            task.func(payloads)
+        else:
+            for payload in payloads:
+                task.func(payload)
+    except Exception:
+        logger.exception('job %s failed', task.name)
+
+
+def retry_delay(attempts):
+    base = getattr(settings, 'JOBS_RETRY_DELAY', 10)
+    return timedelta(seconds=base * 2 ** max(attempts - 1, 0))
+
+
+def claim(worker_id, batch_size=100, using=None):
+    """実行できる待機中のジョブを最大 ``batch_size`` 件取り出し、このワーカーの実行中にする。"""
+    using = using or router.db_for_write(Job)
+    now = timezone.now()
+    with transaction.atomic(using=using):
+        pks = list(
+            Job.objects.using(using)
+            .select_for_update(skip_locked=True)
+            .filter(status=Job.Status.PENDING, run_after__lte=now)
+            .order_by('run_after', 'id')
+            .values_list('pk', flat=True)[:batch_size]
+        )
+        # SQLite には SELECT ... FOR UPDATE がないので、状態の条件付き更新で取り合いを防ぐ
+        Job.objects.using(using).filter(pk__in=pks, status=Job.Status.PENDING).update(
+            status=Job.Status.RUNNING,
+            locked_by=worker_id,
+            locked_at=now,
+            attempts=F('attempts') + 1,
+        )
+    return list(
+        Job.objects.using(using)
+        .filter(pk__in=pks, status=Job.Status.RUNNING, locked_by=worker_id)
+        .order_by('run_after', 'id')
+    )
+
+
+def run(jobs, using=None):
+    """取り出したジョブを実行する。成功したジョブは削除し、失敗したものは再実行に回す。"""
+    using = using or router.db_for_write(Job)
+    succeeded = failed = 0
+    for name, group in groupby(sorted(jobs, key=lambda job: job.task), key=lambda job: job.task):
+        group = list(group)
+        try:
+            task = get_task(name)
+        except LookupError as error:
+            _give_up(group, str(error), using)
+            failed += len(group)
+            continue
+        if task.batch:
+            calls = [(group, lambda group=group: task.func([job.payload for job in group]))]
+        else:
+            calls = [([job], lambda job=job: task.func(job.payload)) for job in group]
+        for call_jobs, call in calls:
+            try:
+                call()
+            except Exception:
+                logger.exception('job %s failed (%d jobs)', name, len(call_jobs))
+                retry(call_jobs, traceback.format_exc(), task.max_attempts, using)
+                failed += len(call_jobs)
+            else:
+                Job.objects.using(using).filter(pk__in=[job.pk for job in call_jobs]).delete()
+                succeeded += len(call_jobs)
+    return succeeded, failed
+
+
+def retry(jobs, error, max_attempts, using=None):
+    using = using or router.db_for_write(Job)
+    now = timezone.now()
+    for job in jobs:
+        job.last_error = error
+        job.locked_by = ''
+        job.locked_at = None
+        if job.attempts >= max_attempts:
+            # 失敗したジョブは重複排除の対象から外し、管理画面から再実行できるようにする
+            job.status = Job.Status.FAILED
+            job.dedupe_key = None
+        else:
+            job.status = Job.Status.PENDING
+            job.run_after = now + retry_delay(job.attempts)
+        try:
+            with transaction.atomic(using=using):
+                job.save(using=using, update_fields=[
+                    'status', 'dedupe_key', 'run_after', 'locked_by', 'locked_at', 'last_error',
+                ])
+        except IntegrityError:
+            # 同じ内容のジョブが後から入って待機中になっている。そちらに任せる
+            Job.objects.using(using).filter(pk=job.pk).delete()
+
+
+def _give_up(jobs, error, using):
+    Job.objects.using(using).filter(pk__in=[job.pk for job in jobs]).update(
+        status=Job.Status.FAILED, dedupe_key=None, locked_by='', locked_at=None, last_error=error,
+    )
+
+
+def requeue_stale(timeout=None, using=None):
+    """
+    ワーカーが落ちて ``timeout`` 秒以上実行中のままのジョブを再実行に回す。件数を返す。
+    """
+    using = using or router.db_for_write(Job)
+    timeout = timeout or getattr(settings, 'JOBS_LOCK_TIMEOUT', 300)
+    stale = list(
+        Job.objects.using(using).filter(
+            status=Job.Status.RUNNING,
+            locked_at__lt=timezone.now() - timedelta(seconds=timeout),
+        )
+    )
+    for job in stale:
+        max_attempts = _registry[job.task].max_attempts if job.task in _registry else 1
+        retry([job], f'ワーカーが {timeout} 秒以内に完了しませんでした（{job.locked_by}）', max_attempts, using)
+    return len(stale)
+
+
+def status_counts(using=None):
+    using = using or router.db_for_write(Job)
+    counts = dict.fromkeys(Job.Status.values, 0)
+    rows = Job.objects.using(using).order_by().values_list('status').annotate(count=Count('pk'))
+    counts.update(rows)
+    return counts
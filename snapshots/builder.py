@@ -0,0 +1,201 @@
+"""
+トリビュートページ・記事一覧・記事詳細を静的 HTML に書き出す（スナップショット）。
+
+書き出したファイルはファイルサーバーか SnapshotMiddleware がそのまま返すので、アクセスが集中しても
+Python の処理やデータベースを通らない。ページはユーザーに依存しない殻（SHARED_PAGE_SHELL と同じ）で
+描画し、ログイン状態は accounts:session から読み込ませる。
+
+URL とファイルの対応::
+
+    /                         -> index.html
+    /articles/                -> articles/index.html
+    /articles/?cursor=<c>     -> articles/index.<c>.html
+    /articles/<pk>/           -> articles/<pk>/index.html
+
+``manifest.json`` に前回の描画に使ったテンプレートなどの指紋と、反映済みの ``updated_at`` の最大値を
+残す。次回はそれ以降に更新された記事と、それ以降にユーザー名などを変えた投稿者の記事だけを描き直し、
+指紋が変わっていればすべて描き直す。
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.db.models import Max, Q
+from django.template.loader import render_to_string
+from django.urls import reverse
+from django.utils import timezone
+
+from articles.models import Article
+from articles.pages import list_context
+from articles.pagination import KeysetPaginator
+from articles.text import CONTENT_RENDERER_VERSION
+from articles.views import ArticleListView, LIST_FIELDS
+
+User = get_user_model()
+
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+CURSOR_PATTERN = re.compile(r'^[A-Za-z0-9_-]+$')
+# 書き出すページと、それを描画するビューの URL 名
+SNAPSHOT_VIEWS = ('for_reinhardt', 'articles:list', 'articles:detail')
+SHELL_CONTEXT = {'shared_shell': True}
+TEMPLATE_SOURCES = ('templates/**/*.html', '*/templates/**/*.html')
+
+
+def get_root():
+    return Path(getattr(settings, 'SNAPSHOT_ROOT', Path(settings.BASE_DIR) / 'static_site'))
+
+
+def get_list_pages():
+    return getattr(settings, 'SNAPSHOT_LIST_PAGES', 10)
+
+
+def get_overlap():
+    # 前回の最大値より少し前から描き直し、長いトランザクションで遅れてコミットされた更新も拾う
+    return timedelta(seconds=getattr(settings, 'SNAPSHOT_OVERLAP_SECONDS', 60))
+
+
+def snapshot_file(root, path, cursor=None):
+    relative = path.strip('/')
+    directory = root.joinpath(*relative.split('/')) if relative else root
+    return directory / (f'index.{cursor}.html' if cursor else 'index.html')
+
+
+def article_file(root, pk):
+    return snapshot_file(root, reverse('articles:detail', kwargs={'pk': pk}))
+
+
+def fingerprint():
+    """テンプレート・本文のレンダラー・CSS の URL が変わったら、書き出し済みのページはすべて古い。"""
+    digest = hashlib.md5(f'{CONTENT_RENDERER_VERSION}|{staticfiles_storage.url("css/site.css")}'.encode())
+    base_dir = Path(settings.BASE_DIR)
+    for path in sorted({path for pattern in TEMPLATE_SOURCES for path in base_dir.glob(pattern)}):
+        digest.update(str(path.relative_to(base_dir)).encode())
+        digest.update(path.read_bytes())
+    return digest.hexdigest()
+
+
+def read_manifest(root):
+    try:
+        manifest = json.loads((root / MANIFEST_NAME).read_text(encoding='utf-8'))
+    except (FileNotFoundError, ValueError):
+        return None
+    return manifest if manifest.get('version') == MANIFEST_VERSION else None
+
+
+def write_manifest(root, fingerprint, watermark):
+    write_file(root / MANIFEST_NAME, json.dumps({
+        'version': MANIFEST_VERSION,
+        'fingerprint': fingerprint,
+        'watermark': watermark.isoformat() if watermark else None,
+        'built_at': timezone.now().isoformat(),
+    }, indent=2))
+
+
+def write_file(path, text):
+    # 一時ファイルに書いてから置き換え、配信中のファイルが書きかけにならないようにする
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            file.write(text)
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
+def render_tribute():
+    return render_to_string('tribute/for_reinhardt.html', SHELL_CONTEXT)
+
+
+def render_list_page(cursor=None):
+    paginator = KeysetPaginator(
+        Article.objects.select_related('author').only(*LIST_FIELDS),
+        ArticleListView.paginate_by,
+        ordering=ArticleListView.paginate_ordering,
+    )
+    page = paginator.page(cursor)
+    html = render_to_string('articles/list.html', {**SHELL_CONTEXT, **list_context(paginator, page)})
+    return html, page
+
+
+def render_article(article):
+    return render_to_string('articles/detail.html', {**SHELL_CONTEXT, 'article': article, 'object': article})
+
+
+def build_pages(root, list_pages):
+    """トリビュートページと一覧の先頭 ``list_pages`` ページを書き出し、書き出したファイル数を返す。"""
+    write_file(snapshot_file(root, reverse('for_reinhardt')), render_tribute())
+
+    list_path = reverse('articles:list')
+    written = set()
+    cursor = None
+    for _ in range(list_pages):
+        html, page = render_list_page(cursor)
+        path = snapshot_file(root, list_path, cursor)
+        write_file(path, html)
+        written.add(path)
+        if not page.has_next():
+            break
+        cursor = page.next_cursor
+    # 記事が増えると同じページでもカーソルが変わるので、今回たどらなかったページは消す
+    directory = snapshot_file(root, list_path).parent
+    for path in directory.glob('index.*.html'):
+        if path not in written:
+            path.unlink()
+    return len(written) + 1
+
+
+def build_articles(root, pks):
+    """記事詳細を書き出す。並列ビルドのワーカープロセスからも呼ばれる。"""
+    root = Path(root)
+    queryset = Article.objects.filter(pk__in=pks).select_related('author')
+    count = 0
+    for article in queryset.iterator(chunk_size=len(pks) or 1):
+        write_file(article_file(root, article.pk), render_article(article))
+        count += 1
+    return count
+
+
+def remove_deleted_articles(root, batch_size=1000):
+    """削除された記事のファイルを消し、消した件数を返す。"""
+    directory = snapshot_file(root, reverse('articles:list')).parent
+    if not directory.is_dir():
+        return 0
+    pks = [int(entry.name) for entry in os.scandir(directory) if entry.is_dir() and entry.name.isdigit()]
+    removed = 0
+    for start in range(0, len(pks), batch_size):
+        batch = pks[start:start + batch_size]
+        existing = set(Article.objects.filter(pk__in=batch).values_list('pk', flat=True))
+        for pk in batch:
+            if pk not in existing:
+                shutil.rmtree(article_file(root, pk).parent, ignore_errors=True)
+                removed += 1
+    return removed
+
+
+def articles_to_build(manifest, current_fingerprint):
+    """描き直す記事の queryset と、全件かどうかを返す。"""
+    if manifest is None or manifest['fingerprint'] != current_fingerprint or not manifest['watermark']:
+        return Article.objects.all(), True
+    since = datetime.fromisoformat(manifest['watermark']) - get_overlap()
+    # ページには投稿者名も描かれるので、名前を変えた投稿者の記事も描き直す
+    changed_authors = User.objects.filter(updated_at__gte=since).values('pk')
+    return Article.objects.filter(Q(updated_at__gte=since) | Q(author__in=changed_authors)), False
+
+
+def latest_update():
+    """記事と投稿者の updated_at の最大値。次回はこれより後の変更だけを描き直す。"""
+    article = Article.objects.aggregate(latest=Max('updated_at'))['latest']
+    author = User.objects.aggregate(latest=Max('updated_at'))['latest']
+    return max(filter(None, (article, author)), default=None)
@@ -0,0 +1,83 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from snapshots import builder, workers
+
+CHUNK_SIZE = 500
+
+
+class Command(BaseCommand):
+    help = (
+        'トリビュートページ・記事一覧の先頭ページ・記事詳細を静的 HTML として書き出します。'
+        '2 回目からは前回以降に更新された記事だけを描き直し、削除された記事のファイルを消します。'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='前回の結果を使わず、すべての記事を描き直します。')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='記事を描画するプロセス数（既定は CPU コア数）。1 なら並列にしません。',
+        )
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='1 回にワーカーへ渡す記事数')
+        parser.add_argument(
+            '--list-pages',
+            type=int,
+            default=builder.get_list_pages(),
+            help='書き出す記事一覧のページ数（既定は SNAPSHOT_LIST_PAGES）',
+        )
+
+    def handle(self, *args, **options):
+        root = builder.get_root()
+        started = time.monotonic()
+        current_fingerprint = builder.fingerprint()
+        manifest = None if options['full'] else builder.read_manifest(root)
+        # 描画を始める前の最大値を記録し、描画中に更新された記事は次回に回す
+        watermark = builder.latest_update()
+        queryset, full = builder.articles_to_build(manifest, current_fingerprint)
+
+        pages = builder.build_pages(root, options['list_pages'])
+        pks = list(queryset.order_by('pk').values_list('pk', flat=True))
+        chunks = [pks[start:start + options['chunk_size']] for start in range(0, len(pks), options['chunk_size'])]
+        if options['workers'] > 1 and len(chunks) > 1:
+            built = self.build_parallel(root, chunks, options['workers'])
+        else:
+            built = sum(builder.build_articles(root, chunk) for chunk in chunks)
+        removed = builder.remove_deleted_articles(root)
+        builder.write_manifest(root, current_fingerprint, watermark)
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'{root} に書き出しました（{"全件" if full else "差分"}）: ページ {pages} 件、記事 {built} 件、'
+            f'削除 {removed} 件、{elapsed:.1f} 秒（{built / elapsed if elapsed else 0:.0f} 件/秒）。'
+        ))
+
+    def build_parallel(self, root, chunks, processes):
+        # 接続やコネクションプールを子プロセスに引き継がないよう、fork ではなく spawn で起動する
+        connections.close_all()
+        context = multiprocessing.get_context('spawn')
+        built = 0
+        pending = set()
+        remaining = iter(chunks)
+        executor = ProcessPoolExecutor(max_workers=processes, mp_context=context, initializer=workers.init_worker)
+        with executor:
+            while True:
+                # 結果を待たずに全チャンクを積むとメモリを使うので、ワーカー数の 2 倍までに抑える
+                for chunk in remaining:
+                    pending.add(executor.submit(workers.build_articles, str(root), chunk))
+                    if len(pending) >= processes * 2:
+                        break
+                if not pending:
+                    break
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    built += future.result()
+                    self.stderr.write(f'記事 {built} 件を書き出しました', ending='\r')
+        self.stderr.write('')
+        return built
@@ -0,0 +1,88 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.http import FileResponse
+from django.urls import Resolver404, resolve
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from articles.conditional import patch_shared_cache_control
+
+from . import builder
+
+SERVE_MODES = ('off', 'fallback', 'always')
+
+
+class SnapshotMiddleware:
+    """
+    build_snapshots が書き出した静的 HTML を返す。``SNAPSHOT_SERVE`` で動きを切り替える。
+
+    - ``fallback``: ビューが 5xx を返したとき（データベースの障害など）だけスナップショットに差し替える。
+    - ``always``: スナップショットがあればビューを呼ばずに返す。アクセスが集中したときに使う。
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.mode = getattr(settings, 'SNAPSHOT_SERVE', 'off')
+        if self.mode not in SERVE_MODES:
+            raise ImproperlyConfigured(f'SNAPSHOT_SERVE は {", ".join(SERVE_MODES)} のいずれかにしてください。')
+        self.root = builder.get_root()
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self.get_response):
+            return self.__acall__(request)
+        path = self.snapshot_path(request)
+        if path is not None and self.mode == 'always':
+            response = self.serve(request, path, 'HIT')
+            if response is not None:
+                return response
+        return self.fallback(request, path, self.get_response(request))
+
+    async def __acall__(self, request):
+        path = self.snapshot_path(request)
+        if path is not None and self.mode == 'always':
+            response = self.serve(request, path, 'HIT')
+            if response is not None:
+                return response
+        return self.fallback(request, path, await self.get_response(request))
+
+    def snapshot_path(self, request):
+        if self.mode == 'off' or request.method not in ('GET', 'HEAD'):
+            return None
+        query = request.GET
+        cursor = query.get('cursor')
+        if set(query) - {'cursor'} or (cursor is not None and not builder.CURSOR_PATTERN.match(cursor)):
+            return None
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return None
+        if match.view_name not in builder.SNAPSHOT_VIEWS or (cursor and match.view_name != 'articles:list'):
+            return None
+        # URL を解決できたパスだけをファイル名にするので、root の外を指すことはない
+        return builder.snapshot_file(self.root, request.path_info, cursor)
+
+    def fallback(self, request, path, response):
+        if path is not None and response.status_code >= 500:
+            return self.serve(request, path, 'FALLBACK') or response
+        return response
+
+    def serve(self, request, path, state):
+        try:
+            stat = path.stat()
+        except OSError:
+            return None
+        etag = quote_etag(f'snapshot-{stat.st_mtime_ns:x}-{stat.st_size:x}')
+        response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+        if response is None:
+            response = FileResponse(path.open('rb'), content_type='text/html; charset=utf-8')
+            del response['Content-Disposition']
+            response['ETag'] = etag
+            response['Last-Modified'] = http_date(stat.st_mtime)
+        response['X-Snapshot'] = state
+        patch_shared_cache_control(response)
+        return response
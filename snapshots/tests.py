@@ -0,0 +1,118 @@
+import json
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.http import HttpResponse, HttpResponseServerError
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from articles.models import Article
+
+from . import builder
+from .middleware import SnapshotMiddleware
+
+User = get_user_model()
+
+
+class SnapshotTestCase(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.root = Path(directory.name)
+        settings = override_settings(SNAPSHOT_ROOT=self.root, SNAPSHOT_OVERLAP_SECONDS=0)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+
+class BuildSnapshotsTests(SnapshotTestCase):
+    def setUp(self):
+        super().setUp()
+        self.django = User.objects.create_user('django', 'django@example.com', 'password')
+        self.joe = User.objects.create_user('joe', 'joe@example.com', 'password')
+        self.minor = Article.objects.create(author=self.django, title='Minor Swing', content='swing')
+        self.nuages = Article.objects.create(author=self.django, title='Nuages', content='ballad')
+        self.pass_ = Article.objects.create(author=self.joe, title='Virtuoso', content='solo')
+        # 前回のビルドより前に書かれたことにする
+        self.old = timezone.now() - timedelta(days=1)
+        Article.objects.update(updated_at=self.old)
+        User.objects.update(updated_at=self.old)
+
+    def build(self, *args):
+        stdout = StringIO()
+        call_command('build_snapshots', '--workers', '1', *args, stdout=stdout)
+        return stdout.getvalue()
+
+    def build_after_old_changes(self):
+        # 前回のビルドが setUp の時点までの変更を反映済みだったことにする
+        builder.write_manifest(self.root, builder.fingerprint(), self.old + timedelta(minutes=1))
+        return self.build()
+
+    def test_full_build(self):
+        self.assertIn('記事 3 件', self.build())
+        self.assertTrue((self.root / 'index.html').exists())
+        self.assertIn('Nuages', (self.root / 'articles' / 'index.html').read_text(encoding='utf-8'))
+        detail = builder.article_file(self.root, self.minor.pk).read_text(encoding='utf-8')
+        self.assertIn('Minor Swing', detail)
+        self.assertIn('data-session-author', detail)
+        manifest = json.loads((self.root / builder.MANIFEST_NAME).read_text(encoding='utf-8'))
+        self.assertEqual(manifest['fingerprint'], builder.fingerprint())
+
+    def test_incremental_build_renders_changed_articles_and_authors(self):
+        self.build()
+        self.assertIn('記事 0 件', self.build_after_old_changes())
+
+        self.django.username = 'django_reinhardt'
+        self.django.save()
+        self.assertIn('記事 2 件', self.build_after_old_changes())
+        detail = builder.article_file(self.root, self.nuages.pk).read_text(encoding='utf-8')
+        self.assertIn('django_reinhardt', detail)
+
+        User.objects.update(updated_at=self.old)
+        self.pass_.title = 'Virtuoso No. 4'
+        self.pass_.save()
+        self.assertIn('記事 1 件', self.build_after_old_changes())
+        self.assertIn('記事 3 件', self.build('--full'))
+
+    def test_deleted_articles_are_removed(self):
+        self.build()
+        directory = builder.article_file(self.root, self.nuages.pk).parent
+        self.nuages.delete()
+        self.assertIn('削除 1 件', self.build())
+        self.assertFalse(directory.exists())
+        self.assertTrue(builder.article_file(self.root, self.minor.pk).exists())
+
+
+class SnapshotMiddlewareTests(SnapshotTestCase):
+    def setUp(self):
+        super().setUp()
+        self.factory = RequestFactory()
+        builder.write_file(self.root / 'index.html', '<p>snapshot</p>')
+
+    def middleware(self, mode, response):
+        with override_settings(SNAPSHOT_SERVE=mode):
+            return SnapshotMiddleware(lambda request: response)
+
+    def test_always_serves_snapshot(self):
+        response = self.middleware('always', HttpResponse('view'))(self.factory.get('/'))
+        self.assertEqual(response['X-Snapshot'], 'HIT')
+        self.assertEqual(b''.join(response.streaming_content), b'<p>snapshot</p>')
+        self.assertIn('public', response['Cache-Control'])
+
+        request = self.factory.get('/', headers={'if-none-match': response['ETag']})
+        self.assertEqual(self.middleware('always', HttpResponse('view'))(request).status_code, 304)
+
+    def test_fallback_only_on_server_error(self):
+        response = self.middleware('fallback', HttpResponse('view'))(self.factory.get('/'))
+        self.assertEqual(response.content, b'view')
+        response = self.middleware('fallback', HttpResponseServerError())(self.factory.get('/'))
+        self.assertEqual(response['X-Snapshot'], 'FALLBACK')
+
+    def test_ignores_unknown_queries_and_missing_files(self):
+        response = self.middleware('always', HttpResponse('view'))(self.factory.get('/', {'page': '2'}))
+        self.assertEqual(response.content, b'view')
+        response = self.middleware('always', HttpResponse('view'))(self.factory.get('/articles/'))
+        self.assertEqual(response.content, b'view')
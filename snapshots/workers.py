@@ -0,0 +1,17 @@
+"""
+build_snapshots の並列ビルドでワーカープロセスが呼ぶ関数。
+
+spawn で起動したプロセスは、このモジュールを読み込んでから初期化関数を呼ぶ。モデルを読み込む
+モジュールはそれまで import できないので、ここでは Django の設定を済ませてから読み込む。
+"""
+import django
+
+
+def init_worker():
+    django.setup()
+
+
+def build_articles(root, pks):
+    from .builder import build_articles
+
+    return build_articles(root, pks)
@@ -1,3 +1,9 @@
 from django.test import TestCase
+from django.urls import reverse
 
-# Create your tests here.
+
+class TributePageTests(TestCase):
+    def test_renders(self):
+        response = self.client.get(reverse('for_reinhardt'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'tribute/for_reinhardt.html')
@@ -1,6 +1,11 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
 urlpatterns = [
-    path('', views.for_reinhardt, name='for_reinhardt'),
+    path(
+        '',
+        views.for_reinhardt_async if settings.ASYNC_READ_VIEWS else views.for_reinhardt,
+        name='for_reinhardt',
+    ),
 ]
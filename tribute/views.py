@@ -2,3 +2,9 @@ from django.shortcuts import render # 変更
 
 def for_reinhardt(request):
     return render(request, 'tribute/for_reinhardt.html') # 変更
+
+
+async def for_reinhardt_async(request):
+    # テンプレートで request.user を評価させないよう、非同期に解決したユーザーを渡す
+    user = await request.auser()
+    return render(request, 'tribute/for_reinhardt.html', {'user': user})